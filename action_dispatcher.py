@@ -0,0 +1,326 @@
+# backend/action_dispatcher.py
+"""
+Asynchronous delivery of emotion actions to device backends (lights, speakers, webhooks).
+
+dispatch() never blocks the request path: it hands the emotion to a private event loop
+thread, which fans one command out per backend. Each backend has its own bounded queue and
+worker, so a slow or dead device only delays its own commands. Per (backend, user) device:
+
+  coalescing   an action identical to the last one delivered within coalesce_s is dropped
+  debouncing   commands are at least debounce_s apart; a burst collapses to its latest emotion
+
+SOULSYNC_ACTION_BACKENDS picks the backends (comma separated): log, webhook, fake.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Sequence
+
+from backend.action_engine import ACTIONS, DEFAULT_ACTION
+from backend.action_engine_plus import scene_response
+from backend.metrics import ACTION_COMMANDS, ACTION_DELIVERY_SECONDS, get_logger, log_event, LOG_SAMPLE
+
+ACTION_BACKENDS = os.getenv("SOULSYNC_ACTION_BACKENDS", "log")
+ACTION_WEBHOOK_URL = os.getenv("SOULSYNC_ACTION_WEBHOOK_URL", "")
+ACTION_DEBOUNCE_S = float(os.getenv("SOULSYNC_ACTION_DEBOUNCE_MS", "500")) / 1000.0
+ACTION_COALESCE_S = float(os.getenv("SOULSYNC_ACTION_COALESCE_S", "30"))
+ACTION_MAX_QUEUE = int(os.getenv("SOULSYNC_ACTION_MAX_QUEUE", "256"))
+ACTION_TIMEOUT_S = float(os.getenv("SOULSYNC_ACTION_TIMEOUT_S", "2"))
+RESULTS = ("sent", "failed", "timeout", "coalesced", "debounced", "dropped")
+
+logger = get_logger("action_dispatcher")
+
+
+def command_payload(emotion: str):
+    payload = dict(scene_response(emotion))
+    payload["action"] = ACTIONS.get(emotion, DEFAULT_ACTION)
+    return MappingProxyType(payload)
+
+
+# one immutable payload per known emotion, shared by every command
+COMMANDS = MappingProxyType({emotion: command_payload(emotion) for emotion in ACTIONS})
+
+
+class ActionCommand:
+    __slots__ = ("device", "user_id", "emotion", "payload", "created")
+
+    def __init__(self, device: str, user_id: str, emotion: str, created: float):
+        self.device = device
+        self.user_id = user_id
+        self.emotion = emotion
+        self.payload = COMMANDS.get(emotion) or command_payload(emotion)
+        self.created = created      # time.monotonic() at dispatch()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.payload, device=self.device, user_id=self.user_id)
+
+
+# ---------- device backends ----------
+class DeviceBackend:
+    """One device integration. send() runs on the dispatcher loop; raise to report a failure."""
+    name = "device"
+
+    async def send(self, command: ActionCommand):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LogBackend(DeviceBackend):
+    """Default: no hardware, just a (sampled) structured log line per delivered command."""
+    name = "log"
+
+    async def send(self, command: ActionCommand):
+        log_event(logger, "device_command", sample=LOG_SAMPLE, **command.to_dict())
+
+
+class WebhookBackend(DeviceBackend):
+    """POSTs each command as JSON over a pooled keep-alive session (blocking I/O off the loop)."""
+    name = "webhook"
+
+    def __init__(self, url: str = ACTION_WEBHOOK_URL, timeout: float = ACTION_TIMEOUT_S):
+        from backend.curated_catalog import pooled_session
+        if not url:
+            raise RuntimeError("SOULSYNC_ACTION_WEBHOOK_URL is not set")
+        self.url = url
+        self.timeout = timeout
+        self.session = pooled_session()
+
+    async def send(self, command: ActionCommand):
+        await asyncio.get_running_loop().run_in_executor(None, self._post, command.to_dict())
+
+    def _post(self, body):
+        self.session.post(self.url, json=body, timeout=self.timeout).raise_for_status()
+
+    async def close(self):
+        self.session.close()
+
+
+class FakeDeviceBackend(DeviceBackend):
+    """In-memory device for tests and benchmarks: records commands, optional latency / failures."""
+
+    def __init__(self, name: str = "fake", latency_ms: float = 0.0, fail: bool = False):
+        self.name = name
+        self.latency_s = latency_ms / 1000.0
+        self.fail = fail
+        self.sent: List[ActionCommand] = []
+
+    async def send(self, command: ActionCommand):
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is unreachable")
+        self.sent.append(command)
+
+
+def backends_from_env(spec: str = ACTION_BACKENDS) -> List[DeviceBackend]:
+    factories = {"log": LogBackend, "webhook": WebhookBackend, "fake": FakeDeviceBackend}
+    out = []
+    for name in filter(None, (s.strip().lower() for s in spec.split(","))):
+        if name not in factories:
+            raise ValueError(f"unknown action backend {name!r} (expected one of {sorted(factories)})")
+        out.append(factories[name]())
+    return out
+
+
+# ---------- dispatcher ----------
+class ActionDispatcher:
+    def __init__(self, backends: Optional[Sequence[DeviceBackend]] = None, debounce_s: float = ACTION_DEBOUNCE_S,
+                 coalesce_s: float = ACTION_COALESCE_S, max_queue: int = ACTION_MAX_QUEUE,
+                 timeout_s: float = ACTION_TIMEOUT_S):
+        self.backends = list(backends) if backends is not None else None   # None -> from env on first use
+        self.debounce_s = max(0.0, debounce_s)
+        self.coalesce_s = max(0.0, coalesce_s)
+        self.max_queue = max(1, int(max_queue))
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread = None
+        # loop-thread state
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._last: Dict[tuple, tuple] = {}               # (backend, user) -> (emotion, enqueued_at)
+        self._pending: Dict[tuple, ActionCommand] = {}    # (backend, user) -> command waiting out the debounce
+        # counters (read by stats() from other threads)
+        self.requested = 0
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._latencies = deque(maxlen=1024)
+
+    # ---------- public API ----------
+    def dispatch(self, user_id: str, emotion: str):
+        """Queue the emotion's action for every device of user_id. Returns immediately."""
+        self._ensure_started()
+        self._loop.call_soon_threadsafe(self._accept, user_id or "anon", (emotion or "neutral").lower(),
+                                        time.monotonic())
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until nothing is pending or queued (tests / shutdown). False on timeout."""
+        if self._loop is None:
+            return True
+        fut = asyncio.run_coroutine_threadsafe(self._drain(), self._loop)
+        try:
+            fut.result(timeout)
+            return True
+        except Exception:
+            fut.cancel()
+            return False
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        except Exception as e:
+            log_event(logger, "action_dispatcher_stop_failed", level=logging.WARNING, error=str(e))
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._latencies)
+            backends = {name: dict(c) for name, c in self._counts.items()}
+            requested = self.requested
+        for name, q in list(self._queues.items()):
+            backends.setdefault(name, {})["queued"] = q.qsize()
+        return {
+            "backends": backends, "requested": requested, "pending": len(self._pending),
+            "debounce_ms": round(self.debounce_s * 1000.0, 1), "coalesce_s": self.coalesce_s,
+            "max_queue": self.max_queue, "running": self._loop is not None,
+            "delivery_ms_avg": round(sum(lat) / len(lat), 2) if lat else 0.0,
+            "delivery_ms_p50": round(lat[len(lat) // 2], 2) if lat else 0.0,
+            "delivery_ms_max": round(lat[-1], 2) if lat else 0.0,
+        }
+
+    # ---------- internals (loop thread) ----------
+    def _ensure_started(self):
+        if self._loop is not None:
+            return
+        with self._lock:
+            if self._loop is not None:
+                return
+            if self.backends is None:
+                self.backends = backends_from_env()
+            self._counts = {b.name: {r: 0 for r in RESULTS} for b in self.backends}
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(loop, ready), name="action-dispatcher",
+                                            daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+
+    def _run(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        self._queues = {b.name: asyncio.Queue(self.max_queue) for b in self.backends}
+        self._workers = [loop.create_task(self._deliver(b, self._queues[b.name])) for b in self.backends]
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _count(self, backend: str, result: str, latency_s: float = None):
+        ACTION_COMMANDS.labels(backend, result).inc()
+        with self._lock:
+            self._counts[backend][result] += 1
+            if latency_s is not None:
+                self._latencies.append(latency_s * 1000.0)
+
+    def _accept(self, user_id: str, emotion: str, created: float):
+        with self._lock:
+            self.requested += 1
+        for backend in self.backends:
+            key = (backend.name, user_id)
+            pending = self._pending.get(key)
+            if pending is not None:
+                # a command is already waiting for this device: latest emotion wins
+                if pending.emotion == emotion:
+                    self._count(backend.name, "coalesced")
+                else:
+                    self._count(backend.name, "debounced")
+                    self._pending[key] = ActionCommand(backend.name, user_id, emotion, created)
+                continue
+            last = self._last.get(key)
+            if last is not None and last[0] == emotion and created - last[1] < self.coalesce_s:
+                self._count(backend.name, "coalesced")
+                continue
+            wait = self.debounce_s - (created - last[1]) if last is not None else 0.0
+            command = ActionCommand(backend.name, user_id, emotion, created)
+            if wait > 0:
+                self._pending[key] = command
+                self._loop.call_later(wait, self._release, key)
+            else:
+                self._enqueue(key, command)
+        if len(self._last) > 4096:
+            self._prune(created)
+
+    def _release(self, key):
+        command = self._pending.pop(key, None)
+        if command is None:
+            return
+        last = self._last.get(key)
+        # the burst settled back on what the device already shows
+        if last is not None and last[0] == command.emotion and time.monotonic() - last[1] < self.coalesce_s:
+            self._count(command.device, "coalesced")
+            return
+        self._enqueue(key, command)
+
+    def _enqueue(self, key, command: ActionCommand):
+        try:
+            self._queues[command.device].put_nowait(command)
+        except asyncio.QueueFull:
+            self._count(command.device, "dropped")
+            return
+        self._last[key] = (command.emotion, time.monotonic())
+
+    def _prune(self, now: float):
+        horizon = max(self.coalesce_s, self.debounce_s)
+        for key in [k for k, (_, at) in self._last.items() if now - at >= horizon]:
+            del self._last[key]
+
+    async def _deliver(self, backend: DeviceBackend, queue: asyncio.Queue):
+        while True:
+            command = await queue.get()
+            try:
+                if command is None:
+                    return
+                try:
+                    await asyncio.wait_for(backend.send(command), self.timeout_s)
+                    result = "sent"
+                except asyncio.TimeoutError:
+                    result = "timeout"
+                except Exception as e:
+                    result = "failed"
+                    log_event(logger, "device_command_failed", level=logging.WARNING, device=backend.name,
+                              user_id=command.user_id, emotion=command.emotion, error=str(e))
+                latency = time.monotonic() - command.created
+                ACTION_DELIVERY_SECONDS.labels(backend.name).observe(latency)
+                self._count(backend.name, result, latency)
+            finally:
+                queue.task_done()
+
+    async def _drain(self):
+        while self._pending:
+            await asyncio.sleep(0.005)
+        for q in self._queues.values():
+            await q.join()
+
+    async def _shutdown(self):
+        for q in self._queues.values():
+            await q.put(None)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for backend in self.backends:
+            try:
+                await backend.close()
+            except Exception:
+                pass
+
+
+default_dispatcher = ActionDispatcher()
@@ -1,13 +1,20 @@
+from types import MappingProxyType
+
+# built once at import; read-only so callers cannot mutate the shared table
+ACTIONS = MappingProxyType({
+    "happy": "Turning on bright ambient lights 🌞",
+    "sad": "Playing your comfort playlist 🎵",
+    "angry": "Activating calm mode 🌙",
+    "fearful": "Locking doors and enabling security alert 🚨",
+    "disgust": "Activating air purifier 🌿",
+    "surprised": "Logging surprise event.",
+    "calm": "Maintaining calm environment.",
+    "neutral": "No action needed."
+})
+DEFAULT_ACTION = "No defined action."
+
 class ActionEngine:
+    actions = ACTIONS
+
     def trigger_action(self, emotion):
-        actions = {
-            "happy": "Turning on bright ambient lights 🌞",
-            "sad": "Playing your comfort playlist 🎵",
-            "angry": "Activating calm mode 🌙",
-            "fearful": "Locking doors and enabling security alert 🚨",
-            "disgust": "Activating air purifier 🌿",
-            "surprised": "Logging surprise event.",
-            "calm": "Maintaining calm environment.",
-            "neutral": "No action needed."
-        }
-        return actions.get(emotion, "No defined action.")
+        return ACTIONS.get(emotion, DEFAULT_ACTION)
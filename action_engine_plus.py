@@ -1,29 +1,42 @@
 # backend/action_engine_plus.py
-import random, os
+from types import MappingProxyType
+from backend.metrics import get_logger, log_event, LOG_SAMPLE
+
+logger = get_logger("action_engine")
+
+# Map emotion → visual scene & sound file (local or URLs); immutable, shared by every engine
+SCENES = MappingProxyType({
+    "happy":   MappingProxyType({"scene": "sunrise.gif", "sound": "happy.mp3", "message": "Turning on bright ambient lights 🌞"}),
+    "sad":     MappingProxyType({"scene": "rain.gif", "sound": "calm_piano.mp3", "message": "Playing comfort music 🎵"}),
+    "angry":   MappingProxyType({"scene": "fire.gif", "sound": "breathing.mp3", "message": "Dimming lights & suggesting breathing"}),
+    "fearful": MappingProxyType({"scene": "storm.gif", "sound": "relax_waves.mp3", "message": "Locking doors & enabling security 🚨"}),
+    "calm":    MappingProxyType({"scene": "forest.gif", "sound": "birds.mp3", "message": "Maintaining calm environment 🌿"}),
+    "neutral": MappingProxyType({"scene": "space.gif", "sound": "neutral.mp3", "message": "Neutral ambient mode"}),
+    "disgust": MappingProxyType({"scene": "clean.gif", "sound": "fresh_air.mp3", "message": "Activating purifier 🌬️"}),
+    "surprised": MappingProxyType({"scene": "spark.gif", "sound": "surprise.mp3", "message": "Capturing surprise moment ⚡"})
+})
+
+# the full response per emotion, precomputed so the request path only copies it
+RESPONSES = MappingProxyType({
+    emotion: MappingProxyType({"emotion": emotion, "message": e["message"], "scene": e["scene"], "sound": e["sound"]})
+    for emotion, e in SCENES.items()
+})
+
+
+def scene_response(emotion: str):
+    """Read-only response mapping for an emotion (unknown emotions get the neutral scene)."""
+    response = RESPONSES.get(emotion)
+    if response is None:
+        response = MappingProxyType(dict(RESPONSES["neutral"], emotion=emotion))
+    return response
+
 
 class ActionEnginePlus:
     """Extended action engine that picks visual & audio responses for each emotion."""
-    def __init__(self):
-        # Map emotion → visual scene & sound file (local or URLs)
-        self.scenes = {
-            "happy":   {"scene": "sunrise.gif", "sound": "happy.mp3", "message": "Turning on bright ambient lights 🌞"},
-            "sad":     {"scene": "rain.gif", "sound": "calm_piano.mp3", "message": "Playing comfort music 🎵"},
-            "angry":   {"scene": "fire.gif", "sound": "breathing.mp3", "message": "Dimming lights & suggesting breathing"},
-            "fearful": {"scene": "storm.gif", "sound": "relax_waves.mp3", "message": "Locking doors & enabling security 🚨"},
-            "calm":    {"scene": "forest.gif", "sound": "birds.mp3", "message": "Maintaining calm environment 🌿"},
-            "neutral": {"scene": "space.gif", "sound": "neutral.mp3", "message": "Neutral ambient mode"},
-            "disgust": {"scene": "clean.gif", "sound": "fresh_air.mp3", "message": "Activating purifier 🌬️"},
-            "surprised": {"scene": "spark.gif", "sound": "surprise.mp3", "message": "Capturing surprise moment ⚡"}
-        }
+    scenes = SCENES
 
     def get_response(self, emotion: str):
-        entry = self.scenes.get(emotion, self.scenes["neutral"])
-        # in real IoT: send command to hardware here
-        response = {
-            "emotion": emotion,
-            "message": entry["message"],
-            "scene": entry["scene"],
-            "sound": entry["sound"]
-        }
-        print(f"[ActionEngine+] Triggered: {response}")
+        # hardware commands go through backend/action_dispatcher.py, off the request path
+        response = dict(scene_response(emotion))
+        log_event(logger, "action_triggered", sample=LOG_SAMPLE, **response)
         return response
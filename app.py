@@ -32,10 +32,10 @@ def music_ui_block(j):
         return
 
     st.markdown("### 🎶 Emotion → Music")
-    music_mode = st.radio("Music Mode", ["Curated (Spotify preview)", "AI Generated (MusicGen)"], index=0)
+    music_mode = st.radio("Music Mode", ["Curated (Spotify preview)", "AI Generated (MusicGen)", "Soundtrack Library"], index=0)
     duration = st.slider("Duration (seconds, generated only)", 5, 20, 8, step=1)
     if st.button("Play Soundtrack for this emotion"):
-        mode = "curated" if music_mode.startswith("Curated") else "generated"
+        mode = {"Curated": "curated", "AI": "generated", "Soundtrack": "library"}[music_mode.split()[0]]
         try:
             resp = requests.post(
                 f"{API_ROOT}/generate_music",
@@ -202,45 +202,72 @@ elif option == "Text":
 # -----------------------------
 elif option == "History":
     st.subheader("📊 Emotion History & Analytics")
-    col1, col2 = st.columns([1, 1])
+    RANGES = {"Last hour": 3600, "Last 24 hours": 86400, "Last 7 days": 7 * 86400,
+              "Last 30 days": 30 * 86400, "Last 365 days": 365 * 86400, "All time": None}
+    col1, col2, col3 = st.columns([1, 1, 1])
     with col1:
-        limit = st.number_input("Number of recent entries", min_value=5, max_value=200, value=50, step=5)
+        range_name = st.selectbox("Time range", list(RANGES), index=2)
     with col2:
+        limit = st.number_input("Number of recent entries", min_value=5, max_value=200, value=50, step=5)
+    with col3:
         refresh = st.button("🔄 Refresh")
 
+    # aggregates are computed server-side; reruns within the TTL reuse the cached payload
+    @st.cache_data(ttl=30, show_spinner=False)
+    def fetch_analytics(user_id, since, points=200):
+        params = {"user_id": user_id, "points": points}
+        if since is not None:
+            params["since"] = since
+        r = requests.get(f"{API_ROOT}/analytics", params=params, timeout=15)
+        r.raise_for_status()
+        return r.json()
+
+    @st.cache_data(ttl=30, show_spinner=False)
+    def fetch_recent(user_id, limit):
+        r = requests.get(f"{API_ROOT}/history", params={"limit": limit, "user_id": user_id}, timeout=15)
+        r.raise_for_status()
+        return r.json().get("history", [])
+
+    if refresh:
+        fetch_analytics.clear()
+        fetch_recent.clear()
+
+    span = RANGES[range_name]
+    # round the start to the minute so reruns share a cache key
+    since = (int(datetime.now().timestamp()) // 60 * 60 - span) if span else None
     try:
-        r = requests.get(f"{API_ROOT}/history", params={"limit": limit}, timeout=15)
-        hist_data = r.json().get("history", [])
+        analytics = fetch_analytics(user, since)
     except Exception as e:
-        st.error(f"Error fetching history: {e}")
-        hist_data = []
+        st.error(f"Error fetching analytics: {e}")
+        analytics = {}
 
-    if not hist_data:
+    if not analytics.get("entries"):
         st.info("No history yet. Analyze some audio or text to populate data.")
     else:
-        df = pd.DataFrame(hist_data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
-
-        st.markdown("### 🕒 Recent Entries")
-        st.dataframe(df[['timestamp', 'input_type', 'filename', 'emotion', 'confidence', 'action']])
+        timeline = analytics["timeline"]
+        bucket_s = analytics["range"]["bucket_s"]
 
-        # Emotion timeline
-        st.markdown("### 📈 Emotion Timeline")
-        chart_df = df.copy()
-        chart_df['index'] = range(len(chart_df))
-        chart = alt.Chart(chart_df).mark_circle(size=70).encode(
+        # Emotion timeline: one point per bucket, sized by entries, colored by dominant emotion
+        st.markdown(f"### 📈 Emotion Timeline ({analytics['entries']} entries, {bucket_s}s buckets)")
+        tl = pd.DataFrame({
+            "timestamp": pd.to_datetime(timeline["ts"], unit="s"),
+            "emotion": timeline["dominant"],
+            "entries": timeline["entries"],
+            "confidence": timeline["avg_confidence"],
+            "stability": timeline["stability"],
+        })
+        chart = alt.Chart(tl).mark_circle().encode(
             x=alt.X('timestamp:T', title='Time'),
-            y=alt.Y('emotion:N', title='Emotion'),
+            y=alt.Y('emotion:N', title='Dominant emotion'),
             color='emotion:N',
-            tooltip=['timestamp:T', 'emotion:N', 'confidence', 'action']
+            size=alt.Size('entries:Q', legend=None),
+            tooltip=['timestamp:T', 'emotion:N', 'entries', 'confidence', 'stability']
         ).interactive().properties(height=300)
         st.altair_chart(chart, use_container_width=True)
 
         # Pie chart distribution
         st.markdown("### 🧩 Emotion Distribution")
-        dist = df['emotion'].value_counts().reset_index()
-        dist.columns = ['emotion', 'count']
+        dist = pd.DataFrame({"emotion": list(analytics["counts"]), "count": list(analytics["counts"].values())})
         pie = alt.Chart(dist).mark_arc().encode(
             theta=alt.Theta(field="count", type="quantitative"),
             color=alt.Color(field="emotion", type="nominal"),
@@ -250,20 +277,26 @@ elif option == "History":
 
         # Summary stats
         st.markdown("### 📊 Summary Stats")
-        most_freq = df['emotion'].mode()[0]
-        avg_conf = round(df['confidence'].astype(float).mean(), 2)
-        st.write(f"**Most frequent emotion:** {most_freq}")
-        st.write(f"**Average confidence:** {avg_conf}%")
+        st.write(f"**Most frequent emotion:** {analytics['most_frequent']}")
+        st.write(f"**Average confidence:** {analytics['avg_confidence']}%")
 
         # Stability snapshot
+        st.markdown("### 📊 Stability Snapshot")
+        st.json(analytics["stability"])
+
+        # Recent raw rows (small, cached) for the table and CSV export
         try:
-            s = requests.get(f"{API_ROOT}/stability", params={"limit": limit}, timeout=10)
-            stab = s.json().get("stability", {})
-            st.markdown("### 📊 Stability Snapshot")
-            st.json(stab)
+            hist_data = fetch_recent(user, limit)
         except Exception as e:
-            st.info("Stability endpoint unavailable yet.")
+            st.error(f"Error fetching history: {e}")
+            hist_data = []
+        if hist_data:
+            df = pd.DataFrame(hist_data)
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df = df.sort_values('timestamp')
+            st.markdown("### 🕒 Recent Entries")
+            st.dataframe(df[['timestamp', 'input_type', 'filename', 'emotion', 'confidence', 'action']])
 
-        # Download option
-        csv = df.to_csv(index=False)
-        st.download_button("⬇️ Download History CSV", csv, file_name="emotion_history.csv", mime="text/csv")
+            # Download option
+            csv = df.to_csv(index=False)
+            st.download_button("⬇️ Download History CSV", csv, file_name="emotion_history.csv", mime="text/csv")
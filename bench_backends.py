@@ -0,0 +1,79 @@
+# backend/bench_backends.py
+"""
+Benchmark: EmotionCNN inference backends (eager, fused conv+BN, TorchScript, dynamic int8,
+pure NumPy). Each backend is parity-checked against eager, then timed at several batch sizes.
+
+    python -m backend.bench_backends                    # trained weights if models/ exists
+    python -m backend.bench_backends --random --threads 1 --batch-sizes 1 8 64
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import torch
+
+from backend import inference_backends
+from backend.emotion_model import EmotionCNN, MODEL_PATH
+
+
+def _model(random_weights: bool) -> EmotionCNN:
+    model = EmotionCNN(num_classes=8)
+    if not random_weights and os.path.exists(MODEL_PATH):
+        model.load_state_dict(torch.load(MODEL_PATH, map_location="cpu"))
+    else:
+        # non-trivial BatchNorm statistics so the fusion is actually exercised
+        g = torch.Generator().manual_seed(0)
+        for bn in (model.bn1, model.bn2):
+            bn.running_mean.copy_(torch.randn(bn.num_features, generator=g) * 0.5)
+            bn.running_var.copy_(torch.rand(bn.num_features, generator=g) + 0.5)
+            bn.weight.data.copy_(torch.rand(bn.num_features, generator=g) + 0.5)
+            bn.bias.data.copy_(torch.randn(bn.num_features, generator=g) * 0.1)
+    return model.eval()
+
+
+def _median_ms(fn, X, iters):
+    fn(X)  # warm-up
+    times = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000.0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backends", nargs="+", default=list(inference_backends.BACKENDS))
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64])
+    ap.add_argument("--iters", type=int, default=200)
+    ap.add_argument("--threads", type=int, default=inference_backends.INTRA_OP_THREADS,
+                    help="torch intra-op threads (0 = torch default)")
+    ap.add_argument("--random", action="store_true", help="use random weights even if models/ exists")
+    args = ap.parse_args(argv)
+
+    inference_backends.set_intra_op_threads(args.threads)
+    model = _model(args.random)
+    rng = np.random.default_rng(1)
+    inputs = {b: rng.standard_normal((b, inference_backends.N_FEATURES)).astype(np.float32) for b in args.batch_sizes}
+    print(f"torch threads: {torch.get_num_threads()}")
+
+    header = "".join(f"{f'b={b} ms':>11}{'items/s':>10}" for b in args.batch_sizes)
+    print(f"{'backend':<12}{'max diff':>10}{'agree':>8}{header}")
+    failures = 0
+    for name in args.backends:
+        runner = inference_backends.build_backend(model, name, torch.device("cpu"))
+        parity = inference_backends.check_parity(model, runner)
+        ok = inference_backends.parity_ok(name, parity)
+        failures += not ok
+        cols = ""
+        for b, X in inputs.items():
+            ms = _median_ms(runner, X, args.iters)
+            cols += f"{ms:>11.3f}{b / ms * 1000.0:>10.0f}"
+        print(f"{name:<12}{parity['max_abs_diff']:>10.1e}{parity['argmax_agreement']:>8.3f}{cols}"
+              f"{'' if ok else '  PARITY FAIL'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# backend/bench_drift.py
+"""
+Benchmark: EmotionDriftDetector.analyze_sequence (list-of-dicts, pure Python) against
+analyze_arrays (NumPy), both from memory and end to end from a synthetic SQLite table.
+
+    python -m backend.bench_drift                       # 1k .. 1M rows
+    python -m backend.bench_drift --rows 10000 100000 --db /tmp/drift_bench.db
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+from backend import history_db
+from backend.drift_detector import EmotionDriftDetector, EMOTION_ORDER
+
+
+def _rows(n, rng):
+    codes = rng.integers(0, len(EMOTION_ORDER), n)
+    conf = rng.uniform(20, 99, n).round(2)
+    ts = 1.7e9 + np.arange(n, dtype=np.float64)
+    return codes, conf, ts
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0, out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "soulsync_drift_bench.db"))
+    args = ap.parse_args(argv)
+
+    det = EmotionDriftDetector()
+    rng = np.random.default_rng(0)
+    mismatches = 0
+
+    print(f"{'rows':>9}{'seq ms':>10}{'arrays ms':>11}{'speedup':>9}{'db+seq ms':>12}{'db+arr ms':>12}{'speedup':>9}")
+    for n in args.rows:
+        codes, conf, ts = _rows(n, rng)
+        # newest-first dicts, the shape history_db.get_history returns
+        history = [{"emotion": EMOTION_ORDER[c], "confidence": float(f), "timestamp": str(t)}
+                   for c, f, t in zip(codes[::-1].tolist(), conf[::-1].tolist(), ts[::-1].tolist())]
+        t_seq, ref = _best(lambda: det.analyze_sequence(history), args.repeat)
+        t_arr, got = _best(lambda: det.analyze_arrays(codes, conf, ts), args.repeat)
+        same = all(ref[k] == got[k] for k in ("avg_drift", "stability", "avg_confidence", "entries"))
+        same = same and len(ref["drift_events"]) == got["drift_event_count"]
+        mismatches += not same
+
+        # end to end from SQLite: fetch dicts + analyze_sequence vs fetch arrays + analyze_arrays
+        for f in (args.db, args.db + "-wal", args.db + "-shm"):
+            if os.path.exists(f):
+                os.remove(f)
+        history_db.DB_PATH = args.db
+        history_db.init_db()
+        history_db.log_predictions([("audio", "", EMOTION_ORDER[c], float(f), "") for c, f in zip(codes.tolist(), conf.tolist())])
+        history_db.flush(timeout=600)
+        t_db_seq, _ = _best(lambda: det.analyze_sequence(history_db.get_history(limit=n)), args.repeat)
+        t_db_arr, _ = _best(lambda: det.analyze_arrays(*history_db.fetch_emotion_arrays(EMOTION_ORDER, limit=n)), args.repeat)
+        history_db.close()
+
+        print(f"{n:>9}{t_seq:>10.1f}{t_arr:>11.2f}{t_seq / t_arr:>8.1f}x{t_db_seq:>12.1f}{t_db_arr:>12.1f}"
+              f"{t_db_seq / t_db_arr:>8.1f}x{'' if same else '  MISMATCH'}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
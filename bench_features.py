@@ -0,0 +1,79 @@
+# backend/bench_features.py
+"""
+Parity check + benchmark for the fast feature path (backend/feature_engine.py)
+against the original librosa.load + librosa.feature.mfcc pipeline.
+
+    python -m backend.bench_features                 # default clip set
+    python -m backend.bench_features --repeat 20 --seconds 1 5 30
+
+Exits non-zero if any clip's mean MFCC drifts from librosa by more than --atol.
+"""
+import io
+import sys
+import time
+import argparse
+import numpy as np
+
+from backend.feature_engine import FeatureEngine
+
+
+def synth_wav(seconds: float, sr: int, subtype: str = "PCM_16", channels: int = 1, seed: int = 0) -> bytes:
+    import soundfile as sf
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    # a few harmonics + noise + an amplitude envelope: something speech-ish for MFCCs
+    y = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 560, 1100, 2300)))
+    y = 0.3 * y * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t)) + 0.02 * rng.standard_normal(len(t))
+    y = np.clip(y / np.max(np.abs(y)) * 0.8, -1, 1).astype(np.float32)
+    if channels > 1:
+        y = np.stack([y, 0.5 * y], axis=1)
+    bio = io.BytesIO()
+    sf.write(bio, y, sr, subtype=subtype, format="WAV")
+    return bio.getvalue()
+
+
+def librosa_features(audio_bytes: bytes) -> np.ndarray:
+    import librosa
+    y, sr = librosa.load(io.BytesIO(audio_bytes), sr=None)
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40)
+    return np.mean(mfcc.T, axis=0)
+
+
+def _time(fn, arg, repeat: int) -> float:
+    fn(arg)  # warm-up (imports, filterbank cache)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seconds", type=float, nargs="+", default=[1.0, 3.0, 10.0])
+    ap.add_argument("--sr", type=int, nargs="+", default=[16000, 22050, 44100])
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--atol", type=float, default=1e-2, help="max abs diff per coefficient (dB units)")
+    args = ap.parse_args(argv)
+
+    engine = FeatureEngine()
+    cases = [(s, sr, "PCM_16", 1) for s in args.seconds for sr in args.sr]
+    cases += [(args.seconds[0], args.sr[0], sub, ch) for sub, ch in (("PCM_24", 1), ("FLOAT", 1), ("PCM_16", 2))]
+
+    failures = 0
+    print(f"{'clip':<28}{'max|diff|':>12}{'librosa ms':>12}{'fast ms':>10}{'speedup':>9}")
+    for seconds, sr, subtype, channels in cases:
+        wav = synth_wav(seconds, sr, subtype, channels)
+        ref = librosa_features(wav)
+        got = engine.extract(wav)
+        diff = float(np.max(np.abs(ref - got)))
+        ok = diff <= args.atol
+        failures += not ok
+        t_ref = _time(librosa_features, wav, args.repeat)
+        t_new = _time(engine.extract, wav, args.repeat)
+        label = f"{seconds:g}s {sr}Hz {subtype} ch={channels}"
+        print(f"{label:<28}{diff:>12.2e}{t_ref:>12.2f}{t_new:>10.2f}{t_ref / t_new:>8.1f}x{'' if ok else '  PARITY FAIL'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# backend/bench_stream.py
+"""
+Replay benchmark for the live /stream WebSocket: a WAV is sent as raw PCM chunks at real-time
+speed through the FastAPI TestClient, and every prediction's latency is measured from the
+moment its triggering chunk was sent until the JSON update arrived.
+
+    python -m backend.bench_stream                               # 20 s synthetic clip, 20 ms chunks
+    python -m backend.bench_stream --wav call.wav --update-ms 250 --target-ms 100
+    python -m backend.bench_stream --speed 0                     # as fast as possible
+
+Also reports how far the incremental features are from FeatureEngine.mfcc_mean on the
+same window. Exits non-zero when p95 latency is above --target-ms.
+When models/ is missing, randomly initialized weights are used (see bench_suite).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+
+def _pcm16(wav_bytes):
+    from backend.feature_engine import decode_wav
+    decoded = decode_wav(wav_bytes)
+    if decoded is None:
+        raise SystemExit("only PCM / float WAV input is supported")
+    y, sr = decoded
+    return (np.clip(y, -1, 1) * 32767).astype("<i2"), sr
+
+
+def feature_drift(y, sr, window_s):
+    """Max |incremental - mfcc_mean| over the last window of y (edge frames are the only difference)."""
+    from backend.feature_engine import default_engine
+    from backend.realtime_audio import StreamingMFCC
+    inc = StreamingMFCC(sr, window_s)
+    inc.push(y)
+    first = (inc.frames - inc.filled) * inc.hop           # first sample of the oldest frame in the ring
+    last = (inc.frames - 1) * inc.hop + inc.n_fft          # last sample of the newest frame
+    ref = default_engine.mfcc_mean(y[first:last], sr)
+    return float(np.max(np.abs(inc.features() - ref)))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--wav", help="mono/stereo PCM WAV to replay (default: synthetic)")
+    ap.add_argument("--seconds", type=float, default=20.0, help="length of the synthetic clip")
+    ap.add_argument("--chunk-ms", type=float, default=20.0)
+    ap.add_argument("--update-ms", type=float, default=500.0)
+    ap.add_argument("--window-s", type=float, default=3.0)
+    ap.add_argument("--speed", type=float, default=1.0, help="1 = real time, 0 = no pacing")
+    ap.add_argument("--target-ms", type=float, default=100.0)
+    args = ap.parse_args(argv)
+
+    from fastapi.testclient import TestClient
+    from backend.bench_features import synth_wav
+    from backend.bench_suite import prepare_artifacts
+    workdir = tempfile.mkdtemp(prefix="soulsync_stream_")
+    try:
+        prepare_artifacts(workdir)
+        from backend import history_db
+        history_db.DB_PATH = os.path.join(workdir, "history.db")
+        if args.wav:
+            with open(args.wav, "rb") as f:
+                pcm, sr = _pcm16(f.read())
+        else:
+            pcm, sr = _pcm16(synth_wav(args.seconds, 16000))
+        print(f"feature drift vs mfcc_mean: {feature_drift(pcm.astype(np.float32) / 32768.0, sr, args.window_s):.4f}")
+
+        from backend.main import app
+        from backend.router import registry
+        chunk = max(1, int(sr * args.chunk_ms / 1000.0))
+        sent_at, latencies, server_ms, silences = {}, [], [], [0]
+        with TestClient(app) as client:
+            if not registry.wait(timeout=300, names=["audio"]):
+                raise RuntimeError(f"models did not load: {registry.status()}")
+            url = f"/api/emotion/stream?sample_rate={sr}&update_ms={args.update_ms:g}&window_s={args.window_s:g}"
+            with client.websocket_connect(url) as ws:
+                json.loads(ws.receive_text())    # ready
+
+                def reader():
+                    while True:
+                        msg = json.loads(ws.receive_text())
+                        if msg["type"] == "done":
+                            return
+                        if msg["type"] == "silence":
+                            silences[0] += 1
+                            continue
+                        latencies.append((time.perf_counter() - sent_at[msg["chunk"]]) * 1000.0)
+                        server_ms.append(msg["latency_ms"])
+
+                t = threading.Thread(target=reader, daemon=True)
+                t.start()
+                start = time.perf_counter()
+                for i, pos in enumerate(range(0, len(pcm), chunk), start=1):
+                    if args.speed > 0:
+                        delay = start + pos / sr / args.speed - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    sent_at[i] = time.perf_counter()
+                    ws.send_bytes(pcm[pos:pos + chunk].tobytes())
+                ws.send_text("stop")
+                t.join(timeout=30)
+                wall = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if not latencies:
+        print("no predictions (all silence?)")
+        return 1
+    lat = np.sort(np.array(latencies))
+    p95 = float(lat[int(0.95 * (len(lat) - 1))])
+    print(f"audio {len(pcm) / sr:.1f}s replayed in {wall:.1f}s, {len(lat)} updates, {silences[0]} silent")
+    print(f"end-to-end ms   p50 {np.median(lat):8.2f}   p95 {p95:8.2f}   max {lat[-1]:8.2f}")
+    print(f"server ms       p50 {np.median(server_ms):8.2f}   max {max(server_ms):8.2f}")
+    if p95 > args.target_ms:
+        print(f"p95 {p95:.1f} ms is above the {args.target_ms:g} ms target")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
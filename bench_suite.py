@@ -0,0 +1,251 @@
+# backend/bench_suite.py
+"""
+Regression benchmark for the emotion pipeline hot paths. Every stage is timed separately:
+
+  features.extract     EmotionModel.extract_features on synthetic WAVs (length x sample rate)
+  scaler.transform     feature scaler at several batch sizes
+  cnn.forward          EmotionCNN through the configured inference backend, several batch sizes
+  history.*            log_prediction / log_predictions / get_history on 10k .. 1M row tables
+  drift.analyze        EmotionDriftDetector.analyze_sequence at increasing window sizes
+  e2e.analyze_audio    POST /api/emotion/analyze_audio through the FastAPI TestClient
+  e2e.analyze_audio_long  POST /api/emotion/analyze_audio_long, a clip that is not a whole number of
+                       windows (feature pool path, shorter trailing window)
+
+    python -m backend.bench_suite                                   # quick profile -> bench_results.json
+    python -m backend.bench_suite --profile full --out full.json
+    python -m backend.bench_suite --save-baseline bench_baseline.json
+    python -m backend.bench_suite --baseline bench_baseline.json --threshold 0.25
+
+With --baseline, exits non-zero when a stage is slower than the baseline by more than
+--threshold (relative) and --min-delta-ms (absolute, to ignore timer noise on tiny stages).
+When models/ is missing, randomly initialized weights and a fitted-on-noise scaler are used.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import numpy as np
+
+PROFILES = {
+    "quick": {"seconds": [1.0, 3.0], "sr": [16000], "batches": [1, 8, 64], "rows": [10000],
+              "windows": [50, 500, 5000], "e2e_requests": 20, "repeat": 20},
+    "full": {"seconds": [1.0, 3.0, 10.0], "sr": [16000, 22050, 44100], "batches": [1, 8, 32, 64, 256],
+             "rows": [10000, 100000, 1000000], "windows": [50, 500, 5000, 50000], "e2e_requests": 100, "repeat": 50},
+}
+
+
+def _measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    times.sort()
+    return {"ms": round(float(np.median(times)), 4), "p90_ms": round(times[int(0.9 * (len(times) - 1))], 4),
+            "n": repeat}
+
+
+def _once(fn):
+    start = time.perf_counter()
+    fn()
+    return {"ms": round((time.perf_counter() - start) * 1000.0, 3), "p90_ms": None, "n": 1}
+
+
+def prepare_artifacts(workdir):
+    """Point emotion_model at models/ if present, else at random weights + preprocessors in workdir."""
+    import torch
+    import joblib
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from backend import emotion_model
+    if all(os.path.exists(p) for p in (emotion_model.MODEL_PATH, emotion_model.SCALER_PATH,
+                                       emotion_model.LABEL_ENCODER_PATH)):
+        return False
+    torch.manual_seed(0)
+    paths = {name: os.path.join(workdir, name) for name in ("emotion_model.pth", "feature_scaler.pkl", "label_encoder.pkl")}
+    torch.save(emotion_model.EmotionCNN(num_classes=8).state_dict(), paths["emotion_model.pth"])
+    rng = np.random.default_rng(0)
+    joblib.dump(StandardScaler().fit(rng.normal(0, 20, (512, 40))), paths["feature_scaler.pkl"])
+    joblib.dump(LabelEncoder().fit(["angry", "calm", "disgust", "fearful", "happy", "neutral", "sad", "surprised"]),
+                paths["label_encoder.pkl"])
+    emotion_model.MODEL_PATH = paths["emotion_model.pth"]
+    emotion_model.SCALER_PATH = paths["feature_scaler.pkl"]
+    emotion_model.LABEL_ENCODER_PATH = paths["label_encoder.pkl"]
+    return True
+
+
+def bench_model(cfg, results):
+    from backend.bench_features import synth_wav
+    from backend.emotion_model import EmotionModel, extract_features
+    model = EmotionModel(load=True)
+    repeat = cfg["repeat"]
+    for sr in cfg["sr"]:
+        for seconds in cfg["seconds"]:
+            wav = synth_wav(seconds, sr)
+            results[f"features.extract[{seconds:g}s@{sr}]"] = _measure(lambda: extract_features(wav), repeat)
+    rng = np.random.default_rng(0)
+    for b in cfg["batches"]:
+        X = rng.normal(0, 20, (b, 40))
+        results[f"scaler.transform[b={b}]"] = _measure(lambda: model.scaler.transform(X), repeat * 5)
+        Xs = model.scaler.transform(X).astype(np.float32)
+        results[f"cnn.forward[b={b}]"] = _measure(lambda: model.runner(Xs), repeat * 5)
+        feats = list(X)
+        results[f"predict_batch[b={b}]"] = _measure(lambda: model.predict_batch(feats), repeat * 5)
+    return model.backend
+
+
+def bench_history(cfg, results, workdir):
+    from backend import history_db
+    from backend.drift_detector import EMOTION_ORDER
+    rng = np.random.default_rng(0)
+    for n in cfg["rows"]:
+        history_db.close()
+        history_db.DB_PATH = os.path.join(workdir, f"history_{n}.db")
+        history_db.init_db()
+        emotions = [EMOTION_ORDER[i] for i in rng.integers(0, len(EMOTION_ORDER), n)]
+        conf = rng.uniform(20, 99, n).round(2).tolist()
+        users = [f"user{(i // 1000) % 50}" for i in range(n)]   # 1k-row runs per user, 50 users
+
+        def bulk():
+            for start in range(0, n, 1000):
+                rows = [("audio", "", emotions[i], conf[i], "") for i in range(start, min(n, start + 1000))]
+                history_db.log_predictions(rows, user_id=users[start])
+            history_db.flush(timeout=600)
+        results[f"history.log_predictions[rows={n}]"] = _once(bulk)
+
+        def singles():
+            for i in range(1000):
+                history_db.log_prediction("audio", "", emotions[i], conf[i], "", user_id=users[i])
+            history_db.flush(timeout=60)
+        results[f"history.log_prediction_x1000[rows={n}]"] = _once(singles)
+        repeat = cfg["repeat"]
+        results[f"history.get_history[rows={n},limit=50]"] = _measure(lambda: history_db.get_history(limit=50), repeat)
+        results[f"history.get_history[rows={n},limit=50,user]"] = _measure(
+            lambda: history_db.get_history(limit=50, user_id="user7"), repeat)
+        results[f"history.get_history[rows={n},limit=1000]"] = _measure(
+            lambda: history_db.get_history(limit=1000), max(3, repeat // 4))
+    history_db.close()
+
+
+def bench_drift(cfg, results):
+    from backend.drift_detector import EmotionDriftDetector, EMOTION_ORDER
+    det = EmotionDriftDetector()
+    rng = np.random.default_rng(0)
+    for w in cfg["windows"]:
+        history = [{"emotion": EMOTION_ORDER[c], "confidence": float(f), "timestamp": str(1.7e9 - i)}
+                   for i, (c, f) in enumerate(zip(rng.integers(0, 8, w).tolist(), rng.uniform(20, 99, w).tolist()))]
+        results[f"drift.analyze_sequence[window={w}]"] = _measure(lambda: det.analyze_sequence(history),
+                                                                  max(3, cfg["repeat"] // (1 + w // 5000)))
+
+
+def bench_e2e(cfg, results, workdir):
+    from fastapi.testclient import TestClient
+    from backend.bench_features import synth_wav
+    from backend import history_db
+    history_db.DB_PATH = os.path.join(workdir, "history_e2e.db")
+    from backend.main import app
+    from backend.router import registry
+    wavs = [synth_wav(2.0, 16000, seed=i) for i in range(cfg["e2e_requests"] + 1)]
+    with TestClient(app) as client:
+        if not registry.wait(timeout=300, names=["audio", "feature_pool"]):
+            raise RuntimeError(f"models did not load: {registry.status()}")
+        it = iter(wavs)
+
+        def post(data):
+            r = client.post("/api/emotion/analyze_audio", files={"file": ("clip.wav", data, "audio/wav")})
+            r.raise_for_status()
+        results["e2e.analyze_audio"] = _measure(lambda: post(next(it)), cfg["e2e_requests"])
+        results["e2e.analyze_audio.cached"] = _measure(lambda: post(wavs[0]), cfg["e2e_requests"])
+
+        long_wav = synth_wav(31.3, 16000)
+
+        def post_long():
+            r = client.post("/api/emotion/analyze_audio_long", files={"file": ("long.wav", long_wav, "audio/wav")})
+            r.raise_for_status()
+            if r.json()["windows"] < 20:
+                raise RuntimeError(f"unexpected long-audio result {r.json()}")
+        results["e2e.analyze_audio_long[31.3s]"] = _measure(post_long, max(3, cfg["e2e_requests"] // 10))
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Returns the list of regressed stage names and prints a comparison table."""
+    regressions = []
+    print(f"\n{'stage':<52}{'baseline':>11}{'current':>11}{'change':>9}")
+    for name, cur in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            print(f"{name:<52}{'-':>11}{cur['ms']:>11.3f}{'new':>9}")
+            continue
+        change = cur["ms"] / base["ms"] - 1.0 if base["ms"] else 0.0
+        bad = change > threshold and cur["ms"] - base["ms"] > min_delta_ms
+        regressions += [name] if bad else []
+        print(f"{name:<52}{base['ms']:>11.3f}{cur['ms']:>11.3f}{change:>+8.0%}{'  REGRESSION' if bad else ''}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    ap.add_argument("--stages", nargs="+", default=["model", "history", "drift", "e2e"],
+                    choices=["model", "history", "drift", "e2e"])
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", help="compare against this results file")
+    ap.add_argument("--save-baseline", help="also write the results here")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown per stage")
+    ap.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = ap.parse_args(argv)
+
+    cfg = PROFILES[args.profile]
+    workdir = tempfile.mkdtemp(prefix="soulsync_bench_")
+    stages = {}
+    try:
+        random_weights = prepare_artifacts(workdir)
+        backend_name = None
+        for stage in args.stages:
+            start = time.perf_counter()
+            if stage == "model":
+                backend_name = bench_model(cfg, stages)
+            elif stage == "history":
+                bench_history(cfg, stages, workdir)
+            elif stage == "drift":
+                bench_drift(cfg, stages)
+            else:
+                bench_e2e(cfg, stages, workdir)
+            print(f"  {stage} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    import torch
+    results = {
+        "meta": {"profile": args.profile, "created": time.time(), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpu_count": os.cpu_count(), "numpy": np.__version__,
+                 "torch": torch.__version__, "torch_threads": torch.get_num_threads(),
+                 "inference_backend": backend_name, "random_weights": random_weights},
+        "stages": stages,
+    }
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        return 0
+    print(f"\n{'stage':<52}{'median ms':>11}{'p90 ms':>11}")
+    for name, r in stages.items():
+        p90 = f"{r['p90_ms']:>11.3f}" if r["p90_ms"] is not None else f"{'-':>11}"
+        print(f"{name:<52}{r['ms']:>11.3f}{p90}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
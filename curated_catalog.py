@@ -0,0 +1,242 @@
+# backend/curated_catalog.py
+import os
+import time
+import base64
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from backend.music_service import CURATED_QUERIES
+from backend.metrics import get_logger, log_event
+
+# spotipy is optional: without it the two REST calls are made directly
+try:
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+    SPOTIPY_AVAILABLE = True
+except Exception:
+    SPOTIPY_AVAILABLE = False
+
+# point both at backend/stub_catalog.py to run without network access
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com/v1")
+SPOTIFY_ACCOUNTS_BASE = os.getenv("SPOTIFY_ACCOUNTS_BASE", "https://accounts.spotify.com")
+CATALOG_TTL_S = float(os.getenv("SOULSYNC_CATALOG_TTL_S", "3600"))
+CATALOG_MAX_STALE_S = float(os.getenv("SOULSYNC_CATALOG_MAX_STALE_S", "86400"))
+CATALOG_POOL_SIZE = int(os.getenv("SOULSYNC_CATALOG_POOL_SIZE", "8"))
+CATALOG_TIMEOUT_S = float(os.getenv("SOULSYNC_CATALOG_TIMEOUT_S", "5"))
+SEARCH_LIMIT = 10
+
+logger = get_logger("curated_catalog")
+
+
+def pooled_session(pool_size: int = CATALOG_POOL_SIZE) -> requests.Session:
+    """Keep-alive session with a bounded connection pool and retries on 429 / 5xx."""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({"GET", "POST"}))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SpotifySearchClient:
+    """
+    One long-lived Spotify client (Client Credentials flow) over a pooled session.
+    Uses spotipy when it is installed; otherwise talks to the two REST endpoints it needs directly.
+    """
+
+    def __init__(self, client_id: str = None, client_secret: str = None, api_base: str = SPOTIFY_API_BASE,
+                 accounts_base: str = SPOTIFY_ACCOUNTS_BASE, timeout: float = CATALOG_TIMEOUT_S,
+                 session: requests.Session = None):
+        self.client_id = client_id or os.getenv("SPOTIFY_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("SPOTIFY_CLIENT_SECRET")
+        if not (self.client_id and self.client_secret):
+            raise RuntimeError("Spotify credentials not set (SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET)")
+        self.api_base = api_base.rstrip("/")
+        self.token_url = accounts_base.rstrip("/") + "/api/token"
+        self.timeout = timeout
+        self.session = session or pooled_session()
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+        self._sp = None
+        if SPOTIPY_AVAILABLE:
+            auth = SpotifyClientCredentials(client_id=self.client_id, client_secret=self.client_secret,
+                                            requests_session=self.session, requests_timeout=timeout)
+            auth.OAUTH_TOKEN_URL = self.token_url
+            self._sp = spotipy.Spotify(auth_manager=auth, requests_session=self.session, requests_timeout=timeout)
+            self._sp.prefix = self.api_base + "/"
+
+    def search_tracks(self, query: str, limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        if self._sp is not None:
+            res = self._sp.search(query, type="track", limit=limit)
+        else:
+            resp = self.session.get(f"{self.api_base}/search", params={"q": query, "type": "track", "limit": limit},
+                                    headers={"Authorization": f"Bearer {self._access_token()}"}, timeout=self.timeout)
+            resp.raise_for_status()
+            res = resp.json()
+        return res.get("tracks", {}).get("items", [])
+
+    def _access_token(self) -> str:
+        with self._token_lock:
+            if self._token is None or time.time() >= self._token_expires - 60:
+                basic = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+                resp = self.session.post(self.token_url, data={"grant_type": "client_credentials"},
+                                         headers={"Authorization": f"Basic {basic}"}, timeout=self.timeout)
+                resp.raise_for_status()
+                body = resp.json()
+                self._token = body["access_token"]
+                self._token_expires = time.time() + float(body.get("expires_in", 3600))
+            return self._token
+
+
+def pick_track_url(tracks: List[Dict[str, Any]]) -> Optional[str]:
+    # prefer a 30s preview; fall back to the first track's Spotify page
+    for t in tracks:
+        if t.get("preview_url"):
+            return t["preview_url"]
+    if tracks:
+        return tracks[0].get("external_urls", {}).get("spotify")
+    return None
+
+
+class CuratedCatalog:
+    """
+    Per-query cache of Spotify search results with stale-while-revalidate.
+
+    A fresh entry (younger than ttl_s) is served directly. An expired entry younger than
+    max_stale_s is still served, and one background refresh is started for it. Entries that are
+    missing or too old are fetched inline; concurrent callers share that fetch. When a refresh
+    fails, the old tracks stay in place until max_stale_s.
+    """
+
+    def __init__(self, client_factory=SpotifySearchClient, queries: Dict[str, str] = CURATED_QUERIES,
+                 ttl_s: float = CATALOG_TTL_S, max_stale_s: float = CATALOG_MAX_STALE_S):
+        self.client_factory = client_factory
+        self.queries = dict(queries)
+        self.ttl_s = ttl_s
+        self.max_stale_s = max(ttl_s, max_stale_s)
+        self._client = None
+        self._lock = threading.Lock()
+        self._entries: Dict[str, tuple] = {}        # query -> (fetched_at, tracks)
+        self._inflight: Dict[str, Future] = {}
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="catalog")
+        self._latencies = deque(maxlen=256)
+        self.hits = self.stale_hits = self.misses = 0
+        self.refreshes = self.upstream_calls = self.upstream_errors = 0
+
+    # ---------- public API ----------
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            return self._client
+
+    def query_for(self, emotion: str) -> str:
+        return self.queries.get((emotion or "neutral").lower(), self.queries["neutral"])
+
+    def tracks(self, emotion: str) -> List[Dict[str, Any]]:
+        query = self.query_for(emotion)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(query)
+            age = now - entry[0] if entry is not None else None
+            if age is not None and age < self.ttl_s:
+                self.hits += 1
+                return entry[1]
+            if age is not None and age < self.max_stale_s:
+                self.stale_hits += 1
+                self._refresh_locked(query, background=True)
+                return entry[1]
+            self.misses += 1
+            fut, lead = self._refresh_locked(query, background=False)
+        if lead:
+            self._fetch(query, fut)
+        return fut.result()
+
+    def lookup(self, emotion: str) -> Optional[str]:
+        """Preview URL (or Spotify track URL) for the emotion's curated query."""
+        return pick_track_url(self.tracks(emotion))
+
+    def prefetch(self, emotions=None, wait: bool = False):
+        """Warm every curated query in the background (all eight emotions by default)."""
+        futures = []
+        with self._lock:
+            for emotion in (emotions or list(self.queries)):
+                futures.append(self._refresh_locked(self.query_for(emotion), background=True)[0])
+        if wait:
+            for fut in futures:
+                try:
+                    fut.result()
+                except Exception:
+                    pass
+        return futures
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            lat = sorted(self._latencies)
+            served = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": {q: round(now - e[0], 1) for q, e in self._entries.items()},   # query -> age s
+                "ttl_s": self.ttl_s, "max_stale_s": self.max_stale_s,
+                "hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / served, 4) if served else 0.0,
+                "refreshes": self.refreshes, "inflight": len(self._inflight),
+                "upstream_calls": self.upstream_calls, "upstream_errors": self.upstream_errors,
+                "upstream_ms_avg": round(sum(lat) / len(lat), 2) if lat else 0.0,
+                "upstream_ms_p50": round(lat[len(lat) // 2], 2) if lat else 0.0,
+                "upstream_ms_max": round(lat[-1], 2) if lat else 0.0,
+            }
+
+    # ---------- internals ----------
+    def _refresh_locked(self, query: str, background: bool):
+        """Single flight per query (caller holds self._lock). Returns (future, caller_must_fetch)."""
+        fut = self._inflight.get(query)
+        if fut is not None:
+            return fut, False
+        fut = self._inflight[query] = Future()
+        if background:
+            self.refreshes += 1
+            self._pool.submit(self._fetch, query, fut)
+        return fut, not background
+
+    def _fetch(self, query: str, fut: Future):
+        start = time.perf_counter()
+        try:
+            tracks = self.client.search_tracks(query)
+        except Exception as e:
+            with self._lock:
+                self.upstream_errors += 1
+                self._inflight.pop(query, None)
+                entry = self._entries.get(query)
+            if entry is not None and time.time() - entry[0] < self.max_stale_s:
+                fut.set_result(entry[1])     # stale-if-error
+            else:
+                log_event(logger, "catalog_lookup_failed", logging.WARNING, query=query, error=str(e))
+                fut.set_exception(e)
+            return
+        with self._lock:
+            self.upstream_calls += 1
+            self._latencies.append((time.perf_counter() - start) * 1000.0)
+            self._entries[query] = (time.time(), tracks)
+            self._inflight.pop(query, None)
+        fut.set_result(tracks)
+
+
+default_catalog = CuratedCatalog()
@@ -1,6 +1,14 @@
 # backend/drift_detector.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from collections import deque, OrderedDict
+import os
 import math
+import threading
+import numpy as np
+
+# per-user online states kept in memory; the least recently used user is evicted (and
+# re-seeded from history_db if they come back)
+DRIFT_MAX_USERS = int(os.getenv("SOULSYNC_DRIFT_MAX_USERS", "10000"))
 
 # A canonical ordering of emotions — used only to compute a simple numeric "distance".
 # You can reorder to better reflect semantic similarity if you prefer.
@@ -86,3 +94,202 @@ class EmotionDriftDetector:
             "avg_confidence": round(avg_confidence, 2),
             "entries": len(rows)
         }
+
+    def analyze_arrays(self, codes, confidences, ts=None, window: int = 50,
+                       max_points: int = 500, max_events: int = 100) -> Dict[str, Any]:
+        """
+        NumPy path for large windows. Inputs are oldest-first arrays of emotion indices
+        (EMOTION_ORDER positions), confidences and optional epoch timestamps.
+        Returns the analyze_sequence aggregates plus:
+          - "drift_event_count" and the newest `max_events` events
+          - "series": rolling-window stability (0-100) over `window` transitions,
+            downsampled to at most `max_points` points
+          - "transitions": K x K count matrix, rows = from, cols = to (EMOTION_ORDER order)
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        n = len(codes)
+        k = len(EMOTION_ORDER)
+        max_possible = max(1, k - 1)
+        if n == 0:
+            return {"avg_drift": 0.0, "stability": 100.0, "drift_events": [], "drift_event_count": 0,
+                    "avg_confidence": 0.0, "entries": 0, "window": window, "series": {"ts": [], "stability": []},
+                    "transitions": [[0] * k for _ in range(k)], "labels": EMOTION_ORDER}
+
+        mags = np.abs(np.diff(codes))
+        avg_drift = float(mags.mean()) if len(mags) else 0.0
+        event_idx = np.flatnonzero(mags >= self.drift_threshold)
+        recent = event_idx[-max_events:] if max_events else event_idx[:0]
+        events = [{
+            "from": EMOTION_ORDER[codes[i]],
+            "to": EMOTION_ORDER[codes[i + 1]],
+            "ts_from": float(ts[i]) if ts is not None else None,
+            "ts_to": float(ts[i + 1]) if ts is not None else None,
+            "magnitude": int(mags[i]),
+        } for i in recent.tolist()]
+
+        # rolling mean drift over `window` transitions via a cumulative sum (O(n))
+        w = max(1, min(window, len(mags))) if len(mags) else 1
+        series_ts, series_val = [], []
+        if len(mags):
+            csum = np.concatenate(([0.0], np.cumsum(mags, dtype=np.float64)))
+            rolling = (csum[w:] - csum[:-w]) / w
+            stab = np.clip(100.0 * (1.0 - rolling / max_possible), 0.0, 100.0)
+            step = max(1, int(np.ceil(len(stab) / max_points))) if max_points else 1
+            pick = np.arange(len(stab) - 1, -1, -step)[::-1]   # always keep the newest point
+            series_val = np.round(stab[pick], 2).tolist()
+            if ts is not None:
+                series_ts = np.asarray(ts, dtype=np.float64)[pick + w].tolist()
+            else:
+                series_ts = (pick + w).tolist()
+
+        transitions = np.bincount(codes[:-1] * k + codes[1:], minlength=k * k).reshape(k, k)
+
+        return {
+            "avg_drift": round(avg_drift, 3),
+            "stability": round(max(0.0, 100.0 * (1.0 - avg_drift / max_possible)), 2),
+            "drift_events": events,
+            "drift_event_count": int(len(event_idx)),
+            "avg_confidence": round(float(confidences.mean()), 2),
+            "entries": n,
+            "window": w,
+            "series": {"ts": series_ts, "stability": series_val},
+            "transitions": transitions.tolist(),
+            "labels": EMOTION_ORDER,
+        }
+
+
+class _UserDriftState:
+    __slots__ = ("last_emotion", "last_confidence", "last_ts", "drift_sum", "drift_count",
+                 "ewma_drift", "entries", "conf_mean", "conf_m2", "events")
+
+    def __init__(self, max_events: int):
+        self.last_emotion = None
+        self.last_confidence = None
+        self.last_ts = None
+        self.drift_sum = 0.0
+        self.drift_count = 0
+        self.ewma_drift = 0.0
+        self.entries = 0
+        self.conf_mean = 0.0
+        self.conf_m2 = 0.0
+        self.events = deque(maxlen=max_events)
+
+
+class OnlineDriftDetector:
+    """
+    Streaming counterpart of EmotionDriftDetector: keeps per-user running state
+    (last emotion, drift sum/count, an exponentially weighted drift -> stability score,
+    Welford confidence mean/std and the most recent drift events) and updates it in O(1)
+    per prediction, so alerts can be returned inline and /stability never rescans history.
+    """
+
+    def __init__(self, drift_threshold: int = 2, alpha: float = 0.2, max_events: int = 20,
+                 max_users: int = DRIFT_MAX_USERS):
+        """
+        alpha: weight of the newest transition in the EWMA drift (higher = reacts faster).
+        max_events: how many recent drift events to keep per user.
+        max_users: LRU bound on the number of per-user states.
+        """
+        self.drift_threshold = drift_threshold
+        self.alpha = alpha
+        self.max_events = max_events
+        self.max_users = max(1, int(max_users))
+        self._states: "OrderedDict[str, _UserDriftState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @staticmethod
+    def tracks(emotion: str) -> bool:
+        """Only labels on the EMOTION_ORDER scale take part (text sentiment labels do not)."""
+        return emotion in _emotion_to_idx
+
+    def update(self, user_id: str, emotion: str, confidence: float, timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """Fold one prediction into the user's state. Returns the drift_alert dict for the response."""
+        with self._lock:
+            st = self._states.get(user_id)
+            if st is None:
+                st = self._install_locked(user_id, _UserDriftState(self.max_events))
+            else:
+                self._states.move_to_end(user_id)
+            return self._fold(st, emotion, confidence, timestamp)
+
+    def seed(self, user_id: str, history: List[Dict[str, Any]]) -> bool:
+        """
+        Replay stored rows (newest-first, as history_db returns them) into a fresh state.
+        The user counts as known afterwards even when history is empty. A state created
+        meanwhile by update() or another seed() wins; returns False in that case.
+        """
+        st = _UserDriftState(self.max_events)
+        for r in reversed(history):
+            emotion = r.get("emotion", "neutral")
+            if self.tracks(emotion):
+                self._fold(st, emotion, r.get("confidence"), r.get("timestamp"))
+        with self._lock:
+            if user_id in self._states:
+                return False
+            self._install_locked(user_id, st)
+            return True
+
+    def _install_locked(self, user_id: str, st: _UserDriftState) -> _UserDriftState:
+        self._states[user_id] = st
+        if len(self._states) > self.max_users:
+            self._states.popitem(last=False)
+            self.evictions += 1
+        return st
+
+    def _fold(self, st: _UserDriftState, emotion: str, confidence: float, timestamp: Optional[str]) -> Dict[str, Any]:
+        confidence = float(confidence or 0)
+        alert = {"alert": False, "message": "Minor or no emotional change detected."}
+        if st.last_emotion is not None:
+            mag = abs(_emotion_to_idx.get(emotion, 0) - _emotion_to_idx.get(st.last_emotion, 0))
+            st.drift_sum += mag
+            st.drift_count += 1
+            st.ewma_drift = mag if st.drift_count == 1 else self.alpha * mag + (1 - self.alpha) * st.ewma_drift
+            if mag >= self.drift_threshold:
+                event = {
+                    "from": st.last_emotion,
+                    "to": emotion,
+                    "ts_from": st.last_ts,
+                    "ts_to": timestamp,
+                    "magnitude": mag,
+                    "confidence_from": st.last_confidence,
+                    "confidence_to": confidence,
+                }
+                st.events.append(event)
+                alert = dict(event, alert=True,
+                             message=f"Emotional drift detected: {st.last_emotion} → {emotion} (magnitude {mag}).")
+        # Welford running mean / variance of confidence
+        st.entries += 1
+        delta = confidence - st.conf_mean
+        st.conf_mean += delta / st.entries
+        st.conf_m2 += delta * (confidence - st.conf_mean)
+        st.last_emotion, st.last_confidence, st.last_ts = emotion, confidence, timestamp
+        return alert
+
+    def known(self, user_id: str) -> bool:
+        return user_id in self._states
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"users": len(self._states), "max_users": self.max_users, "evictions": self.evictions}
+
+    def snapshot(self, user_id: str) -> Dict[str, Any]:
+        """Same keys as EmotionDriftDetector.analyze_sequence, plus the running extras."""
+        max_possible = max(1, len(EMOTION_ORDER) - 1)
+        with self._lock:
+            st = self._states.get(user_id)
+            if st is None or st.entries == 0:
+                return {"avg_drift": 0.0, "stability": 100.0, "drift_events": [], "avg_confidence": 0.0,
+                        "entries": 0, "ewma_stability": 100.0, "confidence_std": 0.0, "last_emotion": None}
+            avg_drift = st.drift_sum / st.drift_count if st.drift_count else 0.0
+            return {
+                "avg_drift": round(avg_drift, 3),
+                "stability": round(max(0.0, 100.0 * (1.0 - avg_drift / max_possible)), 2),
+                "drift_events": list(st.events),
+                "avg_confidence": round(st.conf_mean, 2),
+                "entries": st.entries,
+                "ewma_stability": round(max(0.0, 100.0 * (1.0 - st.ewma_drift / max_possible)), 2),
+                "confidence_std": round(math.sqrt(st.conf_m2 / st.entries), 2),
+                "last_emotion": st.last_emotion,
+            }
@@ -1,13 +1,43 @@
-import os, io
+import os
+import time
+import logging
 import torch
 import torch.nn as nn
 import numpy as np
-import librosa, joblib
+import joblib
+from backend.feature_engine import default_engine as feature_engine
+from backend import inference_backends
+from backend.metrics import get_logger, log_event, LOG_SAMPLE, BATCH_STAGE_SECONDS, BATCH_SIZE
+
+logger = get_logger("emotion_model")
+_scale_timer = BATCH_STAGE_SECONDS.labels("scale", "audio_cnn")
+_forward_timer = BATCH_STAGE_SECONDS.labels("forward", "audio_cnn")
+_label_timer = BATCH_STAGE_SECONDS.labels("label_decode", "audio_cnn")
+_batch_size = BATCH_SIZE.labels("audio_cnn")
 
 MODEL_PATH = "models/emotion_model.pth"
 LABEL_ENCODER_PATH = "models/label_encoder.pkl"
 SCALER_PATH = "models/feature_scaler.pkl"
 
+def extract_features(audio_bytes):
+    """Module-level so it can be shipped to a process pool (see backend/executors.py)."""
+    return extract_features_timed(audio_bytes)[0]
+
+def extract_features_timed(audio_bytes):
+    """(features, {"decode": s, "mfcc": s}); the pool worker's timings travel back with the result."""
+    timings = {}
+    try:
+        # PCM WAV is decoded in-place with NumPy; other formats fall back to librosa.load
+        t0 = time.perf_counter()
+        y, sr = feature_engine.load(audio_bytes)
+        t1 = time.perf_counter()
+        features = feature_engine.mfcc_mean(y, sr)
+        timings = {"decode": t1 - t0, "mfcc": time.perf_counter() - t1}
+        return features, timings
+    except Exception as e:
+        log_event(logger, "feature_extraction_failed", logging.WARNING, error=str(e), bytes=len(audio_bytes))
+        return np.zeros(40), timings
+
 class EmotionCNN(nn.Module):
     def __init__(self, num_classes=8):
         super().__init__()
@@ -29,38 +59,73 @@ class EmotionCNN(nn.Module):
         return self.fc2(x)
 
 class EmotionModel:
-    def __init__(self):
+    def __init__(self, load=True):
+        """load=False builds an empty shell; call load_weights() / load_preprocessors() later
+        (the model registry runs them in parallel in the background)."""
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model = EmotionCNN(num_classes=8).to(self.device)
+        self.model = None
+        self.label_encoder = None
+        self.scaler = None
+        self.runner = None          # scaled features -> logits, see backend/inference_backends.py
+        self.backend = None
+        self.backend_parity = None
+        if load:
+            self.load_weights()
+            self.load_preprocessors()
+            log_event(logger, "emotion_model_loaded", backend=self.backend)
+
+    def load_weights(self):
         if not os.path.exists(MODEL_PATH):
             raise FileNotFoundError("Model file missing. Run train_emotion_model.py first.")
-        self.model.load_state_dict(torch.load(MODEL_PATH, map_location=self.device))
-        self.model.eval()
+        model = EmotionCNN(num_classes=8).to(self.device)
+        model.load_state_dict(torch.load(MODEL_PATH, map_location=self.device))
+        model.eval()
+        self.model = model
+        self.select_backend(inference_backends.INFER_BACKEND)
+        return model
+
+    def select_backend(self, name):
+        """Build the requested inference backend; fall back to eager if it fails the parity check."""
+        inference_backends.set_intra_op_threads()
+        try:
+            runner = inference_backends.build_backend(self.model, name, self.device)
+            parity = inference_backends.check_parity(self.model, runner)
+            if not inference_backends.parity_ok(name, parity):
+                raise ValueError(f"parity check failed {parity}")
+        except Exception as e:
+            if name == "eager":
+                raise
+            log_event(logger, "inference_backend_fallback", logging.WARNING, requested=name, error=str(e))
+            return self.select_backend("eager")
+        self.runner, self.backend, self.backend_parity = runner, name, parity
+        return runner
+
+    def load_preprocessors(self):
         self.label_encoder = joblib.load(LABEL_ENCODER_PATH)
         self.scaler = joblib.load(SCALER_PATH)
-        print("✅ Emotion model loaded successfully")
+        return self.scaler, self.label_encoder
 
     def extract_features(self, audio_bytes):
-        try:
-            stream = io.BytesIO(audio_bytes)
-            y, sr = librosa.load(stream, sr=None)
-            if len(y) == 0:
-                raise ValueError("Empty audio.")
-            mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40)
-            return np.mean(mfcc.T, axis=0)
-        except Exception as e:
-            print(f"❌ Feature extraction error: {e}")
-            return np.zeros(40)
+        return extract_features(audio_bytes)
+
+    def predict_batch(self, features_list):
+        """Score a list of 40-dim feature vectors with one scaler pass and one forward pass."""
+        if len(features_list) == 0:
+            return []
+        _batch_size.observe(len(features_list))
+        with _scale_timer.time():
+            X_scaled = self.scaler.transform(np.vstack(features_list)).astype(np.float32)
+        with _forward_timer.time():
+            logits = self.runner(X_scaled)
+            pred = logits.argmax(axis=1)
+            # softmax probability of the argmax class: 1 / sum(exp(logit - max_logit))
+            confidences = 1.0 / np.exp(logits - logits.max(axis=1, keepdims=True)).sum(axis=1)
+        with _label_timer.time():
+            emotions = self.label_encoder.inverse_transform(pred)
+        return [(str(e), round(float(c) * 100, 2)) for e, c in zip(emotions, confidences)]
 
     def predict_audio(self, audio_bytes):
         features = self.extract_features(audio_bytes)
-        X_scaled = self.scaler.transform([features])
-        X_tensor = torch.tensor(X_scaled, dtype=torch.float32).to(self.device)
-        with torch.no_grad():
-            out = self.model(X_tensor)
-            probs = torch.softmax(out, dim=1)
-            conf, pred = torch.max(probs, dim=1)
-        emotion = self.label_encoder.inverse_transform(pred.cpu().numpy())[0]
-        confidence = round(float(conf.cpu().numpy()) * 100, 2)
-        print(f"🎯 Predicted: {emotion} ({confidence}%)")
+        emotion, confidence = self.predict_batch([features])[0]
+        log_event(logger, "prediction", sample=LOG_SAMPLE, input_type="audio", emotion=emotion, confidence=confidence)
         return emotion, confidence
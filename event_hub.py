@@ -0,0 +1,214 @@
+# backend/event_hub.py
+"""
+In-process publish/subscribe for live dashboard updates.
+
+Routes publish compact events (prediction, alert); subscribers attach over WebSocket
+(/events/ws) or Server-Sent Events (/events/stream), optionally filtered by user_id and event
+type. Each event is JSON-encoded once and shared by every subscriber. Every subscriber has a
+bounded queue; one that falls max_queue events behind is disconnected instead of buffering
+without limit or slowing the publisher down.
+"""
+import os
+import json
+import time
+import asyncio
+import itertools
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Optional, Set
+
+from backend.metrics import EVENTS_PUBLISHED, EVENT_DELIVERY_SECONDS, EVENT_SUBSCRIBERS_DROPPED
+
+EVENTS_MAX_QUEUE = int(os.getenv("SOULSYNC_EVENTS_MAX_QUEUE", "256"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("SOULSYNC_EVENTS_MAX_SUBSCRIBERS", "1000"))
+EVENTS_HEARTBEAT_S = float(os.getenv("SOULSYNC_EVENTS_HEARTBEAT_S", "15"))
+EVENT_TYPES = ("prediction", "alert")
+
+
+class SlowConsumer(Exception):
+    pass
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Event:
+    __slots__ = ("id", "type", "user_id", "json", "published")
+
+    def __init__(self, event_id: int, type: str, user_id: str, data: Dict[str, Any]):
+        self.id = event_id
+        self.type = type
+        self.user_id = user_id
+        self.json = json.dumps(dict(data, type=type, user_id=user_id, id=event_id), default=str)
+        self.published = time.monotonic()
+
+
+class Subscription:
+    """One connected client. Lives on the event loop that serves its connection."""
+
+    def __init__(self, hub: "EventHub", transport: str, user_id: Optional[str], types: Optional[Set[str]],
+                 max_queue: int):
+        self.hub = hub
+        self.transport = transport
+        self.user_id = user_id
+        self.types = types
+        self.max_queue = max_queue
+        self.loop = asyncio.get_running_loop()
+        self.connected = time.time()
+        self.delivered = 0
+        self.overflowed = False
+        self._events: deque = deque()
+        self._wake = asyncio.Event()
+
+    def wants(self, event: Event) -> bool:
+        return self.types is None or event.type in self.types
+
+    def _offer(self, event: Event):
+        # loop thread only
+        if self.overflowed:
+            return
+        if len(self._events) >= self.max_queue:
+            self.overflowed = True
+            self._events.clear()
+            self.hub._drop(self, "slow_consumer")
+        else:
+            self._events.append(event)
+        self._wake.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event; None on timeout (send a heartbeat). Raises SlowConsumer once overflowed."""
+        if not self._events and not self.overflowed:
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.overflowed:
+            raise SlowConsumer(f"subscriber fell {self.max_queue} events behind")
+        event = self._events.popleft()
+        self.delivered += 1
+        self.hub._delivered(self, event)
+        return event
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    def __init__(self, max_queue: int = EVENTS_MAX_QUEUE, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS):
+        self.max_queue = max(1, int(max_queue))
+        self.max_subscribers = max(1, int(max_subscribers))
+        self._lock = threading.Lock()
+        self._by_user: Dict[Optional[str], Set[Subscription]] = {}   # None -> subscribed to every user
+        self._count = 0
+        self._ids = itertools.count(1)
+        self.published = self.fanned_out = self.connects = self.dropped_slow = 0
+        self._latencies = deque(maxlen=1024)
+
+    # ---------- publisher side ----------
+    def publish(self, type: str, user_id: str, **data) -> Optional[Event]:
+        """Non-blocking; safe from any thread. Returns None when nobody is listening."""
+        user_id = user_id or "anon"
+        with self._lock:
+            self.published += 1
+            targets = list(self._by_user.get(user_id, ())) + list(self._by_user.get(None, ()))
+        EVENTS_PUBLISHED.labels(type).inc()
+        if not targets:
+            return None
+        data.setdefault("ts", time.time())
+        event = Event(next(self._ids), type, user_id, data)
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        n = 0
+        for sub in targets:
+            if not sub.wants(event):
+                continue
+            n += 1
+            if sub.loop is current:
+                sub._offer(event)
+            else:
+                try:
+                    sub.loop.call_soon_threadsafe(sub._offer, event)
+                except RuntimeError:   # that connection's loop is gone
+                    self.unsubscribe(sub)
+        with self._lock:
+            self.fanned_out += n
+        return event
+
+    # ---------- subscriber side ----------
+    def subscribe(self, transport: str, user_id: Optional[str] = None,
+                  types: Optional[Iterable[str]] = None) -> Subscription:
+        """Call from the connection's event loop. Raises TooManySubscribers at the cap."""
+        types = set(types) if types else None
+        sub = Subscription(self, transport, user_id or None, types, self.max_queue)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                EVENT_SUBSCRIBERS_DROPPED.labels(transport, "rejected").inc()
+                raise TooManySubscribers(f"event hub is at {self.max_subscribers} subscribers")
+            self._by_user.setdefault(sub.user_id, set()).add(sub)
+            self._count += 1
+            self.connects += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._by_user.get(sub.user_id)
+            if subs is None or sub not in subs:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._by_user[sub.user_id]
+            self._count -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_transport: Dict[str, int] = {}
+            for subs in self._by_user.values():
+                for sub in subs:
+                    by_transport[sub.transport] = by_transport.get(sub.transport, 0) + 1
+            lat = sorted(self._latencies)
+            return {
+                "subscribers": self._count, "by_transport": by_transport,
+                "filtered_users": sum(len(s) for u, s in self._by_user.items() if u is not None),
+                "connects": self.connects, "published": self.published, "fanned_out": self.fanned_out,
+                "dropped_slow": self.dropped_slow, "max_queue": self.max_queue,
+                "max_subscribers": self.max_subscribers,
+                "fanout_ms_avg": round(sum(lat) / len(lat), 3) if lat else 0.0,
+                "fanout_ms_p50": round(lat[len(lat) // 2], 3) if lat else 0.0,
+                "fanout_ms_max": round(lat[-1], 3) if lat else 0.0,
+            }
+
+    # ---------- internals ----------
+    def _drop(self, sub: Subscription, reason: str):
+        EVENT_SUBSCRIBERS_DROPPED.labels(sub.transport, reason).inc()
+        with self._lock:
+            self.dropped_slow += 1
+        self.unsubscribe(sub)
+
+    def _delivered(self, sub: Subscription, event: Event):
+        # publish() -> handed to the connection's writer
+        latency = time.monotonic() - event.published
+        EVENT_DELIVERY_SECONDS.labels(sub.transport).observe(latency)
+        with self._lock:
+            self._latencies.append(latency * 1000.0)
+
+
+def parse_types(types: Optional[str]) -> Optional[Set[str]]:
+    """"prediction,alert" -> {"prediction", "alert"}; empty -> None (all). Raises ValueError."""
+    if not types:
+        return None
+    out = {t.strip().lower() for t in types.split(",") if t.strip()}
+    unknown = out - set(EVENT_TYPES)
+    if unknown:
+        raise ValueError(f"unknown event types {sorted(unknown)} (expected {list(EVENT_TYPES)})")
+    return out or None
+
+
+def sse_format(event: Event) -> str:
+    return f"id: {event.id}\nevent: {event.type}\ndata: {event.json}\n\n"
+
+
+default_hub = EventHub()
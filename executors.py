@@ -0,0 +1,115 @@
+# backend/executors.py
+import os
+import asyncio
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# Feature extraction (librosa decode + MFCC) is GIL-bound -> process pool by default.
+# Model inference runs on the InferenceBatcher worker threads (backend/inference_queue.py).
+FEATURE_EXECUTOR = os.getenv("SOULSYNC_FEATURE_EXECUTOR", "process")   # "process" | "thread"
+FEATURE_WORKERS = int(os.getenv("SOULSYNC_FEATURE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+FEATURE_MAX_PENDING = int(os.getenv("SOULSYNC_FEATURE_MAX_PENDING", str(FEATURE_WORKERS * 8)))
+
+
+class Overloaded(RuntimeError):
+    """Raised when a stage's queue is full; the router turns this into HTTP 503."""
+
+
+class BoundedExecutor:
+    """
+    Wraps an Executor with a cap on in-flight jobs (running + queued).
+    When the cap is reached, run() fails fast with Overloaded instead of queueing,
+    so latency cannot pile up without limit.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int, name: str):
+        self.executor = executor
+        self.max_pending = max(1, int(max_pending))
+        self.name = name
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise Overloaded(f"{self.name} queue is full ({self.max_pending} pending), try again later")
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self, _fut=None):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+        self._slots.release()
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool without blocking the event loop."""
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._release()
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        """Thread-friendly variant of run(): returns a concurrent.futures.Future."""
+        self._acquire()
+        try:
+            fut = self.executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        fut.add_done_callback(self._release)
+        return fut
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+_feature_pool = None
+_pool_lock = threading.Lock()
+
+
+def feature_pool() -> BoundedExecutor:
+    global _feature_pool
+    with _pool_lock:
+        if _feature_pool is None:
+            if FEATURE_EXECUTOR == "process":
+                # spawn: forking a process that already has torch/OpenMP threads is unsafe
+                ex = ProcessPoolExecutor(max_workers=FEATURE_WORKERS,
+                                         mp_context=multiprocessing.get_context("spawn"))
+            else:
+                ex = ThreadPoolExecutor(max_workers=FEATURE_WORKERS, thread_name_prefix="features")
+            _feature_pool = BoundedExecutor(ex, FEATURE_MAX_PENDING, "feature_extraction")
+        return _feature_pool
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "feature_extraction": _feature_pool.stats() if _feature_pool else None,
+    }
+
+
+def shutdown():
+    global _feature_pool
+    with _pool_lock:
+        if _feature_pool is not None:
+            _feature_pool.shutdown(wait=True)
+        _feature_pool = None
@@ -0,0 +1,216 @@
+# backend/feature_engine.py
+import struct
+import threading
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# scipy's pocketfft keeps float32 and is several times faster than np.fft here; optional
+try:
+    from scipy import fft as _fft
+except Exception:
+    _fft = np.fft
+
+# Same defaults librosa.feature.mfcc uses, so features stay compatible with the trained scaler/CNN
+N_MFCC = 40
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+TOP_DB = 80.0
+AMIN = 1e-10
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+# ---------- WAV decoding ----------
+def decode_wav(audio_bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    Decode a RIFF/WAVE PCM (8/16/24/32-bit int or 32/64-bit float) buffer into mono float32 in [-1, 1].
+    The sample data is read with np.frombuffer straight over the upload bytes (no BytesIO / soundfile).
+    Returns None when the buffer is not a WAV we understand, so the caller can fall back to librosa.
+    """
+    buf = memoryview(audio_bytes)
+    if len(buf) < 12 or bytes(buf[0:4]) != b"RIFF" or bytes(buf[8:12]) != b"WAVE":
+        return None
+    fmt = None
+    data_off = data_len = None
+    pos = 12
+    while pos + 8 <= len(buf):
+        cid = bytes(buf[pos:pos + 4])
+        size = struct.unpack_from("<I", buf, pos + 4)[0]
+        body = pos + 8
+        if cid == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", buf, body)
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                # real format code lives in the first two bytes of the SubFormat GUID
+                fmt = (struct.unpack_from("<H", buf, body + 24)[0],) + fmt[1:]
+        elif cid == b"data":
+            data_off = body
+            data_len = min(size, len(buf) - body)  # tolerate truncated / streaming headers
+            break
+        pos = body + size + (size & 1)  # chunks are word aligned
+    if fmt is None or data_off is None:
+        return None
+
+    code, channels, sr, _, block_align, bits = fmt
+    if channels < 1 or bits not in (8, 16, 24, 32, 64):
+        return None
+    n_frames = data_len // ((bits // 8) * channels)
+    y = pcm_to_float32(buf, code, bits, channels, n_frames, data_off)
+    if y is None:
+        return None
+    return y, int(sr)
+
+
+def pcm_to_float32(buf, code: int, bits: int, channels: int, n_frames: int, offset: int = 0) -> Optional[np.ndarray]:
+    """Interleaved WAV sample data -> mono float32 in [-1, 1]; None for unsupported formats."""
+    n = n_frames * channels
+    if code == _WAVE_FORMAT_PCM:
+        if bits == 8:
+            raw = np.frombuffer(buf, dtype=np.uint8, count=n, offset=offset)
+            y = (raw.astype(np.float32) - 128.0) * (1.0 / 128.0)
+        elif bits == 16:
+            y = np.frombuffer(buf, dtype="<i2", count=n, offset=offset).astype(np.float32) * (1.0 / 32768.0)
+        elif bits == 24:
+            raw = np.frombuffer(buf, dtype=np.uint8, count=n * 3, offset=offset).reshape(-1, 3)
+            ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+            ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+            y = ints.astype(np.float32) * (1.0 / 8388608.0)
+        elif bits == 32:
+            y = np.frombuffer(buf, dtype="<i4", count=n, offset=offset).astype(np.float32) * (1.0 / 2147483648.0)
+        else:
+            return None
+    elif code == _WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        y = np.frombuffer(buf, dtype="<f4" if bits == 32 else "<f8", count=n, offset=offset).astype(np.float32)
+    else:
+        return None
+
+    if channels > 1:
+        y = y.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return y
+
+
+# ---------- cached filterbanks ----------
+def _hz_to_mel(f):
+    # Slaney-style mel scale (librosa default, htk=False)
+    f = np.asanyarray(f, dtype=np.float64)
+    f_sp = 200.0 / 3
+    mels = f / f_sp
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(f >= min_log_hz, min_log_mel + np.log(np.maximum(f, 1e-10) / min_log_hz) / logstep, mels)
+
+
+def _mel_to_hz(m):
+    m = np.asanyarray(m, dtype=np.float64)
+    f_sp = 200.0 / 3
+    freqs = f_sp * m
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(m >= min_log_mel, min_log_hz * np.exp(logstep * (m - min_log_mel)), freqs)
+
+
+def mel_filterbank(sr: int, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """(n_mels, 1 + n_fft // 2) Slaney-normalised triangular filters, fmin=0, fmax=sr/2."""
+    fftfreqs = np.fft.rfftfreq(n_fft, d=1.0 / sr)
+    mel_f = _mel_to_hz(np.linspace(_hz_to_mel(0.0), _hz_to_mel(sr / 2.0), n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fftfreqs)
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0.0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:n_mels + 2] - mel_f[:n_mels]))[:, None]
+    return weights.astype(np.float32)
+
+
+def dct_matrix(n_mfcc: int = N_MFCC, n_mels: int = N_MELS) -> np.ndarray:
+    """Orthonormal DCT-II basis, (n_mfcc, n_mels), matching scipy.fft.dct(type=2, norm='ortho')."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2.0 * n_mels)) * np.sqrt(2.0 / n_mels)
+    basis[0] *= np.sqrt(0.5)
+    return basis
+
+
+class FeatureEngine:
+    """
+    Mean-MFCC extractor equivalent to
+        np.mean(librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40).T, axis=0)
+    but with the mel filterbank / DCT basis built once per sample rate and the STFT done
+    block-wise with plain NumPy. PCM WAV uploads skip librosa entirely.
+    """
+
+    def __init__(self, n_mfcc: int = N_MFCC, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH,
+                 n_mels: int = N_MELS, frames_per_block: int = 1024):
+        self.n_mfcc = n_mfcc
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.frames_per_block = frames_per_block
+        # periodic Hann window (scipy.signal.get_window("hann", n_fft, fftbins=True))
+        self.window = (0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+        self.dct = dct_matrix(n_mfcc, n_mels)
+        self._mel_cache: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def mel_basis(self, sr: int) -> np.ndarray:
+        mel = self._mel_cache.get(sr)
+        if mel is None:
+            with self._lock:
+                mel = self._mel_cache.get(sr)
+                if mel is None:
+                    mel = mel_filterbank(sr, self.n_fft, self.n_mels)
+                    self._mel_cache[sr] = mel
+        return mel
+
+    def mel_power(self, y: np.ndarray, sr: int) -> np.ndarray:
+        """(n_frames, n_mels) mel power spectrogram, centered frames with zero padding."""
+        pad = self.n_fft // 2
+        y = np.pad(np.asarray(y, dtype=np.float32), (pad, pad), mode="constant")
+        if len(y) < self.n_fft:
+            y = np.pad(y, (0, self.n_fft - len(y)))
+        frames = np.lib.stride_tricks.sliding_window_view(y, self.n_fft)[::self.hop_length]
+        mel_t = self.mel_basis(sr).T
+        out = np.empty((frames.shape[0], self.n_mels), dtype=np.float32)
+        # block-wise so a long clip never materialises the full complex STFT
+        for start in range(0, frames.shape[0], self.frames_per_block):
+            block = frames[start:start + self.frames_per_block] * self.window
+            spec = _fft.rfft(block, axis=1)
+            power = spec.real ** 2 + spec.imag ** 2
+            out[start:start + len(block)] = power @ mel_t
+        return out
+
+    def frames_log_mel(self, frames: np.ndarray, sr: int) -> np.ndarray:
+        """(n, n_mels) unclamped log-mel (dB) for already-cut (n, n_fft) frames; the streaming path's unit of work."""
+        spec = _fft.rfft(frames * self.window, axis=1)
+        mel = (spec.real ** 2 + spec.imag ** 2) @ self.mel_basis(sr).T
+        return 10.0 * np.log10(np.maximum(AMIN, mel))
+
+    def log_mel(self, mel: np.ndarray) -> np.ndarray:
+        # librosa.power_to_db(ref=1.0, amin=1e-10, top_db=80)
+        log_spec = 10.0 * np.log10(np.maximum(AMIN, mel))
+        return np.maximum(log_spec, log_spec.max() - TOP_DB)
+
+    def mfcc_mean(self, y: np.ndarray, sr: int) -> np.ndarray:
+        if len(y) == 0:
+            raise ValueError("Empty audio.")
+        log_mel = self.log_mel(self.mel_power(y, sr))
+        # the DCT is linear, so mean-then-DCT == DCT-then-mean and costs one mat-vec
+        return self.dct @ log_mel.mean(axis=0, dtype=np.float64)
+
+    def load(self, audio_bytes) -> Tuple[np.ndarray, int]:
+        decoded = decode_wav(audio_bytes)
+        if decoded is not None:
+            return decoded
+        import io, librosa  # fallback for mp3/flac/ogg/odd WAV flavours
+        return librosa.load(io.BytesIO(audio_bytes), sr=None)
+
+    def extract(self, audio_bytes) -> np.ndarray:
+        y, sr = self.load(audio_bytes)
+        return self.mfcc_mean(y, sr)
+
+
+default_engine = FeatureEngine()
@@ -0,0 +1,397 @@
+# backend/feature_store.py
+"""
+Offline MFCC feature store: decode a corpus once, then re-score or retrain from stored vectors.
+
+    python -m backend.feature_store build data/ravdess --workers 8       # incremental, resumable
+    python -m backend.feature_store score --user-id corpus               # CNN over stored features
+    python -m backend.feature_store export train.npz --labels ravdess     # X / y for retraining
+    python -m backend.feature_store stats
+
+Vectors are float32 rows in fixed-size .npy chunks under <root>/chunks/, written and read as
+memory maps, so neither side loads the store in full. <root>/index.db (SQLite) maps each
+content hash to its row and each source path to its (size, mtime, hash). A rerun only reads
+files that are new or changed, and identical audio under several paths is stored once.
+Chunks are flushed before their index rows commit, so an interrupted build resumes from the
+last committed task and never points at unwritten rows.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.feature_engine import default_engine as feature_engine
+from backend.prediction_cache import content_hash, file_version
+from backend.metrics import get_logger, log_event
+
+FEATURE_STORE_DIR = os.getenv("SOULSYNC_FEATURE_STORE_DIR", "feature_store")
+FEATURE_STORE_CHUNK_ROWS = int(os.getenv("SOULSYNC_FEATURE_STORE_CHUNK_ROWS", "65536"))
+FEATURE_STORE_FILES_PER_TASK = int(os.getenv("SOULSYNC_FEATURE_STORE_FILES_PER_TASK", "32"))
+SCORE_BATCH = int(os.getenv("SOULSYNC_FEATURE_STORE_SCORE_BATCH", "4096"))
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+# RAVDESS file names: modality-channel-EMOTION-intensity-statement-repetition-actor.wav
+RAVDESS_EMOTIONS = {"01": "neutral", "02": "calm", "03": "happy", "04": "sad",
+                    "05": "angry", "06": "fearful", "07": "disgust", "08": "surprised"}
+
+logger = get_logger("feature_store")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    # idx is the global row: chunk = idx // chunk_rows, row = idx % chunk_rows
+    "CREATE TABLE IF NOT EXISTS features (sha TEXT PRIMARY KEY, idx INTEGER NOT NULL UNIQUE, duration REAL, added REAL)",
+    "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha TEXT, error TEXT, seen REAL)",
+    "CREATE INDEX IF NOT EXISTS idx_files_sha ON files(sha)",
+    "CREATE TABLE IF NOT EXISTS scores (sha TEXT, model TEXT, emotion TEXT, confidence REAL, PRIMARY KEY (sha, model))",
+)
+
+
+def _engine_params() -> Dict[str, str]:
+    return {"n_mfcc": str(feature_engine.n_mfcc), "n_fft": str(feature_engine.n_fft),
+            "hop_length": str(feature_engine.hop_length), "n_mels": str(feature_engine.n_mels)}
+
+
+def featurize_files(paths: List[str]) -> List[Tuple]:
+    """
+    (path, size, mtime_ns, sha, features or None, duration_s, error) per path. Top-level so the
+    process pool can run it; each file is read once for both the hash and the decode.
+    """
+    out = []
+    for path in paths:
+        size = mtime = sha = None
+        try:
+            st = os.stat(path)
+            size, mtime = st.st_size, st.st_mtime_ns
+            with open(path, "rb") as f:
+                data = f.read()
+            sha = content_hash(data)
+            y, sr = feature_engine.load(data)
+            features = feature_engine.mfcc_mean(y, sr).astype(np.float32)
+            out.append((path, size, mtime, sha, features, len(y) / sr, None))
+        except Exception as e:
+            out.append((path, size, mtime, sha, None, 0.0, f"{type(e).__name__}: {e}"))
+    return out
+
+
+class FeatureStore:
+    """Single-writer store; readers may open the same root concurrently (SQLite WAL, read-only maps)."""
+
+    def __init__(self, root: str = FEATURE_STORE_DIR, chunk_rows: int = FEATURE_STORE_CHUNK_ROWS):
+        self.root = root
+        os.makedirs(os.path.join(root, "chunks"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.db"))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            self.conn.execute(stmt)
+        meta = dict(self.conn.execute("SELECT key, value FROM meta").fetchall())
+        params = dict(_engine_params(), chunk_rows=str(int(chunk_rows)))
+        if not meta:
+            self.conn.executemany("INSERT INTO meta VALUES (?, ?)", params.items())
+            self.conn.commit()
+            meta = params
+        changed = {k: (meta.get(k), v) for k, v in _engine_params().items() if meta.get(k) != v}
+        if changed:
+            raise ValueError(f"store at {root} was built with different feature parameters {changed}; "
+                             f"use a new --root")
+        self.chunk_rows = int(meta["chunk_rows"])
+        self.dim = int(meta["n_mfcc"])
+        self._next = self.conn.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM features").fetchone()[0]
+        self._write_map: Optional[Tuple[int, np.memmap]] = None
+
+    # ---------- layout ----------
+    def chunk_path(self, chunk: int) -> str:
+        return os.path.join(self.root, "chunks", f"{chunk:05d}.npy")
+
+    def _writable(self, chunk: int) -> np.memmap:
+        if self._write_map is None or self._write_map[0] != chunk:
+            self._flush_map()
+            path = self.chunk_path(chunk)
+            if os.path.exists(path):
+                m = np.load(path, mmap_mode="r+")
+            else:
+                m = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(self.chunk_rows, self.dim))
+            self._write_map = (chunk, m)
+        return self._write_map[1]
+
+    def _flush_map(self):
+        if self._write_map is not None:
+            self._write_map[1].flush()
+
+    def chunk(self, chunk: int) -> np.memmap:
+        return np.load(self.chunk_path(chunk), mmap_mode="r")
+
+    # ---------- write side ----------
+    def known_files(self) -> Dict[str, Tuple[int, int]]:
+        """path -> (size, mtime_ns) for every file already processed (including failures)."""
+        return {p: (s, m) for p, s, m in self.conn.execute("SELECT path, size, mtime_ns FROM files")}
+
+    def add(self, results: Iterable[Tuple]) -> Dict[str, int]:
+        """Store featurize_files() output: one memmap flush, then one index transaction."""
+        now = time.time()
+        counts = {"added": 0, "duplicate": 0, "failed": 0}
+        new_features, files = [], []
+        pending = {}
+        for path, size, mtime, sha, features, duration, error in results:
+            files.append((path, size, mtime, sha if error is None else None, error, now))
+            if error is not None:
+                counts["failed"] += 1
+                continue
+            if sha in pending or self.conn.execute("SELECT 1 FROM features WHERE sha = ?", (sha,)).fetchone():
+                counts["duplicate"] += 1
+                continue
+            idx = self._next
+            self._next += 1
+            self._writable(idx // self.chunk_rows)[idx % self.chunk_rows] = features
+            pending[sha] = idx
+            new_features.append((sha, idx, duration, now))
+            counts["added"] += 1
+        self._flush_map()
+        with self.conn:
+            self.conn.executemany("INSERT INTO features VALUES (?, ?, ?, ?)", new_features)
+            self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", files)
+        return counts
+
+    # ---------- read side ----------
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM features").fetchone()[0]
+
+    def gather(self, idx: np.ndarray) -> np.ndarray:
+        """(len(idx), dim) float32 copy of the given rows, one fancy-index per chunk touched."""
+        out = np.empty((len(idx), self.dim), dtype=np.float32)
+        chunks = idx // self.chunk_rows
+        for c in np.unique(chunks):
+            sel = chunks == c
+            out[sel] = self.chunk(int(c))[idx[sel] % self.chunk_rows]
+        return out
+
+    def iter_batches(self, batch_size: int, unscored_for: Optional[str] = None) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray]]:
+        """
+        (records, features) batches in row order. records carry sha, idx and one source path.
+        unscored_for=model tag limits the walk to rows without a stored score for that model.
+        """
+        sql = ("SELECT f.sha, f.idx, (SELECT MIN(path) FROM files WHERE files.sha = f.sha) FROM features f"
+               + (" WHERE NOT EXISTS (SELECT 1 FROM scores s WHERE s.sha = f.sha AND s.model = ?)"
+                  if unscored_for else "") + " ORDER BY f.idx")
+        # a separate cursor: callers write scores between batches
+        cur = sqlite3.connect(os.path.join(self.root, "index.db")).execute(sql, (unscored_for,) if unscored_for else ())
+        try:
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                idx = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+                yield [{"sha": s, "idx": i, "path": p} for s, i, p in rows], self.gather(idx)
+        finally:
+            cur.connection.close()
+
+    def save_scores(self, model: str, records: List[Dict[str, Any]], preds: List[Tuple[str, float]]):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                                  [(r["sha"], model, e, c) for r, (e, c) in zip(records, preds)])
+
+    def stats(self) -> Dict[str, Any]:
+        q = lambda sql: self.conn.execute(sql).fetchone()[0]
+        return {
+            "root": self.root, "rows": len(self), "chunks": -(-self._next // self.chunk_rows),
+            "chunk_rows": self.chunk_rows, "dim": self.dim,
+            "files": q("SELECT COUNT(*) FROM files"), "failed": q("SELECT COUNT(*) FROM files WHERE error IS NOT NULL"),
+            "audio_hours": round((q("SELECT COALESCE(SUM(duration), 0) FROM features")) / 3600.0, 3),
+            "scored_models": q("SELECT COUNT(DISTINCT model) FROM scores"),
+        }
+
+    def close(self):
+        self._flush_map()
+        self._write_map = None
+        self.conn.close()
+
+
+def list_audio(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isfile(path):
+            yield os.path.abspath(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield os.path.abspath(os.path.join(dirpath, name))
+
+
+def build(store: FeatureStore, paths: Iterable[str], workers: int = 0,
+          files_per_task: int = FEATURE_STORE_FILES_PER_TASK, retry_failed: bool = False) -> Dict[str, Any]:
+    """
+    Featurize every new or changed audio file under `paths` into the store.
+    workers=0 runs in-process; otherwise a spawn process pool with at most 2 tasks per worker
+    in flight, so memory stays bounded however large the corpus is.
+    """
+    known = store.known_files()
+    failed = set() if not retry_failed else {
+        p for (p,) in store.conn.execute("SELECT path FROM files WHERE error IS NOT NULL")}
+    totals = {"seen": 0, "skipped": 0, "added": 0, "duplicate": 0, "failed": 0}
+    start = time.perf_counter()
+
+    def todo():
+        task = []
+        for path in list_audio(paths):
+            totals["seen"] += 1
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) == (st.st_size, st.st_mtime_ns) and path not in failed:
+                totals["skipped"] += 1
+                continue
+            task.append(path)
+            if len(task) >= files_per_task:
+                yield task
+                task = []
+        if task:
+            yield task
+
+    def collect(results):
+        for k, v in store.add(results).items():
+            totals[k] += v
+        done = totals["added"] + totals["duplicate"] + totals["failed"]
+        if done and done % (files_per_task * 32) < len(results):
+            print(f"  {done} files  {done / (time.perf_counter() - start):.1f} files/s")
+
+    if workers <= 0:
+        for task in todo():
+            collect(featurize_files(task))
+    else:
+        # spawn: same reasoning as executors.feature_pool (no forking a process with torch threads)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            in_flight = set()
+            for task in todo():
+                if len(in_flight) >= 2 * workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        collect(fut.result())
+                in_flight.add(pool.submit(featurize_files, task))
+            for fut in wait(in_flight).done:
+                collect(fut.result())
+    totals["seconds"] = round(time.perf_counter() - start, 3)
+    log_event(logger, "feature_store_build", **totals)
+    return totals
+
+
+def model_tag() -> str:
+    from backend import emotion_model
+    return file_version(emotion_model.MODEL_PATH, emotion_model.SCALER_PATH, emotion_model.LABEL_ENCODER_PATH)
+
+
+def score(store: FeatureStore, model=None, batch_size: int = SCORE_BATCH, user_id: str = "batch",
+          log_history: bool = True, rescore: bool = False) -> Dict[str, Any]:
+    """
+    Run the CNN over stored features in large batches (one scaler pass + one forward each).
+    Scores are kept per model version, so a rerun only scores rows added since; a new model
+    file rescores everything. Each batch goes to history_db as one bulk insert.
+    """
+    from backend.emotion_model import EmotionModel
+    from backend.action_engine import ActionEngine
+    from backend import history_db
+    model = model or EmotionModel(load=True)
+    tag = model_tag()
+    engine = ActionEngine()
+    if log_history:
+        history_db.init_db()
+    totals = {"model": tag, "scored": 0, "batches": 0, "emotions": {}}
+    start = time.perf_counter()
+    forward_s = 0.0
+    for records, features in store.iter_batches(batch_size, unscored_for=None if rescore else tag):
+        t0 = time.perf_counter()
+        preds = model.predict_batch(features)
+        forward_s += time.perf_counter() - t0
+        store.save_scores(tag, records, preds)
+        if log_history:
+            history_db.log_predictions(
+                [("audio_batch", os.path.basename(r["path"] or r["sha"]), e, c, engine.trigger_action(e))
+                 for r, (e, c) in zip(records, preds)], user_id=user_id)
+        for e, _ in preds:
+            totals["emotions"][e] = totals["emotions"].get(e, 0) + 1
+        totals["scored"] += len(records)
+        totals["batches"] += 1
+    if log_history:
+        history_db.flush(timeout=60)
+    totals["seconds"] = round(time.perf_counter() - start, 3)
+    totals["predict_rows_per_s"] = round(totals["scored"] / forward_s) if forward_s else 0
+    log_event(logger, "feature_store_score", model=tag, scored=totals["scored"], seconds=totals["seconds"])
+    return totals
+
+
+def label_for(path: str, scheme: str) -> str:
+    if scheme == "dir":
+        return os.path.basename(os.path.dirname(path)).lower()
+    parts = os.path.basename(path).split("-")
+    return RAVDESS_EMOTIONS.get(parts[2], "") if len(parts) >= 3 else ""
+
+
+def export(store: FeatureStore, out: str, labels: str = "none") -> int:
+    """Write X (float32), sha, path and optional labels to an .npz for train_emotion_model.py."""
+    X, shas, paths = [], [], []
+    for records, features in store.iter_batches(SCORE_BATCH):
+        X.append(features)
+        shas += [r["sha"] for r in records]
+        paths += [r["path"] or "" for r in records]
+    X = np.concatenate(X) if X else np.zeros((0, store.dim), dtype=np.float32)
+    arrays = {"X": X, "sha": np.array(shas), "path": np.array(paths)}
+    if labels != "none":
+        arrays["y"] = np.array([label_for(p, labels) for p in paths])
+    np.savez(out, **arrays)
+    return len(X)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--root", default=FEATURE_STORE_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="featurize new / changed audio files")
+    b.add_argument("paths", nargs="+", help="audio files or directories (searched recursively)")
+    b.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 = no process pool")
+    b.add_argument("--files-per-task", type=int, default=FEATURE_STORE_FILES_PER_TASK)
+    b.add_argument("--retry-failed", action="store_true", help="re-read files that failed to decode before")
+    s = sub.add_parser("score", help="run the CNN over stored features and log the results")
+    s.add_argument("--batch", type=int, default=SCORE_BATCH)
+    s.add_argument("--user-id", default="batch")
+    s.add_argument("--db", help="history database (default: history_db.DB_PATH)")
+    s.add_argument("--no-history", action="store_true", help="only store scores in the index")
+    s.add_argument("--rescore", action="store_true", help="score every row, not just unscored ones")
+    e = sub.add_parser("export", help="dump features (and labels) for training")
+    e.add_argument("out")
+    e.add_argument("--labels", choices=("none", "dir", "ravdess"), default="none",
+                   help="dir: parent directory name; ravdess: emotion code in the file name")
+    sub.add_parser("stats", help="show store size")
+    args = ap.parse_args(argv)
+
+    store = FeatureStore(args.root)
+    try:
+        if args.cmd == "build":
+            totals = build(store, args.paths, args.workers, args.files_per_task, args.retry_failed)
+            print(f"seen {totals['seen']}  skipped {totals['skipped']}  added {totals['added']}  "
+                  f"duplicate {totals['duplicate']}  failed {totals['failed']}  in {totals['seconds']:.1f}s")
+        elif args.cmd == "score":
+            if args.db:
+                from backend import history_db
+                history_db.DB_PATH = args.db
+            totals = score(store, batch_size=args.batch, user_id=args.user_id,
+                           log_history=not args.no_history, rescore=args.rescore)
+            print(f"model {totals['model']}: scored {totals['scored']} rows in {totals['batches']} batches, "
+                  f"{totals['seconds']:.1f}s ({totals['predict_rows_per_s']} rows/s in predict_batch)")
+            for emotion, n in sorted(totals["emotions"].items(), key=lambda kv: -kv[1]):
+                print(f"  {emotion:<10} {n:>8}")
+        elif args.cmd == "export":
+            print(f"wrote {export(store, args.out, args.labels)} rows to {args.out}")
+        for k, v in store.stats().items():
+            print(f"{k:<14} {v}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,212 @@
 # backend/history_db.py
+import os
+import logging
 import sqlite3
+import atexit
+import queue
+import threading
+import time
 from datetime import datetime
+from backend.metrics import get_logger, log_event, DB_SECONDS, DB_ROWS
 
 DB_PATH = "models/history.db"
 
+# write-behind tuning: rows are flushed when WRITE_BATCH_SIZE are queued or WRITE_FLUSH_MS has passed
+WRITE_BATCH_SIZE = int(os.getenv("SOULSYNC_DB_BATCH_SIZE", "256"))
+WRITE_FLUSH_MS = float(os.getenv("SOULSYNC_DB_FLUSH_MS", "50"))
+CACHE_SIZE_KB = int(os.getenv("SOULSYNC_DB_CACHE_KB", "16384"))
+
+SCHEMA_VERSION = 1
+
+_INSERT_HISTORY = """
+    INSERT INTO history (timestamp, input_type, filename, emotion, confidence, action, user_id, ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_ALERT = """
+    INSERT INTO alerts (timestamp, from_emotion, to_emotion, magnitude, confidence_from, confidence_to, metadata, user_id, ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_HISTORY_COLUMNS = "id, timestamp, input_type, filename, emotion, confidence, action, user_id, ts"
+_ALERT_COLUMNS = "id, timestamp, from_emotion, to_emotion, magnitude, confidence_from, confidence_to, metadata, user_id, ts"
+_TABLE_OF = {_INSERT_HISTORY: "history", _INSERT_ALERT: "alerts"}
+
+logger = get_logger("history_db")
+_commit_timer = DB_SECONDS.labels("commit", "all")
+
+
+def _configure(conn, readonly=False):
+    c = conn.cursor()
+    if not readonly:
+        # WAL is persistent in the file; readers never block behind the writer and vice versa
+        c.execute("PRAGMA journal_mode=WAL")
+        # NORMAL: fsync at checkpoints only, still crash-safe in WAL mode
+        c.execute("PRAGMA synchronous=NORMAL")
+    c.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    c.execute("PRAGMA temp_store=MEMORY")
+    c.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class _Writer(threading.Thread):
+    """Owns the single long-lived write connection and drains the queue in batched transactions."""
+
+    def __init__(self, path):
+        super().__init__(name="history-writer", daemon=True)
+        self.path = path
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+
+    def run(self):
+        conn = _configure(sqlite3.connect(self.path))
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            pending, waiters, n_rows = [], [], 0
+            deadline = time.monotonic() + WRITE_FLUSH_MS / 1000.0
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)  # flush() request: write what we have now
+                    break
+                else:
+                    pending.append(item)
+                    n_rows += len(item[1])
+                if stop or n_rows >= WRITE_BATCH_SIZE:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if pending:
+                self._write(conn, pending)
+            for ev in waiters:
+                ev.set()
+        conn.close()
+
+    def _write(self, conn, pending):
+        # group consecutive items with the same statement so each group is one executemany
+        try:
+            with _commit_timer.time(), conn:
+                sql, rows = pending[0][0], []
+                for item_sql, item_rows in pending:
+                    if item_sql != sql:
+                        conn.executemany(sql, rows)
+                        sql, rows = item_sql, []
+                    rows.extend(item_rows)
+                conn.executemany(sql, rows)
+            self.batches += 1
+            self.rows += sum(len(r) for _, r in pending)
+            for item_sql, item_rows in pending:
+                DB_ROWS.labels(_TABLE_OF.get(item_sql, "other")).inc(len(item_rows))
+        except sqlite3.Error as e:
+            self.errors += 1
+            log_event(logger, "history_write_failed", logging.ERROR, items_dropped=len(pending), error=str(e))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+_local = threading.local()
+_generation = 0   # bumped by close() so every thread reopens its read connection
+
+
+def _get_writer():
+    global _writer
+    if _writer is None or not _writer.is_alive():
+        with _writer_lock:
+            if _writer is None or not _writer.is_alive():
+                _writer = _Writer(DB_PATH)
+                _writer.start()
+    return _writer
+
+
+def _enqueue(sql, rows):
+    _get_writer().queue.put((sql, rows))
+
+
+def _read_conn():
+    """Per-thread read-only connection (sqlite connections are not shareable across threads)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "key", None) != (DB_PATH, _generation):
+        if conn is not None:
+            conn.close()
+        conn = _configure(sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True), readonly=True)
+        _local.conn, _local.key = conn, (DB_PATH, _generation)
+    return conn
+
+
+def _iso_to_epoch(value):
+    try:
+        return datetime.fromisoformat(value).timestamp()  # naive ISO strings were written in local time
+    except (TypeError, ValueError):
+        return None
+
+
+def _migrate(conn):
+    """Bring an existing database up to SCHEMA_VERSION (tracked in PRAGMA user_version)."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        # v1: per-user rows, epoch timestamps and indexes for per-user / time-range / keyset queries
+        conn.create_function("iso_to_epoch", 1, _iso_to_epoch)
+        with conn:
+            for table in ("history", "alerts"):
+                cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+                if "user_id" not in cols:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN user_id TEXT NOT NULL DEFAULT 'anon'")
+                if "ts" not in cols:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN ts REAL")
+                conn.execute(f"UPDATE {table} SET ts = iso_to_epoch(timestamp) WHERE ts IS NULL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user_ts ON history (user_id, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user_emotion_ts ON history (user_id, emotion, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_ts ON history (ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_user_ts ON alerts (user_id, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts)")
+            conn.execute("PRAGMA user_version = 1")
+        log_event(logger, "history_db_migrated", schema_version=SCHEMA_VERSION)
+
+
+def _select(table, columns, limit, user_id=None, since=None, until=None, before_id=None, emotion=None):
+    """
+    Newest-first page of `table`, ordered by (ts, id) so the (user_id, ts) / (ts) indexes serve
+    both the filter and the ORDER BY. `before_id` is a keyset cursor: the id of the last row
+    of the previous page.
+    """
+    conn = _read_conn()
+    where, params = [], []
+    if user_id is not None:
+        where.append("user_id = ?")
+        params.append(user_id)
+    if emotion is not None:
+        where.append("emotion = ?")
+        params.append(emotion)
+    if since is not None:
+        where.append("ts >= ?")
+        params.append(float(since))
+    if until is not None:
+        where.append("ts < ?")
+        params.append(float(until))
+    if before_id is not None:
+        row = conn.execute(f"SELECT ts FROM {table} WHERE id = ?", (before_id,)).fetchone()
+        if row is not None and row[0] is not None:
+            where.append("ts <= ? AND (ts < ? OR id < ?)")
+            params.extend([row[0], row[0], before_id])
+        else:
+            where.append("id < ?")
+            params.append(before_id)
+    sql = f"SELECT {columns} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+    params.append(int(limit))
+    with DB_SECONDS.labels("select", table).time():
+        return conn.execute(sql, params).fetchall()
+
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = _configure(sqlite3.connect(DB_PATH))
     c = conn.cursor()
     # history table
     c.execute("""
@@ -33,61 +234,229 @@ def init_db():
         )
     """)
     conn.commit()
+    _migrate(conn)
     conn.close()
+    _get_writer()
 
-def log_prediction(input_type, filename, emotion, confidence, action):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO history (timestamp, input_type, filename, emotion, confidence, action)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (datetime.now().isoformat(), input_type, filename, emotion, confidence, action))
-    conn.commit()
-    conn.close()
 
-def get_history(limit=50):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM history ORDER BY id DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
+def flush(timeout=5.0):
+    """Block until everything queued so far is committed."""
+    if _writer is None or not _writer.is_alive():
+        return
+    ev = threading.Event()
+    _writer.queue.put(ev)
+    ev.wait(timeout)
+
+
+def close():
+    """Flush pending writes and stop the writer thread (called on app shutdown)."""
+    global _writer, _generation
+    with _writer_lock:
+        if _writer is not None and _writer.is_alive():
+            _writer.queue.put(None)
+            _writer.join(timeout=10)
+        _writer = None
+        _generation += 1
+
+
+def writer_stats():
+    w = _writer
+    if w is None:
+        return {"running": False}
+    return {"running": w.is_alive(), "queued": w.queue.qsize(), "batches": w.batches, "rows": w.rows, "errors": w.errors}
+
+
+atexit.register(close)
+
+
+def log_prediction(input_type, filename, emotion, confidence, action, user_id="anon"):
+    now = datetime.now()
+    _enqueue(_INSERT_HISTORY, [(now.isoformat(), input_type, filename, emotion, confidence, action,
+                                user_id or "anon", now.timestamp())])
+
+
+def log_predictions(rows, user_id="anon"):
+    """Bulk insert [(input_type, filename, emotion, confidence, action), ...] in a single transaction."""
+    rows = list(rows)
+    if not rows:
+        return
+    now = datetime.now()
+    ts, iso = now.timestamp(), now.isoformat()
+    _enqueue(_INSERT_HISTORY, [(iso,) + tuple(r) + (user_id or "anon", ts) for r in rows])
+
+
+def fetch_emotion_arrays(labels, user_id=None, since=None, until=None, limit=None):
+    """
+    Oldest-first NumPy arrays (codes, confidences, ts) for analytics over large windows.
+    Labels are mapped to their position in `labels` inside SQLite (unknown -> 0), so no
+    per-row Python dicts are built. With `limit`, only the newest `limit` rows are returned.
+    """
+    import numpy as np
+    case = "CASE emotion " + " ".join("WHEN ? THEN ?" for _ in labels) + " ELSE 0 END"
+    params = [v for i, lab in enumerate(labels) for v in (lab, i)]
+    where = []
+    if user_id is not None:
+        where.append("user_id = ?")
+        params.append(user_id)
+    if since is not None:
+        where.append("ts >= ?")
+        params.append(float(since))
+    if until is not None:
+        where.append("ts < ?")
+        params.append(float(until))
+    sql = f"SELECT {case}, COALESCE(confidence, 0), COALESCE(ts, 0) FROM history"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY ts DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    with DB_SECONDS.labels("select_arrays", "history").time():
+        cur = _read_conn().execute(sql, params)
+        arr = np.fromiter(cur, dtype=[("code", np.int8), ("confidence", np.float32), ("ts", np.float64)])[::-1]
+    return arr["code"], arr["confidence"], arr["ts"]
+
+
+# timeline bucket widths (seconds) the analytics endpoint snaps to, so repeated dashboard
+# requests over a sliding range hit the same bucket edges
+BUCKET_STEPS = (1, 5, 15, 60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400, 30 * 86400)
+
+
+def _bucket_step(span, points):
+    want = span / max(1, int(points))
+    return next((step for step in BUCKET_STEPS if step >= want), BUCKET_STEPS[-1])
+
+
+def aggregate_history(labels, user_id=None, since=None, until=None, points=200, bucket_s=None, drift_threshold=2):
+    """
+    Dashboard aggregates over a time range, computed in SQLite: one query for the range
+    bounds, one GROUP BY (bucket, emotion) pass that also computes the consecutive-row drift
+    with LAG(). Python only reduces at most points x len(labels) grouped rows, so the cost
+    of the payload does not grow with the number of history rows.
+    Drift uses the analyze_sequence definition: |index(to) - index(from)| over `labels` order.
+    """
+    conn = _read_conn()
+    # rows whose legacy timestamp could not be parsed have NULL ts and no place on a timeline
+    where, params = ["ts IS NOT NULL"], []
+    if user_id is not None:
+        where.append("user_id = ?")
+        params.append(user_id)
+    if since is not None:
+        where.append("ts >= ?")
+        params.append(float(since))
+    if until is not None:
+        where.append("ts < ?")
+        params.append(float(until))
+    where_sql = " WHERE " + " AND ".join(where)
+    with DB_SECONDS.labels("aggregate", "history").time():
+        lo, hi = conn.execute(f"SELECT MIN(ts), MAX(ts) FROM history{where_sql}", params).fetchone()
+        start = float(since) if since is not None else lo
+        end = float(until) if until is not None else (hi + 1e-6 if hi is not None else None)
+        origin = start
+        if lo is None:
+            rows = []
+            step = int(bucket_s) if bucket_s else 60
+        else:
+            step = max(1, int(bucket_s)) if bucket_s else _bucket_step(end - start, points)
+            origin = float(int(start // step) * step)   # bucket edges are multiples of step
+            case = "CASE emotion " + " ".join("WHEN ? THEN ?" for _ in labels) + " ELSE 0 END"
+            sql = f"""
+                WITH r AS (
+                    SELECT CAST((ts - ?) / ? AS INTEGER) AS b, emotion, confidence,
+                           ABS(code - LAG(code) OVER (ORDER BY ts, id)) AS d
+                    FROM (SELECT id, ts, emotion, confidence, {case} AS code FROM history{where_sql})
+                )
+                SELECT b, emotion, COUNT(*), SUM(COALESCE(confidence, 0)), SUM(d), COUNT(d), SUM(d >= ?)
+                FROM r GROUP BY b, emotion ORDER BY b
+            """
+            label_params = [v for i, lab in enumerate(labels) for v in (lab, i)]
+            rows = conn.execute(sql, [origin, step] + label_params + params + [drift_threshold]).fetchall()
+
+    counts, conf_sum = {}, {}
+    timeline = {}
+    drift_sum = transitions = events = 0
+    for b, emotion, n, csum, dsum, dn, ev in rows:
+        emotion = emotion or "unknown"
+        counts[emotion] = counts.get(emotion, 0) + n
+        conf_sum[emotion] = conf_sum.get(emotion, 0.0) + csum
+        drift_sum += dsum or 0
+        transitions += dn
+        events += ev or 0
+        t = timeline.setdefault(b, {"n": 0, "conf": 0.0, "dsum": 0, "dn": 0, "counts": {}})
+        t["n"] += n
+        t["conf"] += csum
+        t["dsum"] += dsum or 0
+        t["dn"] += dn
+        t["counts"][emotion] = n
+
+    max_possible = max(1, len(labels) - 1)
+    total = sum(counts.values())
+    emotions = sorted(counts, key=lambda e: (-counts[e], e))
+    avg_drift = drift_sum / transitions if transitions else 0.0
+    series = {"ts": [], "entries": [], "dominant": [], "avg_confidence": [], "stability": [],
+              "counts": {e: [] for e in emotions}}
+    for b in sorted(timeline):
+        t = timeline[b]
+        series["ts"].append(origin + b * step)
+        series["entries"].append(t["n"])
+        series["dominant"].append(min(t["counts"], key=lambda e: (-t["counts"][e], e)))
+        series["avg_confidence"].append(round(t["conf"] / t["n"], 2))
+        series["stability"].append(round(max(0.0, 100.0 * (1.0 - t["dsum"] / t["dn"] / max_possible)), 2)
+                                   if t["dn"] else None)
+        for e in emotions:
+            series["counts"][e].append(t["counts"].get(e, 0))
+    return {
+        "range": {"since": start, "until": end, "first_ts": lo, "last_ts": hi, "bucket_s": step},
+        "entries": total,
+        "counts": {e: counts[e] for e in emotions},
+        "avg_confidence_by_emotion": {e: round(conf_sum[e] / counts[e], 2) for e in emotions},
+        "avg_confidence": round(sum(conf_sum.values()) / total, 2) if total else 0.0,
+        "most_frequent": emotions[0] if emotions else None,
+        "stability": {"avg_drift": round(avg_drift, 3),
+                      "stability": round(max(0.0, 100.0 * (1.0 - avg_drift / max_possible)), 2),
+                      "drift_event_count": int(events), "transitions": int(transitions)},
+        "timeline": series,
+    }
+
+
+def get_history(limit=50, user_id=None, since=None, until=None, before_id=None, emotion=None):
+    rows = _select("history", _HISTORY_COLUMNS, limit, user_id, since, until, before_id, emotion)
     return [
         {
+            "id": r[0],
             "timestamp": r[1],
             "input_type": r[2],
             "filename": r[3],
             "emotion": r[4],
             "confidence": r[5],
             "action": r[6],
+            "user_id": r[7],
+            "ts": r[8],
         }
         for r in rows
     ]
 
-def log_alert(from_emotion, to_emotion, magnitude, confidence_from=None, confidence_to=None, metadata=""):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO alerts (timestamp, from_emotion, to_emotion, magnitude, confidence_from, confidence_to, metadata)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (datetime.now().isoformat(), from_emotion, to_emotion, magnitude, confidence_from or 0.0, confidence_to or 0.0, metadata))
-    conn.commit()
-    conn.close()
 
-def get_alerts(limit=50):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM alerts ORDER BY id DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
+def log_alert(from_emotion, to_emotion, magnitude, confidence_from=None, confidence_to=None, metadata="", user_id="anon"):
+    now = datetime.now()
+    _enqueue(_INSERT_ALERT, [(now.isoformat(), from_emotion, to_emotion, magnitude,
+                              confidence_from or 0.0, confidence_to or 0.0, metadata, user_id or "anon", now.timestamp())])
+
+
+def get_alerts(limit=50, user_id=None, since=None, until=None, before_id=None):
+    rows = _select("alerts", _ALERT_COLUMNS, limit, user_id, since, until, before_id)
     return [
         {
+            "id": r[0],
             "timestamp": r[1],
             "from": r[2],
             "to": r[3],
             "magnitude": r[4],
             "confidence_from": r[5],
             "confidence_to": r[6],
-            "metadata": r[7]
+            "metadata": r[7],
+            "user_id": r[8],
+            "ts": r[9],
         }
         for r in rows
     ]
@@ -0,0 +1,132 @@
+# backend/inference_backends.py
+import os
+import copy
+import warnings
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+from typing import Callable, Dict
+
+# eager | fused | torchscript | int8 | numpy
+INFER_BACKEND = os.getenv("SOULSYNC_INFER_BACKEND", "eager")
+INTRA_OP_THREADS = int(os.getenv("SOULSYNC_INTRA_OP_THREADS", "0"))   # 0 = leave torch's default
+
+N_FEATURES = 40
+BACKENDS = ("eager", "fused", "torchscript", "int8", "numpy")
+
+# a backend must stay this close to eager to be used (int8 is judged on argmax agreement instead)
+PARITY_ATOL = 1e-3
+INT8_MIN_AGREEMENT = 0.98
+
+
+def set_intra_op_threads(n: int = INTRA_OP_THREADS):
+    if n and n > 0:
+        torch.set_num_threads(n)
+
+
+class FusedEmotionCNN(nn.Module):
+    """EmotionCNN with BatchNorm folded into the convolutions and dropout removed (eval only)."""
+
+    def __init__(self, model):
+        super().__init__()
+        model = copy.deepcopy(model).eval()
+        self.conv1 = fuse_conv_bn_eval(model.conv1, model.bn1)
+        self.conv2 = fuse_conv_bn_eval(model.conv2, model.bn2)
+        self.pool = nn.MaxPool1d(2)
+        self.fc1 = model.fc1
+        self.fc2 = model.fc2
+
+    def forward(self, x):
+        x = x.unsqueeze(1)
+        x = self.pool(torch.relu(self.conv1(x)))
+        x = self.pool(torch.relu(self.conv2(x)))
+        x = torch.relu(self.fc1(x.flatten(1)))
+        return self.fc2(x)
+
+
+class NumpyEmotionCNN:
+    """Pure NumPy forward pass over the fused weights: no torch dispatch overhead for tiny batches."""
+
+    def __init__(self, fused: FusedEmotionCNN):
+        def np_(t):
+            return t.detach().cpu().numpy().astype(np.float32)
+        # conv weights (out, in, k) -> (in*k, out) so each conv is one matmul over im2col columns
+        self.w1 = np_(fused.conv1.weight).reshape(fused.conv1.out_channels, -1).T.copy()
+        self.b1 = np_(fused.conv1.bias)
+        self.w2 = np_(fused.conv2.weight).reshape(fused.conv2.out_channels, -1).T.copy()
+        self.b2 = np_(fused.conv2.bias)
+        self.fc1_w, self.fc1_b = np_(fused.fc1.weight).T.copy(), np_(fused.fc1.bias)
+        self.fc2_w, self.fc2_b = np_(fused.fc2.weight).T.copy(), np_(fused.fc2.bias)
+
+    @staticmethod
+    def _conv_relu_pool(x, w, b):
+        # x: (B, L, C) channels-last; kernel 3, padding 1
+        B, L, C = x.shape
+        xp = np.zeros((B, L + 2, C), dtype=np.float32)
+        xp[:, 1:-1] = x
+        # im2col ordered (C, k) to match the torch weight layout (out, in, k)
+        cols = np.stack([xp[:, 0:L], xp[:, 1:L + 1], xp[:, 2:L + 2]], axis=-1).reshape(B, L, C * 3)
+        y = np.maximum(cols @ w + b, 0.0)
+        return y.reshape(B, L // 2, 2, -1).max(axis=2)
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        x = np.asarray(X, dtype=np.float32)[:, :, None]
+        x = self._conv_relu_pool(x, self.w1, self.b1)
+        x = self._conv_relu_pool(x, self.w2, self.b2)
+        x = x.transpose(0, 2, 1).reshape(x.shape[0], -1)   # back to torch's (C, L) flatten order
+        x = np.maximum(x @ self.fc1_w + self.fc1_b, 0.0)
+        return x @ self.fc2_w + self.fc2_b
+
+
+def _torch_runner(module, device) -> Callable[[np.ndarray], np.ndarray]:
+    def run(X):
+        with torch.inference_mode():
+            out = module(torch.as_tensor(np.asarray(X, dtype=np.float32), device=device))
+        return out.float().cpu().numpy()
+    return run
+
+
+def build_backend(model: nn.Module, name: str = INFER_BACKEND, device=None) -> Callable[[np.ndarray], np.ndarray]:
+    """Return a callable mapping scaled features (B, 40) -> logits (B, num_classes) as NumPy."""
+    if name not in BACKENDS:
+        raise ValueError(f"unknown inference backend {name!r}, expected one of {BACKENDS}")
+    device = device or next(model.parameters()).device
+    model = model.eval()
+    if name == "eager":
+        return _torch_runner(model, device)
+    if device.type != "cpu" and name in ("int8", "numpy"):
+        raise ValueError(f"{name} backend is CPU-only")
+    fused = FusedEmotionCNN(model).to(device).eval()
+    if name == "fused":
+        return _torch_runner(fused, device)
+    # jit / ao.quantization emit deprecation warnings on recent torch; they still work
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if name == "torchscript":
+            example = torch.zeros(8, N_FEATURES, device=device)
+            with torch.inference_mode():
+                traced = torch.jit.freeze(torch.jit.trace(fused, example))
+            return _torch_runner(traced, device)
+        if name == "int8":
+            qmodel = torch.ao.quantization.quantize_dynamic(fused, {nn.Linear}, dtype=torch.qint8)
+            return _torch_runner(qmodel, device)
+    return NumpyEmotionCNN(fused)
+
+
+def check_parity(model: nn.Module, runner: Callable, n: int = 512, seed: int = 0) -> Dict[str, float]:
+    """Compare a backend against the eager model on random standardized inputs."""
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, N_FEATURES)).astype(np.float32)
+    ref = _torch_runner(model.eval(), next(model.parameters()).device)(X)
+    got = runner(X)
+    return {
+        "max_abs_diff": float(np.max(np.abs(ref - got))),
+        "argmax_agreement": float(np.mean(ref.argmax(1) == got.argmax(1))),
+    }
+
+
+def parity_ok(name: str, parity: Dict[str, float]) -> bool:
+    if name == "int8":
+        return parity["argmax_agreement"] >= INT8_MIN_AGREEMENT
+    return parity["max_abs_diff"] <= PARITY_ATOL
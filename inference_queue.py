@@ -0,0 +1,154 @@
+# backend/inference_queue.py
+import os
+import time
+import threading
+import queue
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+from backend.executors import Overloaded
+
+# defaults can be overridden from the environment
+MAX_BATCH_SIZE = int(os.getenv("SOULSYNC_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.getenv("SOULSYNC_MAX_WAIT_MS", "5"))
+MAX_QUEUE = int(os.getenv("SOULSYNC_MAX_QUEUE", "256"))
+
+
+class InferenceBatcher:
+    """
+    Micro-batching scheduler: callers submit single items from any thread and get a
+    Future back; one worker thread drains the queue into batches of up to
+    max_batch_size items (waiting at most max_wait_ms after the first item arrives),
+    runs process_batch once per batch and resolves each Future with its own result.
+
+    process_batch(items) must return a list of results in the same order as items.
+    submit() raises Overloaded once max_queue items are waiting.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS,
+                 max_queue: int = MAX_QUEUE, name: str = "inference"):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self.name = name
+        self._queue: "queue.Queue[Tuple[Any, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._reset_stats()
+
+    # ---------- public API ----------
+    def submit(self, item: Any) -> Future:
+        if self._queue.qsize() >= self.max_queue:
+            with self._lock:
+                self._rejected += 1
+            raise Overloaded(f"{self.name} batch queue is full ({self.max_queue} waiting), try again later")
+        fut: Future = Future()
+        self._ensure_started()
+        self._queue.put((item, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, item: Any, timeout: float = None) -> Any:
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(item).result(timeout=timeout)
+
+    def stop(self):
+        self._stopped = True
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            batches = self._batches
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "rejected": self._rejected,
+                "batches": batches,
+                "items": self._items,
+                "errors": self._errors,
+                "avg_batch_size": round(self._items / batches, 3) if batches else 0.0,
+                "max_batch_seen": self._max_batch_seen,
+                "batch_size_histogram": dict(sorted(self._size_hist.items())),
+                "avg_queue_wait_ms": round(1000.0 * self._wait_total / self._items, 3) if self._items else 0.0,
+                "max_queue_wait_ms": round(1000.0 * self._wait_max, 3),
+                "avg_batch_time_ms": round(1000.0 * self._run_total / batches, 3) if batches else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_stats()
+
+    # ---------- internals ----------
+    def _reset_stats(self):
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._rejected = 0
+        self._max_batch_seen = 0
+        self._size_hist: Dict[int, int] = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._worker, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is None:  # stop sentinel: finish this batch, then exit
+                self._stopped = True
+                break
+            batch.append(nxt)
+        return batch
+
+    def _worker(self):
+        while not self._stopped:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect(first)
+            start = time.perf_counter()
+            waits = [start - enq for _, _, enq in batch]
+            try:
+                results = self.process_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"process_batch returned {len(results)} results for {len(batch)} items")
+                for (_, fut, _), res in zip(batch, results):
+                    fut.set_result(res)
+                failed = 0
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                failed = len(batch)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                n = len(batch)
+                self._batches += 1
+                self._items += n
+                self._errors += failed
+                self._max_batch_seen = max(self._max_batch_seen, n)
+                self._size_hist[n] = self._size_hist.get(n, 0) + 1
+                self._wait_total += sum(waits)
+                self._wait_max = max(self._wait_max, max(waits))
+                self._run_total += elapsed
@@ -0,0 +1,264 @@
+# backend/long_audio.py
+"""
+Segment-level emotion timeline for long recordings, in roughly constant memory.
+
+The upload is read from its spooled file in fixed-size blocks (PCM WAV is parsed directly;
+other formats go through soundfile's block reader). Overlapping windows are cut from a
+small carry buffer and gated by a cheap energy VAD. Voiced windows are batched through
+MFCC extraction (the feature pool) and one CNN forward per batch. Live state is bounded by
+one block, one window, and `batch` x `in_flight` windows, regardless of recording length.
+"""
+import os
+import struct
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from backend.feature_engine import default_engine as feature_engine, pcm_to_float32
+
+LONG_AUDIO_WINDOW_S = float(os.getenv("SOULSYNC_LONG_AUDIO_WINDOW_S", "3.0"))
+LONG_AUDIO_HOP_S = float(os.getenv("SOULSYNC_LONG_AUDIO_HOP_S", "1.5"))
+LONG_AUDIO_BLOCK_S = float(os.getenv("SOULSYNC_LONG_AUDIO_BLOCK_S", "10"))
+LONG_AUDIO_BATCH = int(os.getenv("SOULSYNC_LONG_AUDIO_BATCH", "32"))
+LONG_AUDIO_MAX_S = float(os.getenv("SOULSYNC_LONG_AUDIO_MAX_S", "14400"))      # 4 h
+VAD_DB = float(os.getenv("SOULSYNC_VAD_DB", "-40"))                            # frame power gate, dBFS
+VAD_MIN_VOICED = float(os.getenv("SOULSYNC_VAD_MIN_VOICED", "0.2"))            # voiced frame share per window
+VAD_FRAME_S = 0.02
+
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_UNKNOWN_SIZE = (0, 0xFFFFFFFF)   # streaming writers leave the data size unset
+
+
+def read_wav_header(f) -> Optional[Tuple[int, int, int, int, Optional[int]]]:
+    """
+    Walk RIFF chunks up to "data" and leave `f` at the first sample.
+    Returns (format code, channels, sample rate, bits, data bytes or None) or None if not WAV.
+    """
+    head = f.read(12)
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        cid, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if cid == b"data":
+            break
+        if cid == b"fmt ":
+            body = f.read(size + (size & 1))
+            fmt = struct.unpack_from("<HHIIHH", body)
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                fmt = (struct.unpack_from("<H", body, 24)[0],) + fmt[1:]
+        else:
+            f.seek(size + (size & 1), 1)
+    if fmt is None:
+        return None
+    code, channels, sr, _, _, bits = fmt
+    if channels < 1 or bits not in (8, 16, 24, 32, 64):
+        return None
+    return code, channels, int(sr), bits, None if size in _UNKNOWN_SIZE else size
+
+
+def iter_blocks(f, block_s: float = LONG_AUDIO_BLOCK_S) -> Iterator[Tuple[np.ndarray, int]]:
+    """(mono float32 block, sr) pairs from a seekable binary file; one block in memory at a time."""
+    start = f.tell()
+    header = read_wav_header(f)
+    if header is not None:
+        code, channels, sr, bits, remaining = header
+        frame_bytes = bits // 8 * channels
+        block_bytes = max(1, int(block_s * sr)) * frame_bytes
+        while remaining is None or remaining > 0:
+            raw = f.read(block_bytes if remaining is None else min(block_bytes, remaining))
+            n = len(raw) // frame_bytes
+            if n == 0:
+                return
+            y = pcm_to_float32(raw, code, bits, channels, n)
+            if y is None:
+                raise ValueError(f"unsupported WAV sample format (code {code}, {bits} bit)")
+            if remaining is not None:
+                remaining -= len(raw)
+            yield y, sr
+        return
+    f.seek(start)
+    import soundfile as sf   # flac / ogg / mp3 (libsndfile >= 1.1) without loading the whole file
+    with sf.SoundFile(f) as snd:
+        sr = int(snd.samplerate)
+        for block in snd.blocks(blocksize=max(1, int(block_s * sr)), dtype="float32", always_2d=True):
+            yield block.mean(axis=1, dtype=np.float32), sr
+
+
+def iter_windows(blocks, window_s: float, hop_s: float, max_s: float = LONG_AUDIO_MAX_S):
+    """
+    (start_s, window, sr) for windows of window_s every hop_s. The carry buffer never holds
+    more than one window plus one block. A trailing partial window is emitted when it covers
+    audio no earlier window did (or when the whole recording is shorter than one window).
+    """
+    buf = np.zeros(0, dtype=np.float32)
+    offset = next_start = 0          # absolute sample index of buf[0] / of the next window
+    sr = win = hop = None
+    emitted = False
+    for y, block_sr in blocks:
+        if sr is None:
+            sr, win, hop = block_sr, max(1, int(window_s * block_sr)), max(1, int(hop_s * block_sr))
+        buf = np.concatenate((buf, y))
+        while next_start + win <= offset + len(buf):
+            if next_start >= max_s * sr:
+                return
+            s = next_start - offset
+            yield next_start / sr, buf[s:s + win], sr
+            emitted = True
+            next_start += hop
+        drop = min(len(buf), next_start - offset)
+        buf, offset = buf[drop:], offset + drop
+        if offset >= max_s * sr:
+            return
+    if sr is None:
+        return
+    tail = buf[next_start - offset:]
+    if len(tail) >= int(0.25 * sr) and (not emitted or len(tail) > win - hop):
+        yield next_start / sr, tail, sr
+
+
+def voiced_fraction(y: np.ndarray, sr: int, threshold_db: float = VAD_DB, frame_s: float = VAD_FRAME_S) -> float:
+    """Share of frame_s frames whose mean power exceeds threshold_db (dBFS)."""
+    n = max(1, int(frame_s * sr))
+    k = len(y) // n
+    if k == 0:
+        return 0.0
+    frames = y[:k * n].reshape(k, n)
+    power = np.einsum("ij,ij->i", frames, frames) / n
+    return float((power > 10.0 ** (threshold_db / 10.0)).mean())
+
+
+def window_features(windows, sr: int) -> np.ndarray:
+    """(B, 40) mean-MFCC vectors for a list of windows; top-level so the process pool can run it."""
+    return np.stack([feature_engine.mfcc_mean(w, sr) for w in windows])
+
+
+class _Timeline:
+    """Merges ordered per-window results into segments of equal emotion (silence is its own kind)."""
+
+    def __init__(self):
+        self.segments = []
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, start: float, end: float, emotion: Optional[str], confidence: float = 0.0):
+        last = self.segments[-1] if self.segments else None
+        if last is not None and last["emotion"] == emotion and abs(last["end"] - start) < 1e-6:
+            last["end"] = end
+            last["windows"] += 1
+            last["_conf"] += confidence
+        else:
+            self.segments.append({"start": start, "end": end, "emotion": emotion, "windows": 1, "_conf": confidence})
+        if emotion is not None:
+            self.seconds[emotion] = self.seconds.get(emotion, 0.0) + (end - start)
+
+    def extend_to(self, end: float):
+        last = self.segments[-1] if self.segments else None
+        if last is not None and end > last["end"]:
+            if last["emotion"] is not None:
+                self.seconds[last["emotion"]] += end - last["end"]
+            last["end"] = end
+
+    def finish(self):
+        out = []
+        for seg in self.segments:
+            conf = seg.pop("_conf")
+            seg["start"], seg["end"] = round(seg["start"], 3), round(seg["end"], 3)
+            if seg["emotion"] is None:
+                seg["silent"] = True
+            else:
+                seg["confidence"] = round(conf / seg["windows"], 2)
+            out.append(seg)
+        return out
+
+
+def analyze_stream(f, predict_batch: Callable, submit_features: Optional[Callable] = None,
+                   window_s: float = LONG_AUDIO_WINDOW_S, hop_s: float = LONG_AUDIO_HOP_S,
+                   vad_db: float = VAD_DB, min_voiced: float = VAD_MIN_VOICED, batch: int = LONG_AUDIO_BATCH,
+                   in_flight: int = 2, max_s: float = LONG_AUDIO_MAX_S) -> Dict[str, Any]:
+    """
+    Emotion timeline for the audio in file object `f`.
+    predict_batch: list of 40-dim features -> [(emotion, confidence)], e.g. EmotionModel.predict_batch.
+    submit_features: optional fn(window_features, windows, sr) -> Future (the feature pool), so
+    MFCC extraction of up to `in_flight` batches overlaps with reading and scoring.
+    """
+    if not 0 < hop_s <= window_s:
+        raise ValueError("hop_s must be in (0, window_s]")
+    timeline = _Timeline()
+    order = deque()          # [start, end, result]; result None = waiting, False = silent
+    jobs = deque()           # (rows, feature future / array)
+    rows, windows = [], []
+    stats = {"windows": 0, "voiced_windows": 0, "batches": 0}
+    state = {"sr": None, "end": 0.0}
+
+    def drain_order():
+        while order and order[0][2] is not None:
+            start, end, result = order.popleft()
+            if result is False:
+                timeline.add(start, end, None)
+            else:
+                timeline.add(start, end, result[0], result[1])
+
+    def finish_job():
+        job_rows, feats = jobs.popleft()
+        feats = feats.result() if hasattr(feats, "result") else feats
+        for row, pred in zip(job_rows, predict_batch(list(feats))):
+            row[2] = pred
+        stats["batches"] += 1
+        drain_order()
+
+    def flush():
+        nonlocal rows, windows
+        if not windows:
+            return
+        if len(jobs) >= in_flight:
+            finish_job()
+        # a list, not np.stack: the trailing window of a recording is usually shorter
+        if submit_features is not None:
+            jobs.append((rows, submit_features(window_features, windows, state["sr"])))
+        else:
+            jobs.append((rows, window_features(windows, state["sr"])))
+        rows, windows = [], []
+
+    for start, window, sr in iter_windows(iter_blocks(f), window_s, hop_s, max_s):
+        state["sr"] = sr
+        state["end"] = start + len(window) / sr
+        stats["windows"] += 1
+        # each window owns [start, start + hop) of the timeline; the last one is extended below
+        end = min(start + max(1, int(hop_s * sr)) / sr, state["end"])
+        if voiced_fraction(window, sr, vad_db) >= min_voiced:
+            row = [start, end, None]
+            rows.append(row)
+            windows.append(np.array(window, copy=True))   # detach from the carry buffer
+            stats["voiced_windows"] += 1
+        else:
+            row = [start, end, False]
+        order.append(row)
+        if len(windows) >= batch:
+            flush()
+        drain_order()
+    flush()
+    while jobs:
+        finish_job()
+    timeline.extend_to(state["end"])
+
+    segments = timeline.finish()
+    voiced_s = sum(timeline.seconds.values())
+    dominant = max(timeline.seconds, key=timeline.seconds.get) if timeline.seconds else None
+    voiced = [s for s in segments if not s.get("silent")]
+    return {
+        "duration_s": round(state["end"], 3),
+        "voiced_s": round(voiced_s, 3),
+        "sample_rate": state["sr"],
+        "window_s": window_s, "hop_s": hop_s,
+        "windows": stats["windows"], "voiced_windows": stats["voiced_windows"], "batches": stats["batches"],
+        "truncated": state["end"] >= max_s,
+        "dominant_emotion": dominant,
+        "dominant_confidence": round(sum(s["confidence"] * s["windows"] for s in voiced if s["emotion"] == dominant)
+                                     / max(1, sum(s["windows"] for s in voiced if s["emotion"] == dominant)), 2),
+        "emotion_seconds": {e: round(v, 3) for e, v in sorted(timeline.seconds.items(), key=lambda kv: -kv[1])},
+        "segments": segments,
+    }
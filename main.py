@@ -1,8 +1,27 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from backend.router import emotion_router
+from backend.router import emotion_router, registry, music_jobs, default_catalog, action_dispatcher
+from backend import executors, history_db
+from backend.metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
 
-app = FastAPI(title="SoulSync AI API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app):
+    history_db.init_db()
+    registry.start()  # models load in the background; /health/ready flips once they are warm
+    if os.getenv("SPOTIFY_CLIENT_ID"):
+        default_catalog.prefetch()  # all eight curated queries, in the background
+    yield
+    registry.shutdown()
+    music_jobs.stop()
+    action_dispatcher.stop()
+    default_catalog.shutdown()
+    executors.shutdown()
+    history_db.close()  # flush write-behind queue before exit
+
+app = FastAPI(title="SoulSync AI API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -10,4 +29,20 @@ app.add_middleware(
     allow_methods=["*"], allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(emotion_router, prefix="/api/emotion")
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text format: per-stage / per-endpoint latency histograms and prediction counters."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/health/live")
+def health_live():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def health_ready():
+    status = registry.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
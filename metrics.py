@@ -0,0 +1,285 @@
+# backend/metrics.py
+import os
+import json
+import time
+import random
+import bisect
+import logging
+import threading
+from typing import Dict, Iterable, Sequence, Tuple
+
+# seconds; covers a cached hit (~0.1 ms) up to a cold MusicGen render
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+LOG_LEVEL = os.getenv("SOULSYNC_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("SOULSYNC_LOG_FORMAT", "json")              # json | text
+LOG_SAMPLE = float(os.getenv("SOULSYNC_LOG_SAMPLE", "0.01"))       # rate for per-request events
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values, **kw):
+        """Child for one label combination (cache it on hot paths to skip the lookup)."""
+        if kw:
+            values = tuple(kw[n] for n in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _label_str(self, key, extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for key, child in sorted(list(self._children.items())):
+            yield from self._render_child(key, child)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0, **labels):
+        self.labels(**labels).inc(amount)
+
+    def _render_child(self, key, child):
+        yield f"{self.name}_total{self._label_str(key)} {_fmt(child.value)}"
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float, **labels):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels) -> _Timer:
+        return _Timer(self.labels(**labels))
+
+    def _render_child(self, key, child):
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        cumulative = 0
+        for bound, n in zip(self.bounds + (float("inf"),), counts):
+            cumulative += n
+            yield f"{self.name}_bucket{self._label_str(key, [('le', _fmt(bound))])} {cumulative}"
+        yield f"{self.name}_sum{self._label_str(key)} {repr(total)}"
+        yield f"{self.name}_count{self._label_str(key)} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---------- the pipeline's metrics ----------
+REQUEST_SECONDS = REGISTRY.histogram("soulsync_request_seconds", "HTTP request latency by route template.",
+                                     ["endpoint", "method", "status"])
+STAGE_SECONDS = REGISTRY.histogram("soulsync_stage_seconds",
+                                   "Per-request pipeline stage latency (upload_read, decode, mfcc, ...).",
+                                   ["stage", "endpoint", "input_type"])
+BATCH_STAGE_SECONDS = REGISTRY.histogram("soulsync_batch_stage_seconds",
+                                         "Per-batch model stage latency (scale, forward, label_decode).",
+                                         ["stage", "model"])
+BATCH_SIZE = REGISTRY.histogram("soulsync_batch_size", "Items per model forward pass.", ["model"],
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+PREDICTIONS = REGISTRY.counter("soulsync_predictions", "Predictions served.", ["endpoint", "input_type", "emotion"])
+CACHE_LOOKUPS = REGISTRY.counter("soulsync_cache_lookups", "Prediction cache lookups.", ["cache", "result"])
+DB_SECONDS = REGISTRY.histogram("soulsync_db_seconds", "history_db operation latency.", ["op", "table"])
+DB_ROWS = REGISTRY.counter("soulsync_db_rows_written", "Rows committed by the history writer.", ["table"])
+ACTION_COMMANDS = REGISTRY.counter("soulsync_action_commands",
+                                  "Device commands by outcome (sent, failed, timeout, coalesced, debounced, dropped).",
+                                  ["backend", "result"])
+ACTION_DELIVERY_SECONDS = REGISTRY.histogram("soulsync_action_delivery_seconds",
+                                             "Time from dispatch() until the device backend acknowledged the command.",
+                                             ["backend"])
+EVENTS_PUBLISHED = REGISTRY.counter("soulsync_events_published", "Live events published to the event hub.", ["type"])
+EVENT_DELIVERY_SECONDS = REGISTRY.histogram("soulsync_event_delivery_seconds",
+                                            "Event hub fan-out latency: publish() until a subscriber's writer takes it.",
+                                            ["transport"])
+EVENT_SUBSCRIBERS_DROPPED = REGISTRY.counter("soulsync_event_subscribers_dropped",
+                                             "Live-event subscribers disconnected or refused by the hub.",
+                                             ["transport", "reason"])
+TEXT_TIER_ANSWERS = REGISTRY.counter("soulsync_text_tier_answers", "Text classifications answered per cascade tier.",
+                                     ["tier"])
+TEXT_TIER_AGREEMENT = REGISTRY.counter("soulsync_text_tier_agreement",
+                                       "Tier-1 answers compared with the transformer (audit or escalated).",
+                                       ["kind", "result"])
+LOG_EVENTS = REGISTRY.counter("soulsync_log_events", "Structured log events, kept or sampled out.",
+                              ["event", "sampled"])
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware buffering): observes REQUEST_SECONDS by route
+    template, so /music/jobs/{job_id} is one series rather than one per id. Streaming responses
+    are timed until their last body chunk.
+    """
+
+    def __init__(self, app, skip: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip = set(skip)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.labels(endpoint, scope.get("method", ""), status["code"]).observe(time.perf_counter() - start)
+
+
+# ---------- structured logging ----------
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        body = {"ts": round(record.created, 3), "level": record.levelname.lower(), "logger": record.name,
+                "event": record.getMessage()}
+        body.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            body["exc"] = self.formatException(record.exc_info)
+        return json.dumps(body, default=str, ensure_ascii=False)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        return f"{record.levelname:<7} {record.name}: {record.getMessage()} {fields}".rstrip()
+
+
+def get_logger(name: str = "soulsync") -> logging.Logger:
+    root = logging.getLogger("soulsync")
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(_JsonFormatter() if LOG_FORMAT == "json" else _TextFormatter())
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+    return root if name == "soulsync" else root.getChild(name)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, sample: float = 1.0, **fields):
+    """One structured log line; `sample` < 1 keeps that fraction of high-volume events."""
+    if not logger.isEnabledFor(level):
+        return
+    if sample < 1.0 and random.random() >= sample:
+        LOG_EVENTS.labels(event, "dropped").inc()
+        return
+    LOG_EVENTS.labels(event, "kept").inc()
+    if sample < 1.0:
+        fields["sample_rate"] = sample
+    logger.log(level, event, extra={"fields": fields})
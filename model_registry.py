@@ -0,0 +1,124 @@
+# backend/model_registry.py
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from backend.metrics import get_logger, log_event
+
+logger = get_logger("model_registry")
+
+
+class ModelNotReady(RuntimeError):
+    """Raised when a route needs a component that is still loading (or failed); mapped to HTTP 503."""
+
+
+class _Component:
+    def __init__(self, name, loader, warmup, after):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.after = tuple(after)
+        self.state = "pending"      # pending -> loading -> warming -> ready | failed
+        self.value = None
+        self.error = None
+        self.load_ms = None
+        self.warmup_ms = None
+        self.future: Optional[Future] = None
+
+
+class ModelRegistry:
+    """
+    Loads heavy components (weights, pickles, pipelines) in parallel background threads so the
+    worker can bind its port immediately. Each component may depend on others (`after`) and may
+    run a warm-up on the loaded value. Routes call require(name) and get ModelNotReady until
+    that component is ready.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, _Component] = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self.started_at = None
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Callable[[Any], Any] = None,
+                 after: Iterable[str] = ()):
+        self._components[name] = _Component(name, loader, warmup, after)
+
+    def start(self):
+        """Kick off every registered component; returns immediately."""
+        with self._lock:
+            if self._pool is not None:
+                return
+            self.started_at = time.perf_counter()
+            self._pool = ThreadPoolExecutor(max_workers=max(1, len(self._components)), thread_name_prefix="model-load")
+            for comp in self._components.values():
+                comp.future = Future()
+            for comp in self._components.values():
+                self._pool.submit(self._load, comp)
+
+    def _load(self, comp: _Component):
+        try:
+            for dep in comp.after:
+                self._components[dep].future.result()  # re-raises if the dependency failed
+            comp.state = "loading"
+            t0 = time.perf_counter()
+            comp.value = comp.loader()
+            comp.load_ms = round((time.perf_counter() - t0) * 1000, 1)
+            if comp.warmup is not None:
+                comp.state = "warming"
+                t0 = time.perf_counter()
+                comp.warmup(comp.value)
+                comp.warmup_ms = round((time.perf_counter() - t0) * 1000, 1)
+            comp.state = "ready"
+            log_event(logger, "component_ready", component=comp.name, load_ms=comp.load_ms, warmup_ms=comp.warmup_ms or 0)
+            comp.future.set_result(comp.value)
+        except Exception as e:
+            comp.state = "failed"
+            comp.error = f"{type(e).__name__}: {e}"
+            log_event(logger, "component_failed", logging.ERROR, component=comp.name, error=comp.error)
+            comp.future.set_exception(e)
+
+    def require(self, name: str) -> Any:
+        comp = self._components[name]
+        if comp.state != "ready":
+            detail = f": {comp.error}" if comp.error else ""
+            raise ModelNotReady(f"{name} is {comp.state}{detail}")
+        return comp.value
+
+    def peek(self, name: str) -> Any:
+        """The component's value if ready, else None (for stats / version tags)."""
+        comp = self._components.get(name)
+        return comp.value if comp is not None and comp.state == "ready" else None
+
+    def is_ready(self, names: Iterable[str] = None) -> bool:
+        names = list(names) if names is not None else list(self._components)
+        return all(self._components[n].state == "ready" for n in names)
+
+    def wait(self, timeout: float = None, names: Iterable[str] = None) -> bool:
+        """Block until the given (default: all) components settle; True if all are ready."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for n in (list(names) if names is not None else list(self._components)):
+            fut = self._components[n].future
+            if fut is None:
+                return False
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                fut.result(timeout=remaining)
+            except Exception:
+                pass
+        return self.is_ready(names)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "components": {
+                c.name: {"state": c.state, "load_ms": c.load_ms, "warmup_ms": c.warmup_ms, "error": c.error}
+                for c in self._components.values()
+            },
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
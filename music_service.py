@@ -1,35 +1,17 @@
 # backend/music_service.py
 import os
-import io
-import time
-import requests
 from typing import Tuple, Optional
 
-# --- Spotify curated track fetch (Client Credentials flow) ---
-# uses spotipy for convenience
-try:
-    import spotipy
-    from spotipy.oauth2 import SpotifyClientCredentials
-    SPOTIPY_AVAILABLE = True
-except Exception:
-    SPOTIPY_AVAILABLE = False
-
 # --- MusicGen / Audiocraft (optional heavy generation) ---
 try:
     from audiocraft.models import MusicGen
-    from audiocraft.data.audio import audio_write
     import torch
     MUSICGEN_AVAILABLE = True
 except Exception:
     MUSICGEN_AVAILABLE = False
 
-# helper: Spotify client
-def _spotify_client():
-    client_id = os.getenv("SPOTIFY_CLIENT_ID")
-    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-    if not (client_id and client_secret):
-        raise RuntimeError("Spotify credentials not set (SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET)")
-    return spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=client_id, client_secret=client_secret))
+# a pre-rendered library clip stands in for a MusicGen request when its length is this close
+LIBRARY_DURATION_SLACK_S = float(os.getenv("SOULSYNC_LIBRARY_DURATION_SLACK_S", "1.5"))
 
 # curated mapping emotion -> search query (tweakable)
 CURATED_QUERIES = {
@@ -47,62 +29,54 @@ def fetch_spotify_preview_for_emotion(emotion: str) -> Tuple[Optional[str], Opti
     """
     Return (preview_url, None) if preview URL available,
     or (None, bytes) if we download the preview bytes.
+    Search results come from the cached curated catalog (backend/curated_catalog.py), which
+    keeps one pooled Spotify client and refreshes each emotion's query in the background.
     """
-    if not SPOTIPY_AVAILABLE:
-        raise RuntimeError("spotipy not installed")
-    sp = _spotify_client()
-    q = CURATED_QUERIES.get(emotion, CURATED_QUERIES["neutral"])
-    # search top tracks
-    res = sp.search(q, type="track", limit=10)
-    tracks = res.get("tracks", {}).get("items", [])
-    # prefer tracks that have preview_url
-    for t in tracks:
-        preview = t.get("preview_url")
-        if preview:
-            # return direct preview URL (30s mp3)
-            return preview, None
-    # fallback: try first track and try to fetch external_url -> None
-    if tracks:
-        # fallback to full Spotify track url
-        return tracks[0].get("external_urls", {}).get("spotify"), None
-    return None, None
+    from backend.curated_catalog import default_catalog
+    # preview URL if any track has one (30s mp3), else the first track's Spotify page
+    return default_catalog.lookup(emotion), None
+
+def emotion_prompt(emotion: str) -> str:
+    return f"A short instrumental soundtrack evoking {emotion} mood, cinematic and {CURATED_QUERIES.get(emotion,'')}"
 
 # MusicGen generation (if available)
-def generate_music_with_musicgen(prompt: str, duration_s: int = 8) -> bytes:
+def generate_music_with_musicgen(prompt: str, duration_s: int = 8, emotion: str = "") -> bytes:
     """
     Generate a short audio snippet (WAV) for given prompt using MusicGen (audiocraft).
     Returns WAV bytes (16-bit PCM) or raises if unavailable.
     NOTE: requires MUSICGEN_AVAILABLE and device with memory (GPU recommended).
+    The model stays resident in backend/musicgen_service.py; identical requests are coalesced
+    and finished clips are served from its disk cache.
     """
     if not MUSICGEN_AVAILABLE:
         raise RuntimeError("MusicGen not available on server. Install audiocraft and dependencies.")
-    # load model (small by default). Cache model globally if repeated calls are expected.
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model = MusicGen.get_pretrained('melody')  # or 'small' / 'medium' depending on version
-    model.to(device)
-    model.set_generation_params(duration=duration_s)
-    # generate with prompt list
-    wav = model.generate([prompt], progress=True)[0]  # returns numpy array (samples,)
-    # write to bytes buffer as WAV using scipy or soundfile
-    import soundfile as sf
-    bio = io.BytesIO()
-    sf.write(bio, wav, samplerate=32000, format="WAV")
-    bio.seek(0)
-    return bio.read()
+    from backend.musicgen_service import default_service
+    return default_service.generate(emotion, prompt, duration_s)
 
 # Single unified function used by router
 def get_music_for_emotion(emotion: str, mode: str = "curated", duration: int = 8):
     """
-    mode: 'curated' -> spotify preview; 'generated' -> MusicGen; 'auto' -> try generated else curated
-    Returns a dict: {"type":"url"|"bytes", "content": <url or bytes>, "meta": {...}}
+    mode: 'curated' -> spotify preview; 'library' -> pre-rendered clip;
+          'generated' -> pre-rendered clip of about that length, else MusicGen
+    Returns a dict: {"type":"url"|"file", "content": <url or WAV path>, "meta": {...}}
+    Audio is never loaded into memory here; "file" results are paths for FileResponse.
     """
     emotion = (emotion or "neutral").lower()
     mode = mode or "auto"
+    if mode in ("library", "generated"):
+        from backend.soundtrack_library import default_library
+        clip = default_library.pick(emotion, duration)
+        if clip is not None and (mode == "library" or abs(clip["duration"] - duration) <= LIBRARY_DURATION_SLACK_S):
+            return {"type":"file", "content": default_library.object_path(clip["sha256"]),
+                    "meta": {"source":"library", "sha256": clip["sha256"], "prompt": clip.get("prompt", "")}}
+        if mode == "library":
+            return {"type":"error", "message": f"No pre-rendered clip for {emotion}"}
     if mode == "generated":
         try:
-            prompt = f"A short instrumental soundtrack evoking {emotion} mood, cinematic and {CURATED_QUERIES.get(emotion,'')}"
-            audio_bytes = generate_music_with_musicgen(prompt, duration_s=duration)
-            return {"type":"bytes", "content": audio_bytes, "meta": {"source":"musicgen", "prompt": prompt}}
+            from backend.musicgen_service import default_service
+            prompt = emotion_prompt(emotion)
+            path = default_service.submit(emotion, prompt, duration).future.result()
+            return {"type":"file", "content": path, "meta": {"source":"musicgen", "prompt": prompt}}
         except Exception as e:
             # bubble up or fallback
             return {"type":"error", "message": str(e)}
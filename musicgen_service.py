@@ -0,0 +1,322 @@
+# backend/musicgen_service.py
+import os
+import time
+import uuid
+import queue
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.executors import Overloaded
+from backend.music_service import MUSICGEN_AVAILABLE, emotion_prompt
+from backend.metrics import get_logger, log_event
+
+logger = get_logger("musicgen")
+
+MUSICGEN_MODEL = os.getenv("SOULSYNC_MUSICGEN_MODEL", "melody")
+MUSIC_CACHE_DIR = os.getenv("SOULSYNC_MUSIC_CACHE_DIR", "music_cache")
+MUSIC_CACHE_MAX_MB = float(os.getenv("SOULSYNC_MUSIC_CACHE_MAX_MB", "512"))
+MUSIC_MAX_BATCH = int(os.getenv("SOULSYNC_MUSIC_MAX_BATCH", "4"))
+MUSIC_MAX_QUEUE = int(os.getenv("SOULSYNC_MUSIC_MAX_QUEUE", "32"))
+MUSIC_JOB_TTL_S = float(os.getenv("SOULSYNC_MUSIC_JOB_TTL_S", "3600"))
+
+# generator(prompts, duration_s) -> (list of float32 arrays shaped (samples, channels), sample_rate)
+Generator = Callable[[Sequence[str], int], Tuple[List[np.ndarray], int]]
+
+
+def clip_key(emotion: str, prompt: str, duration: int) -> str:
+    raw = f"{(emotion or '').lower()}|{' '.join((prompt or '').split())}|{int(duration)}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class MusicGenGenerator:
+    """Loads MusicGen once and keeps it resident; each call generates a whole batch of prompts."""
+
+    def __init__(self, model_name: str = MUSICGEN_MODEL):
+        self.model_name = model_name
+        self.model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self.model is None:
+                if not MUSICGEN_AVAILABLE:
+                    raise RuntimeError("MusicGen not available on server. Install audiocraft and dependencies.")
+                import torch
+                from audiocraft.models import MusicGen
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                self.model = MusicGen.get_pretrained(self.model_name, device=device)
+        return self.model
+
+    def __call__(self, prompts, duration_s):
+        model = self.load()
+        model.set_generation_params(duration=duration_s)
+        wav = model.generate(list(prompts), progress=False)   # (batch, channels, samples)
+        return [w.detach().cpu().numpy().T.astype(np.float32) for w in wav], model.sample_rate
+
+
+class ClipCache:
+    """
+    LRU disk cache of finished WAV clips, one <key>.wav file per (emotion, prompt, duration).
+    Recency survives restarts through file mtimes; the oldest clips are evicted past max_bytes.
+    """
+
+    def __init__(self, directory: str = MUSIC_CACHE_DIR, max_mb: float = MUSIC_CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()   # key -> size, oldest first
+        self.hits = self.misses = self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".wav"):
+                st = os.stat(os.path.join(directory, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._index or not os.path.exists(self.path(key)):
+                self._index.pop(key, None)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+        return self.path(key)
+
+    def put(self, key: str, audio: np.ndarray, sr: int) -> str:
+        import soundfile as sf
+        path = self.path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        sf.write(tmp, audio, samplerate=sr, format="WAV", subtype="PCM_16")
+        os.replace(tmp, path)
+        with self._lock:
+            self._index[key] = os.path.getsize(path)
+            self._index.move_to_end(key)
+            self._evict()
+        return path
+
+    def _evict(self):
+        total = sum(self._index.values())
+        while total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            total -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"clips": len(self._index), "bytes": sum(self._index.values()), "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class MusicJob:
+    def __init__(self, key, emotion, prompt, duration):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.emotion = emotion
+        self.prompt = prompt
+        self.duration = duration
+        self.status = "queued"      # queued -> running -> done | failed
+        self.cached = False
+        self.path = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.future: Future = Future()   # resolves to the WAV path
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"job_id": self.id, "status": self.status, "emotion": self.emotion, "prompt": self.prompt,
+                "duration": self.duration, "cached": self.cached, "error": self.error,
+                "created": self.created, "finished": self.finished}
+
+
+class MusicGenService:
+    """
+    Job queue in front of one resident generator.
+
+    submit() returns a MusicJob immediately: a finished one on a clip-cache hit, the in-flight
+    job when an identical (emotion, prompt, duration) request is already queued or running,
+    otherwise a new queued job. A single worker thread drains the queue and hands up to
+    max_batch prompts of the same duration to one generate call. Callers poll the job or wait on
+    job.future.
+    """
+
+    def __init__(self, generator: Optional[Generator] = None, cache: Optional[ClipCache] = None,
+                 max_batch: int = MUSIC_MAX_BATCH, max_queue: int = MUSIC_MAX_QUEUE,
+                 job_ttl_s: float = MUSIC_JOB_TTL_S):
+        self.generator = generator or MusicGenGenerator()
+        self.cache = cache
+        self.max_batch = max(1, int(max_batch))
+        self.max_queue = max(1, int(max_queue))
+        self.job_ttl_s = job_ttl_s
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[MusicJob]]" = queue.Queue()
+        self._jobs: Dict[str, MusicJob] = {}
+        self._active: Dict[str, MusicJob] = {}    # clip key -> queued/running job
+        self._worker = None
+        self.submitted = self.coalesced = self.cache_hits = self.rejected = 0
+        self.generate_calls = self.generated = self.failed = 0
+        self.generate_s = 0.0
+
+    # ---------- public API ----------
+    def submit(self, emotion: str, prompt: Optional[str] = None, duration: int = 8) -> MusicJob:
+        emotion = (emotion or "neutral").lower()
+        prompt = prompt or emotion_prompt(emotion)
+        duration = int(duration)
+        key = clip_key(emotion, prompt, duration)
+        self._ensure_cache()
+        with self._lock:
+            self.submitted += 1
+            self._prune()
+            active = self._active.get(key)
+            if active is not None:
+                self.coalesced += 1
+                return active
+            job = MusicJob(key, emotion, prompt, duration)
+            path = self.cache.get(key)
+            if path is not None:
+                self.cache_hits += 1
+                job.cached = True
+                self._finish(job, path=path)
+            else:
+                if len(self._active) >= self.max_queue:
+                    self.rejected += 1
+                    raise Overloaded(f"music generation queue is full ({self.max_queue} jobs)")
+                self._active[key] = job
+                self._queue.put(job)
+                self._ensure_worker()
+            self._jobs[job.id] = job
+            return job
+
+    def get(self, job_id: str) -> Optional[MusicJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def generate(self, emotion: str, prompt: Optional[str] = None, duration: int = 8,
+                 timeout: Optional[float] = None) -> bytes:
+        """Blocking convenience wrapper: submit, wait, return the WAV bytes."""
+        path = self.submit(emotion, prompt, duration).future.result(timeout=timeout)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def preload(self):
+        load = getattr(self.generator, "load", None)
+        if load is not None:
+            load()
+
+    def stop(self):
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {
+                "queued": self._queue.qsize(), "active": len(self._active), "jobs": len(self._jobs),
+                "submitted": self.submitted, "coalesced": self.coalesced, "cache_hits": self.cache_hits,
+                "rejected": self.rejected, "generate_calls": self.generate_calls, "generated": self.generated,
+                "failed": self.failed,
+                "avg_batch_size": round(self.generated / self.generate_calls, 2) if self.generate_calls else 0.0,
+                "avg_generate_s": round(self.generate_s / self.generate_calls, 2) if self.generate_calls else 0.0,
+                "model_resident": getattr(self.generator, "model", True) is not None,
+            }
+        out["cache"] = self.cache.stats() if self.cache is not None else None
+        return out
+
+    # ---------- internals ----------
+    def _ensure_cache(self):
+        if self.cache is None:
+            with self._lock:
+                if self.cache is None:
+                    self.cache = ClipCache()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="musicgen-worker", daemon=True)
+            self._worker.start()
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl_s
+        for job_id in [j.id for j in self._jobs.values() if j.finished is not None and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _finish(self, job: MusicJob, path: str = None, error: Exception = None):
+        job.finished = time.time()
+        if error is None:
+            job.status, job.path = "done", path
+            job.future.set_result(path)
+        else:
+            job.status, job.error = "failed", f"{type(error).__name__}: {error}"
+            job.future.set_exception(error)
+
+    def _next_batch(self, first: MusicJob) -> List[MusicJob]:
+        # generation params are per call, so only same-duration jobs share a batch
+        batch, deferred = [first], []
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)
+                break
+            (batch if job.duration == first.duration else deferred).append(job)
+        for job in deferred:
+            self._queue.put(job)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._next_batch(first)
+            for job in batch:
+                job.status = "running"
+            start = time.perf_counter()
+            try:
+                clips, sr = self.generator([j.prompt for j in batch], first.duration)
+                clips = list(clips)
+                results = [(job, self.cache.put(job.key, clip, sr), None) for job, clip in zip(batch, clips)]
+                if len(clips) < len(batch):
+                    # never leave a job unfinished: its future would hang and its key keep coalescing
+                    missing = RuntimeError(f"generator returned {len(clips)} clips for {len(batch)} prompts")
+                    log_event(logger, "musicgen_batch_short", logging.ERROR, batch=len(batch), clips=len(clips))
+                    results += [(job, None, missing) for job in batch[len(clips):]]
+            except Exception as e:
+                log_event(logger, "musicgen_batch_failed", logging.ERROR, batch=len(batch), error=str(e))
+                results = [(job, None, e) for job in batch]
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.generate_calls += 1
+                self.generate_s += elapsed
+                for job, path, error in results:
+                    self._active.pop(job.key, None)
+                    if error is None:
+                        self.generated += 1
+                    else:
+                        self.failed += 1
+                    self._finish(job, path=path, error=error)
+
+
+default_service = MusicGenService()
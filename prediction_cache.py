@@ -0,0 +1,198 @@
+# backend/prediction_cache.py
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from backend.metrics import get_logger, log_event
+
+# xxhash is much faster than any hashlib digest on multi-MB uploads; optional
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except Exception:
+    XXHASH_AVAILABLE = False
+
+CACHE_ENTRIES = int(os.getenv("SOULSYNC_CACHE_ENTRIES", "4096"))
+CACHE_TTL_S = float(os.getenv("SOULSYNC_CACHE_TTL_S", "3600"))
+CACHE_DIR = os.getenv("SOULSYNC_CACHE_DIR", "")   # empty -> memory tier only
+
+logger = get_logger("prediction_cache")
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    # collapse whitespace only; casing / punctuation can change the sentiment model's answer
+    return " ".join((text or "").split())
+
+
+def file_version(*paths: str) -> str:
+    """Cheap version tag from (size, mtime) of the given files; changes whenever any is rewritten."""
+    parts = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            parts.append(f"{p}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{p}:missing")
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+
+class PredictionCache:
+    """
+    Content-addressed LRU + TTL cache for model outputs.
+
+    Keys are content digests (see content_hash); every entry is also tagged with the current
+    model version from version_fn, which is re-checked at most every version_check_s seconds.
+    When the version changes, both tiers are dropped. The optional disk tier stores one small
+    JSON file per entry under disk_dir/<name>/<version>/.
+
+    Callers read `version` right after a miss and hand it back to put(), so a prediction that
+    was computed while the model was being reloaded is dropped instead of cached as current.
+    """
+
+    def __init__(self, name: str, version_fn: Callable[[], str] = lambda: "static",
+                 max_entries: int = CACHE_ENTRIES, ttl_s: float = CACHE_TTL_S,
+                 disk_dir: Optional[str] = CACHE_DIR or None, version_check_s: float = 1.0):
+        self.name = name
+        self.version_fn = version_fn
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self.disk_root = os.path.join(disk_dir, name) if disk_dir else None
+        self.version_check_s = version_check_s
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()   # digest -> (expires_at, value)
+        self._version = version_fn()
+        self._version_checked = time.monotonic()
+        self.hits = self.disk_hits = self.misses = self.evictions = self.expired = self.invalidations = 0
+        self.stale_puts = 0
+
+    # ---------- public API ----------
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def get(self, digest: str) -> Optional[Any]:
+        self._check_version()
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(digest)
+            if item is not None:
+                if item[0] >= now:
+                    self._mem.move_to_end(digest)
+                    self.hits += 1
+                    return item[1]
+                del self._mem[digest]
+                self.expired += 1
+        value = self._disk_get(digest, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._mem_put(digest, value, now)
+        return value
+
+    def put(self, digest: str, value: Any, version: Optional[str] = None):
+        """Store value; skipped when version (as read at lookup time) is no longer current."""
+        self._check_version()
+        now = time.time()
+        with self._lock:
+            if version is not None and version != self._version:
+                self.stale_puts += 1
+                return
+            version = self._version
+            self._mem_put(digest, value, now)
+        self._disk_put(digest, value, version)
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+        if self.disk_root and os.path.isdir(self.disk_root):
+            shutil.rmtree(self.disk_root, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "name": self.name,
+                "version": self._version,
+                "entries": len(self._mem),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "disk_tier": bool(self.disk_root),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+    # ---------- internals ----------
+    def _mem_put(self, digest, value, now):
+        self._mem[digest] = (now + self.ttl_s, value)
+        self._mem.move_to_end(digest)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._version_checked < self.version_check_s:
+            return
+        self._version_checked = now
+        version = self.version_fn()
+        if version != self._version:
+            log_event(logger, "cache_invalidated", cache=self.name, old_version=self._version, new_version=version)
+            # swap version and drop the memory tier together, so no put() lands in between
+            with self._lock:
+                self._version = version
+                self._mem.clear()
+                self.invalidations += 1
+            if self.disk_root and os.path.isdir(self.disk_root):
+                shutil.rmtree(self.disk_root, ignore_errors=True)
+
+    def _disk_path(self, digest, version=None):
+        return os.path.join(self.disk_root, version or self._version, digest[:2], digest + ".json")
+
+    def _disk_get(self, digest, now):
+        if not self.disk_root:
+            return None
+        path = self._disk_path(digest)
+        try:
+            if os.path.getmtime(path) + self.ttl_s < now:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            return tuple(value) if isinstance(value, list) else value
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, digest, value, version):
+        if not self.disk_root:
+            return
+        path = self._disk_path(digest, version)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp, path)  # atomic, so readers never see half a file
+        except OSError as e:
+            log_event(logger, "cache_disk_write_failed", logging.WARNING, cache=self.name, error=str(e))
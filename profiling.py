@@ -0,0 +1,215 @@
+# backend/profiling.py
+import os
+import io
+import sys
+import hmac
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+# empty token -> profiling disabled; requests opt in with `X-Profile: <token>`
+PROFILE_TOKEN = os.getenv("SOULSYNC_PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("SOULSYNC_PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("SOULSYNC_PROFILE_KEEP", "50"))
+PROFILE_INTERVAL_MS = float(os.getenv("SOULSYNC_PROFILE_INTERVAL_MS", "2"))
+PROFILE_HEADER = "x-profile"
+PROFILE_MODE_HEADER = "x-profile-mode"      # sampling (default) | cprofile
+
+# leaf frames of threads that are parked, not working; dropped from sampling reports
+_IDLE_LEAVES = {("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select"),
+                ("threading.py", "_wait_for_tstate_lock"), ("base_events.py", "_run_once"),
+                ("thread.py", "_worker"), ("connection.py", "wait"), ("connection.py", "_recv")}
+
+
+def authorized(request: Request, header: str = PROFILE_HEADER) -> bool:
+    # constant-time compare: this header gates stack dumps of the production process
+    supplied = request.headers.get(header)
+    return bool(PROFILE_TOKEN) and supplied is not None and hmac.compare_digest(
+        supplied.encode("utf-8"), PROFILE_TOKEN.encode("utf-8"))
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler over every thread in the process (sys._current_frames), so work done on
+    the batcher threads (CNN forward, transformers pipeline) shows up next to the handler.
+    Output is collapsed stacks: "thread;outer;...;leaf count", ready for flamegraph tools.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, include_idle: bool = False):
+        self.interval_s = interval_ms / 1000.0
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((os.path.basename(code.co_filename), code.co_name))
+                    frame = frame.f_back
+                if not stack or (not self.include_idle and stack[0] in _IDLE_LEAVES):
+                    continue
+                key = ";".join([names.get(tid, str(tid))] + [f"{f}:{n}" for f, n in reversed(stack)])
+                self.stacks[key] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class CProfileProfiler:
+    """
+    Deterministic cProfile of the handler's own thread (the event loop); pstats output.
+    cProfile hooks one thread only: time spent in the feature pool processes or on the
+    batcher / threadpool threads shows up as the await that waited for it. Use the
+    sampling mode to see that work.
+    """
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        return False
+
+
+class ProfileStore:
+    """Bounded on-disk ring: <dir>/<id>.json metadata + <id>.collapsed or <id>.prof, oldest pruned."""
+
+    def __init__(self, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = max(1, keep)
+        self._lock = threading.Lock()
+
+    def save(self, profiler, meta: Dict[str, Any]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        report_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        if isinstance(profiler, SamplingProfiler):
+            meta.update(mode="sampling", samples=profiler.samples, interval_ms=profiler.interval_s * 1000)
+            with open(self._path(report_id, "collapsed"), "w", encoding="utf-8") as f:
+                f.write(profiler.collapsed())
+        else:
+            meta.update(mode="cprofile")
+            profiler.profile.dump_stats(self._path(report_id, "prof"))
+        meta["id"] = report_id
+        with open(self._path(report_id, "json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self._prune()
+        return report_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        out = []
+        for rid in self._ids():
+            try:
+                with open(self._path(rid, "json"), "r", encoding="utf-8") as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return out[::-1]   # newest first
+
+    def meta(self, report_id: str) -> Optional[Dict[str, Any]]:
+        if report_id not in self._ids():
+            return None
+        with open(self._path(report_id, "json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def render(self, report_id: str, fmt: str) -> Optional[tuple]:
+        """(body, media_type) for fmt collapsed | pstats | text, or None if not available."""
+        meta = self.meta(report_id)
+        if meta is None:
+            return None
+        if meta["mode"] == "sampling":
+            if fmt not in ("collapsed", "text"):
+                return None
+            with open(self._path(report_id, "collapsed"), "r", encoding="utf-8") as f:
+                return f.read(), "text/plain; charset=utf-8"
+        path = self._path(report_id, "prof")
+        if fmt == "pstats":
+            with open(path, "rb") as f:
+                return f.read(), "application/octet-stream"
+        if fmt == "text":
+            buf = io.StringIO()
+            pstats.Stats(path, stream=buf).sort_stats("cumulative").print_stats(60)
+            return buf.getvalue(), "text/plain; charset=utf-8"
+        return None
+
+    def _path(self, report_id, ext):
+        return os.path.join(self.directory, f"{report_id}.{ext}")
+
+    def _ids(self) -> List[str]:
+        try:
+            return sorted(n[:-5] for n in os.listdir(self.directory) if n.endswith(".json"))
+        except OSError:
+            return []
+
+    def _prune(self):
+        with self._lock:
+            ids = self._ids()
+            for rid in ids[:max(0, len(ids) - self.keep)]:
+                for ext in ("json", "collapsed", "prof"):
+                    try:
+                        os.remove(self._path(rid, ext))
+                    except OSError:
+                        pass
+
+
+default_store = ProfileStore()
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute that wraps the handler in a profiler when the request carries a valid X-Profile
+    header. The report id comes back in the X-Profile-Id response header. For streaming
+    responses only the work up to the handler's return is covered.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            if not authorized(request):
+                return await handler(request)
+            mode = request.headers.get(PROFILE_MODE_HEADER, "sampling").lower()
+            profiler = CProfileProfiler() if mode == "cprofile" else SamplingProfiler()
+            start = time.perf_counter()
+            with profiler:
+                response = await handler(request)
+            meta = {"path": request.url.path, "route": self.path, "method": request.method,
+                    "status": response.status_code, "created": time.time(),
+                    "wall_ms": round((time.perf_counter() - start) * 1000.0, 2)}
+            # writing .collapsed / .prof and pruning is file I/O: keep it off the event loop
+            response.headers["X-Profile-Id"] = await run_in_threadpool(default_store.save, profiler, meta)
+            return response
+
+        return route_handler
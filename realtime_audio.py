@@ -0,0 +1,139 @@
+# backend/realtime_audio.py
+"""
+Incremental MFCC state for live PCM streams (the /stream WebSocket).
+
+Incoming samples land in a short carry buffer; every complete STFT frame (n_fft samples,
+hop_length apart) is windowed, transformed and projected to log-mel exactly once and written
+into a fixed-size ring that covers the sliding analysis window. An update then only clamps
+the ring to top_db, averages it and applies the DCT. Compared with FeatureEngine.mfcc_mean on
+the same audio, the only difference is that frames are not zero-padded (centered) at the
+window edges.
+"""
+import os
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from backend.feature_engine import default_engine, FeatureEngine, TOP_DB
+
+STREAM_WINDOW_S = float(os.getenv("SOULSYNC_STREAM_WINDOW_S", "3.0"))
+STREAM_UPDATE_MS = float(os.getenv("SOULSYNC_STREAM_UPDATE_MS", "500"))
+STREAM_MIN_S = float(os.getenv("SOULSYNC_STREAM_MIN_S", "1.0"))      # audio needed before the first update
+STREAM_MAX_CHUNK_S = float(os.getenv("SOULSYNC_STREAM_MAX_CHUNK_S", "5"))
+ENCODINGS = {"s16le": ("<i2", 1.0 / 32768.0), "f32le": ("<f4", 1.0)}
+
+
+class StreamingMFCC:
+    """Ring of per-frame log-mel spectra and frame powers over the last window_s of audio."""
+
+    def __init__(self, sr: int, window_s: float = STREAM_WINDOW_S, engine: FeatureEngine = default_engine):
+        self.sr = int(sr)
+        self.engine = engine
+        self.n_fft, self.hop = engine.n_fft, engine.hop_length
+        self.capacity = max(1, int(window_s * self.sr) // self.hop)
+        self.log_mel = np.zeros((self.capacity, engine.n_mels), dtype=np.float32)
+        self.power = np.zeros(self.capacity, dtype=np.float32)   # mean time-domain power per frame
+        self.frames = 0            # frames computed so far (ring write index = frames % capacity)
+        self.samples = 0
+        self._carry = np.zeros(0, dtype=np.float32)
+
+    def push(self, y: np.ndarray) -> int:
+        """Append mono float32 samples; returns how many new frames were computed."""
+        self.samples += len(y)
+        buf = np.concatenate((self._carry, y)) if len(self._carry) else np.asarray(y, dtype=np.float32)
+        if len(buf) < self.n_fft:
+            self._carry = buf
+            return 0
+        frames = np.lib.stride_tricks.sliding_window_view(buf, self.n_fft)[::self.hop]
+        self._carry = buf[len(frames) * self.hop:]
+        # only the newest `capacity` frames can still matter for the window
+        frames = frames[-self.capacity:]
+        skipped = (len(buf) - self.n_fft) // self.hop + 1 - len(frames)
+        self.frames += skipped
+        log_mel = self.engine.frames_log_mel(frames, self.sr)
+        power = np.einsum("ij,ij->i", frames, frames) / self.n_fft
+        idx = (self.frames + np.arange(len(frames))) % self.capacity
+        self.log_mel[idx] = log_mel
+        self.power[idx] = power
+        self.frames += len(frames)
+        return len(frames)
+
+    @property
+    def filled(self) -> int:
+        return min(self.frames, self.capacity)
+
+    @property
+    def seconds(self) -> float:
+        return self.samples / self.sr
+
+    def features(self) -> np.ndarray:
+        """40-dim mean MFCC over the frames currently in the window."""
+        log_mel = self.log_mel[:self.filled]
+        log_mel = np.maximum(log_mel, log_mel.max() - TOP_DB)
+        return self.engine.dct @ log_mel.mean(axis=0, dtype=np.float64)
+
+    def voiced_fraction(self, threshold_db: float) -> float:
+        if not self.filled:
+            return 0.0
+        return float((self.power[:self.filled] > 10.0 ** (threshold_db / 10.0)).mean())
+
+
+class StreamSession:
+    """
+    One live connection: decodes raw PCM chunks and decides when an update is due.
+    Updates are spaced by stream time (update_ms of audio), so a replay faster than real time
+    produces the same predictions as a live feed; a chunk spanning several intervals yields one.
+    """
+
+    def __init__(self, sample_rate: int = 16000, encoding: str = "s16le", channels: int = 1,
+                 window_s: float = STREAM_WINDOW_S, update_ms: float = STREAM_UPDATE_MS,
+                 min_s: float = STREAM_MIN_S):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {sorted(ENCODINGS)}")
+        if not 8000 <= sample_rate <= 96000 or not 1 <= channels <= 8:
+            raise ValueError("sample_rate must be 8000..96000 and channels 1..8")
+        if not 0.5 <= window_s <= 30 or not 50 <= update_ms <= 10000:
+            raise ValueError("window_s must be 0.5..30 and update_ms 50..10000")
+        self.dtype, self.scale = ENCODINGS[encoding]
+        self.channels = channels
+        self.frame_bytes = np.dtype(self.dtype).itemsize * channels
+        self.max_chunk_bytes = int(STREAM_MAX_CHUNK_S * sample_rate) * self.frame_bytes
+        self.mfcc = StreamingMFCC(sample_rate, window_s)
+        self.update_samples = max(1, int(update_ms / 1000.0 * sample_rate))
+        self.min_samples = int(min(min_s, window_s) * sample_rate)
+        self.next_update = max(self.min_samples, self.update_samples)
+        self.chunks = 0
+        self.updates = 0
+        self._partial = b""
+        self.started = time.time()
+
+    def decode(self, data: bytes) -> np.ndarray:
+        if len(data) > self.max_chunk_bytes:
+            raise ValueError(f"chunk larger than {STREAM_MAX_CHUNK_S:g}s of audio")
+        if self._partial:
+            data = self._partial + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self._partial = data[usable:]
+        y = np.frombuffer(data, dtype=self.dtype, count=usable // np.dtype(self.dtype).itemsize).astype(np.float32)
+        if self.scale != 1.0:
+            y *= self.scale
+        if self.channels > 1:
+            y = y.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        return y
+
+    def feed(self, data: bytes) -> bool:
+        """Consume one binary message; True when a new prediction is due."""
+        self.chunks += 1
+        self.mfcc.push(self.decode(data))
+        if self.mfcc.samples < self.next_update:
+            return False
+        # skip intervals a large chunk jumped over instead of queueing a burst of updates
+        behind = (self.mfcc.samples - self.next_update) // self.update_samples
+        self.next_update += (behind + 1) * self.update_samples
+        self.updates += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"seconds": round(self.mfcc.seconds, 3), "frames": self.mfcc.frames, "chunks": self.chunks,
+                "updates": self.updates, "wall_s": round(time.time() - self.started, 3)}
@@ -1,19 +1,84 @@
 # backend/router.py
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from backend.emotion_model import EmotionModel
+import os
+import json
+import time
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from backend.emotion_model import EmotionModel, extract_features, extract_features_timed, MODEL_PATH, SCALER_PATH, LABEL_ENCODER_PATH
 from backend.action_engine import ActionEngine
+from backend.action_dispatcher import default_dispatcher as action_dispatcher
+from backend.event_hub import default_hub as event_hub, SlowConsumer, TooManySubscribers, parse_types, sse_format, EVENTS_HEARTBEAT_S
 from backend import history_db
-from backend.drift_detector import EmotionDriftDetector
-from transformers import pipeline
+from backend.drift_detector import EmotionDriftDetector, OnlineDriftDetector, EMOTION_ORDER
+from backend.inference_queue import InferenceBatcher
+from backend import executors
+from backend.executors import Overloaded
+from backend.prediction_cache import PredictionCache, content_hash, normalize_text, file_version
+from backend.utils import is_archive, unpack_audio_archive, silent_wav
+from backend import long_audio
+from backend.realtime_audio import StreamSession
+from backend.text_engine import TextInferenceEngine
+from backend.text_cascade import load_cascade
+from backend.model_registry import ModelRegistry, ModelNotReady
+from backend.musicgen_service import default_service as music_jobs
+from backend.music_service import get_music_for_emotion, LIBRARY_DURATION_SLACK_S
+from backend.soundtrack_library import default_library as soundtracks
+from backend.curated_catalog import default_catalog
+from backend.metrics import STAGE_SECONDS, PREDICTIONS, CACHE_LOOKUPS
+from backend import profiling
 from pydantic import BaseModel
-from typing import Optional
+import numpy as np
+import torch
+from typing import Dict, List, Optional
 
-emotion_router = APIRouter()
-model = EmotionModel()
+BATCH_MAX_FILES = int(os.getenv("SOULSYNC_BATCH_MAX_FILES", "1000"))
+TEXT_BATCH_MAX = int(os.getenv("SOULSYNC_TEXT_BATCH_MAX", "1000"))
+DRIFT_SEED_ROWS = int(os.getenv("SOULSYNC_DRIFT_SEED_ROWS", "200"))
+MUSIC_MAX_DURATION = int(os.getenv("SOULSYNC_MUSIC_MAX_DURATION", "30"))
+
+# any route can be profiled per request with `X-Profile: $SOULSYNC_PROFILE_TOKEN` (see backend/profiling.py)
+emotion_router = APIRouter(route_class=profiling.ProfiledRoute)
+# weights / pickles / text pipeline are loaded in the background by the registry (see main.py lifespan)
+model = EmotionModel(load=False)
+# concurrent /analyze_audio calls share one scaler pass + CNN forward per batch
+audio_batcher = InferenceBatcher(model.predict_batch, name="audio")
 engine = ActionEngine()
-classifier = pipeline("sentiment-analysis")
 drift_detector = EmotionDriftDetector()
-history_db.init_db()
+online_drift = OnlineDriftDetector()
+
+def _load_text_engine():
+    from transformers import pipeline  # slow import, keep it off the module import path
+    return TextInferenceEngine(pipeline("sentiment-analysis"))
+
+def _warm_feature_pool(_):
+    # spawn the feature workers now (each imports torch) instead of on the first upload
+    wav = silent_wav()
+    pool = executors.feature_pool()
+    for fut in [pool.submit(extract_features, wav) for _ in range(executors.FEATURE_WORKERS)]:
+        fut.result()
+
+registry = ModelRegistry()
+registry.register("audio_weights", model.load_weights)
+registry.register("audio_preprocessors", model.load_preprocessors)
+registry.register("audio", lambda: model, warmup=lambda m: audio_batcher.predict(np.zeros(40)),
+                  after=("audio_weights", "audio_preprocessors"))
+registry.register("feature_pool", lambda: executors.feature_pool(), warmup=_warm_feature_pool)
+registry.register("text", _load_text_engine, warmup=lambda eng: eng.classify("warming up"))
+# hashed n-gram tier in front of the transformer; always ready (no model file -> everything escalates)
+registry.register("text_cascade", load_cascade)
+
+def _text_model_tag():
+    eng = registry.peek("text")
+    cascade = registry.peek("text_cascade")
+    return (getattr(getattr(eng, "model", None), "name_or_path", "sentiment-analysis")
+            + "|" + (cascade.tag if cascade is not None else "off"))
+
+# repeated clips / texts skip decode + forward pass; the audio cache drops itself when the weights change
+audio_cache = PredictionCache("audio", version_fn=lambda: file_version(MODEL_PATH, SCALER_PATH, LABEL_ENCODER_PATH))
+text_cache = PredictionCache("text", version_fn=_text_model_tag)
 
 class AlertPayload(BaseModel):
     from_emotion: str
@@ -22,45 +87,407 @@ class AlertPayload(BaseModel):
     confidence_from: Optional[float] = None
     confidence_to: Optional[float] = None
     metadata: Optional[str] = ""
+    user_id: Optional[str] = "anon"
+
+class TextBatchPayload(BaseModel):
+    texts: List[str]
+    user_id: Optional[str] = "anon"
+
+def _ensure_drift_state(user_id):
+    # first time we see a user in this process (or since LRU eviction): replay their recent rows
+    if not online_drift.known(user_id):
+        online_drift.seed(user_id, history_db.get_history(limit=DRIFT_SEED_ROWS, user_id=user_id))
+
+# user_id -> in-flight seed task, so concurrent first requests share one history read
+_drift_seeding: Dict[str, asyncio.Task] = {}
+
+async def _seed_drift(user_id):
+    try:
+        # the seed is a SQLite read: keep it off the event loop
+        rows = await run_in_threadpool(history_db.get_history, limit=DRIFT_SEED_ROWS, user_id=user_id)
+        online_drift.seed(user_id, rows)
+    finally:
+        _drift_seeding.pop(user_id, None)
+
+async def _track_drift(user_id, emotion, confidence, source):
+    """O(1) drift update; real alerts are persisted through log_alert."""
+    if not OnlineDriftDetector.tracks(emotion):
+        return {"alert": False, "message": ""}
+    if not online_drift.known(user_id):
+        task = _drift_seeding.get(user_id)
+        if task is None:
+            task = _drift_seeding[user_id] = asyncio.create_task(_seed_drift(user_id))
+        # shielded: a client that goes away must not cancel the seed other requests wait on
+        await asyncio.shield(task)
+    alert = online_drift.update(user_id, emotion, confidence, datetime.now().isoformat())
+    if alert["alert"]:
+        history_db.log_alert(alert["from"], alert["to"], alert["magnitude"], alert["confidence_from"],
+                             alert["confidence_to"], metadata=f"auto:{source}", user_id=user_id)
+        event_hub.publish("alert", user_id, from_emotion=alert["from"], to_emotion=alert["to"],
+                          magnitude=alert["magnitude"], source=f"auto:{source}")
+    return alert
+
+def _stage(stage, endpoint, input_type):
+    return STAGE_SECONDS.labels(stage, endpoint, input_type).time()
+
+async def _predict_clip(audio_bytes, endpoint="/analyze_audio"):
+    with _stage("cache_lookup", endpoint, "audio"):
+        digest = content_hash(audio_bytes)
+        cached = audio_cache.get(digest)
+        version = audio_cache.version   # a reload while we predict must not be cached over
+    CACHE_LOOKUPS.labels("audio", "miss" if cached is None else "hit").inc()
+    if cached is not None:
+        return cached
+    registry.require("audio")
+    pool = registry.require("feature_pool")
+    # decode + MFCC in the feature pool, CNN in the batcher thread: the event loop stays free
+    with _stage("feature_pool", endpoint, "audio"):
+        features, timings = await pool.run(extract_features_timed, audio_bytes)
+    for stage, seconds in timings.items():   # measured inside the worker process
+        STAGE_SECONDS.labels(stage, endpoint, "audio").observe(seconds)
+    with _stage("inference", endpoint, "audio"):
+        emotion, confidence = await asyncio.wrap_future(audio_batcher.submit(features))
+    audio_cache.put(digest, (emotion, confidence), version)
+    return emotion, confidence
 
 @emotion_router.post("/analyze_audio")
-async def analyze_audio(file: UploadFile = File(...)):
+async def analyze_audio(file: UploadFile = File(...), user_id: str = Form("anon")):
+    endpoint = "/analyze_audio"
     try:
-        audio_bytes = await file.read()
-        emotion, confidence = model.predict_audio(audio_bytes)
-        action = engine.trigger_action(emotion)
-        history_db.log_prediction("audio", file.filename, emotion, confidence, action)
+        with _stage("upload_read", endpoint, "audio"):
+            audio_bytes = await file.read()
+        emotion, confidence = await _predict_clip(audio_bytes, endpoint)
+        with _stage("action", endpoint, "audio"):
+            action = engine.trigger_action(emotion)
+            action_dispatcher.dispatch(user_id, emotion)   # device commands go out off the request path
+        with _stage("drift", endpoint, "audio"):
+            drift_alert = await _track_drift(user_id, emotion, confidence, "audio")
+        with _stage("db_write", endpoint, "audio"):
+            history_db.log_prediction("audio", file.filename, emotion, confidence, action, user_id=user_id)
+        event_hub.publish("prediction", user_id, input_type="audio", emotion=emotion, confidence=confidence,
+                          action=action)
+        PREDICTIONS.labels(endpoint, "audio", emotion).inc()
         return {
             "emotion": emotion,
             "confidence": f"{confidence}%",
             "action": action,
-            "drift_alert": {"alert": False, "message": "Minor or no emotional change detected."}
+            "drift_alert": drift_alert
         }
+    except (Overloaded, ModelNotReady) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@emotion_router.post("/analyze_audio_long")
+async def analyze_audio_long(file: UploadFile = File(...), user_id: str = Form("anon"),
+                             window_s: float = Form(long_audio.LONG_AUDIO_WINDOW_S),
+                             hop_s: float = Form(long_audio.LONG_AUDIO_HOP_S),
+                             vad_db: float = Form(long_audio.VAD_DB)):
+    """
+    Per-segment emotion timeline for long recordings. The upload is read block by block from
+    its spooled temp file (never fully into memory); silent windows are skipped by an energy
+    gate and voiced ones are scored in batches. One history row records the dominant emotion.
+    """
+    endpoint = "/analyze_audio_long"
+    if not 0.5 <= window_s <= 30 or not 0 < hop_s <= window_s:
+        raise HTTPException(status_code=400, detail="need 0.5 <= window_s <= 30 and 0 < hop_s <= window_s")
+    try:
+        registry.require("audio")
+        pool = registry.require("feature_pool")
+        with _stage("timeline", endpoint, "audio"):
+            result = await run_in_threadpool(long_audio.analyze_stream, file.file, model.predict_batch,
+                                             submit_features=pool.submit, window_s=window_s, hop_s=hop_s,
+                                             vad_db=vad_db)
+    except (Overloaded, ModelNotReady) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not analyze audio: {e}")
+    emotion = result["dominant_emotion"]
+    if emotion is None:
+        return dict(result, action=None, drift_alert=None)
+    confidence = result["dominant_confidence"]
+    action = engine.trigger_action(emotion)
+    action_dispatcher.dispatch(user_id, emotion)
+    drift_alert = await _track_drift(user_id, emotion, confidence, "audio_long")
+    history_db.log_prediction("audio_long", file.filename, emotion, confidence, action, user_id=user_id)
+    event_hub.publish("prediction", user_id, input_type="audio_long", emotion=emotion, confidence=confidence,
+                      action=action, duration_s=result["duration_s"])
+    PREDICTIONS.labels(endpoint, "audio", emotion).inc()
+    return dict(result, action=action, drift_alert=drift_alert)
+
+@emotion_router.websocket("/stream")
+async def stream_audio(websocket: WebSocket, user_id: str = "anon", sample_rate: int = 16000,
+                       encoding: str = "s16le", channels: int = 1, window_s: float = 3.0, update_ms: float = 500):
+    """
+    Live microphone analysis. Send raw interleaved PCM (s16le or f32le) as binary frames; every
+    `update_ms` of audio the server answers with a JSON prediction over the last `window_s`
+    (or {"type": "silence"} when the energy gate finds no voice). Send the text "stop" to end.
+    Predictions feed the user's drift state and the action dispatcher like /analyze_audio.
+    """
+    endpoint = "/stream"
+    try:
+        session = StreamSession(sample_rate, encoding, channels, window_s, update_ms)
+        registry.require("audio")
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    except ModelNotReady as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+    await websocket.accept()
+    await websocket.send_text(json.dumps({"type": "ready", "sample_rate": sample_rate, "window_s": window_s,
+                                          "update_ms": update_ms}))
+    update_timer = STAGE_SECONDS.labels("stream_update", endpoint, "audio")
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is None:
+                if (message.get("text") or "").strip().lower() == "stop":
+                    await websocket.send_text(json.dumps(dict(session.stats(), type="done")))
+                    await websocket.close()
+                    break
+                continue
+            start = time.perf_counter()
+            try:
+                # frames are computed once per chunk; the update itself is a ring mean + DCT
+                if not await run_in_threadpool(session.feed, message["bytes"]):
+                    continue
+            except ValueError as e:
+                await websocket.close(code=1009, reason=str(e))
+                break
+            mfcc = session.mfcc
+            t = round(mfcc.seconds, 3)
+            if mfcc.voiced_fraction(long_audio.VAD_DB) < long_audio.VAD_MIN_VOICED:
+                await websocket.send_text(json.dumps({"type": "silence", "t": t, "chunk": session.chunks}))
+                continue
+            emotion, confidence = await asyncio.wrap_future(audio_batcher.submit(mfcc.features()))
+            action = engine.trigger_action(emotion)
+            action_dispatcher.dispatch(user_id, emotion)
+            drift_alert = await _track_drift(user_id, emotion, confidence, "stream")
+            event_hub.publish("prediction", user_id, input_type="stream", emotion=emotion, confidence=confidence,
+                              action=action)
+            PREDICTIONS.labels(endpoint, "audio", emotion).inc()
+            latency = time.perf_counter() - start
+            update_timer.observe(latency)
+            await websocket.send_text(json.dumps({
+                "type": "prediction", "t": t, "chunk": session.chunks, "emotion": emotion,
+                "confidence": confidence, "action": action, "drift_alert": drift_alert,
+                "latency_ms": round(latency * 1000.0, 2)}))
+    except Overloaded as e:
+        await websocket.close(code=1013, reason=str(e))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
+@emotion_router.post("/analyze_audio_batch")
+async def analyze_audio_batch(files: List[UploadFile] = File(...), user_id: str = Form("anon")):
+    """
+    Score many clips in one request: pass several `files` parts and/or zip/tar archives.
+    Results stream back as NDJSON, one line per clip in completion order (each carries its
+    `index`), followed by a summary line. History rows are written in one transaction.
+    """
+    try:
+        registry.require("audio")
+        pool = registry.require("feature_pool")
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    clips = []
+    try:
+        for f in files:
+            data = await f.read()
+            if is_archive(f.filename):
+                clips.extend(await run_in_threadpool(unpack_audio_archive, f.filename, data, BATCH_MAX_FILES))
+            else:
+                clips.append((f.filename or "", data))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read upload: {e}")
+    if not clips:
+        raise HTTPException(status_code=400, detail="No audio files found in upload.")
+    if len(clips) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_FILES} clips per batch.")
+
+    # keep the feature pool busy without tripping its backpressure limit
+    gate = asyncio.Semaphore(max(1, pool.max_pending // 2))
+
+    async def score(index, name, data):
+        async with gate:
+            try:
+                emotion, confidence = await _predict_clip(data, "/analyze_audio_batch")
+            except Exception as e:
+                return {"index": index, "filename": name, "error": str(e)}
+        return {"index": index, "filename": name, "emotion": emotion,
+                "confidence": f"{confidence}%", "action": engine.trigger_action(emotion),
+                "_confidence": confidence}
+
+    async def stream():
+        tasks = [asyncio.create_task(score(i, name, data)) for i, (name, data) in enumerate(clips)]
+        done, errors = {}, 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                if "error" in item:
+                    errors += 1
+                else:
+                    done[item["index"]] = ("audio", item["filename"], item["emotion"], item.pop("_confidence"), item["action"])
+                    PREDICTIONS.labels("/analyze_audio_batch", "audio", item["emotion"]).inc()
+                yield json.dumps(item) + "\n"
+            # history and drift state follow upload order, not completion order
+            rows = [done[i] for i in sorted(done)]
+            for _, _, emotion, confidence, _ in rows:
+                await _track_drift(user_id, emotion, confidence, "audio_batch")
+                action_dispatcher.dispatch(user_id, emotion)   # debounced per device, so bursts collapse
+            history_db.log_predictions(rows, user_id=user_id)
+            yield json.dumps({"done": True, "count": len(clips), "errors": errors}) + "\n"
+        finally:
+            for t in tasks:
+                t.cancel()  # client went away: stop scoring the rest
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+async def _classify_text(text, endpoint="/analyze_text"):
+    with _stage("cache_lookup", endpoint, "text"):
+        digest = content_hash(normalize_text(text))
+        cached = text_cache.get(digest)
+        version = text_cache.version
+    CACHE_LOOKUPS.labels("text", "miss" if cached is None else "hit").inc()
+    if cached is not None:
+        return cached
+    cascade = registry.peek("text_cascade")
+    with _stage("fast_tier", endpoint, "text"):
+        fast = cascade.route(text) if cascade is not None else None
+    if fast is not None and fast[2]:
+        cascade.answered_by("fast")
+        if cascade.should_audit() and registry.peek("text") is not None:
+            asyncio.ensure_future(_audit_fast_tier(cascade, text, fast[0]))
+        emotion, confidence = fast[0].lower(), round(fast[1] * 100, 2)
+        text_cache.put(digest, (emotion, confidence), version)
+        return emotion, confidence
+    text_engine = registry.require("text")
+    # concurrent texts are batched and length-bucketed by the engine's worker thread
+    start = time.perf_counter()
+    with _stage("inference", endpoint, "text"):
+        result = await asyncio.wrap_future(text_engine.submit(text))
+    if cascade is not None:
+        cascade.answered_by("transformer", time.perf_counter() - start)
+        if fast is not None:
+            cascade.compare(fast[0], result["label"], audit=False)
+    emotion = result["label"].lower()
+    confidence = round(float(result["score"]) * 100, 2)
+    text_cache.put(digest, (emotion, confidence), version)
+    return emotion, confidence
+
+async def _audit_fast_tier(cascade, text, fast_label):
+    """Re-check a confident tier-1 answer against the transformer; off the request path."""
+    try:
+        result = await asyncio.wrap_future(registry.require("text").submit(text))
+    except Exception:
+        return   # overloaded / not ready: skip this audit rather than compete with real requests
+    cascade.compare(fast_label, result["label"], audit=True)
+
 @emotion_router.post("/analyze_text")
-async def analyze_text(text: str = Form(...)):
+async def analyze_text(text: str = Form(...), user_id: str = Form("anon")):
+    endpoint = "/analyze_text"
     try:
-        result = classifier(text)[0]
-        emotion = result["label"].lower()
-        confidence = round(float(result["score"]) * 100, 2)
-        action = engine.trigger_action(emotion)
-        history_db.log_prediction("text", "", emotion, confidence, action)
-        return {"emotion": emotion, "confidence": f"{confidence}%", "action": action, "drift_alert": {"alert": False, "message": ""}}
+        emotion, confidence = await _classify_text(text, endpoint)
+        with _stage("action", endpoint, "text"):
+            action = engine.trigger_action(emotion)
+            action_dispatcher.dispatch(user_id, emotion)
+        with _stage("drift", endpoint, "text"):
+            drift_alert = await _track_drift(user_id, emotion, confidence, "text")
+        with _stage("db_write", endpoint, "text"):
+            history_db.log_prediction("text", "", emotion, confidence, action, user_id=user_id)
+        event_hub.publish("prediction", user_id, input_type="text", emotion=emotion, confidence=confidence,
+                          action=action)
+        PREDICTIONS.labels(endpoint, "text", emotion).inc()
+        return {"emotion": emotion, "confidence": f"{confidence}%", "action": action, "drift_alert": drift_alert}
+    except (Overloaded, ModelNotReady) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@emotion_router.post("/analyze_text_batch")
+async def analyze_text_batch(payload: TextBatchPayload):
+    if not payload.texts:
+        raise HTTPException(status_code=400, detail="No texts given.")
+    if len(payload.texts) > TEXT_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {TEXT_BATCH_MAX} texts per batch.")
+    # stay under the engine's queue limit so one big batch cannot trip backpressure by itself
+    try:
+        text_engine = registry.require("text")
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    gate = asyncio.Semaphore(max(1, text_engine.batcher.max_queue // 2))
+
+    async def classify(text):
+        async with gate:
+            return await _classify_text(text, "/analyze_text_batch")
+
+    try:
+        preds = await asyncio.gather(*[classify(t) for t in payload.texts])
+    except (Overloaded, ModelNotReady) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    results, rows = [], []
+    for emotion, confidence in preds:
+        action = engine.trigger_action(emotion)
+        await _track_drift(payload.user_id, emotion, confidence, "text_batch")
+        action_dispatcher.dispatch(payload.user_id, emotion)
+        rows.append(("text", "", emotion, confidence, action))
+        PREDICTIONS.labels("/analyze_text_batch", "text", emotion).inc()
+        results.append({"emotion": emotion, "confidence": f"{confidence}%", "action": action})
+    history_db.log_predictions(rows, user_id=payload.user_id)
+    return {"results": results}
+
 @emotion_router.get("/history")
-def get_history(limit: int = 50):
-    rows = history_db.get_history(limit=limit)
-    return {"history": rows}
+def get_history(limit: int = 50, user_id: Optional[str] = None, since: Optional[float] = None,
+                until: Optional[float] = None, before_id: Optional[int] = None, emotion: Optional[str] = None):
+    """Newest first. since/until are epoch seconds; pass next_before_id back as before_id for the next page."""
+    rows = history_db.get_history(limit=limit, user_id=user_id, since=since, until=until,
+                                  before_id=before_id, emotion=emotion)
+    return {"history": rows, "next_before_id": rows[-1]["id"] if len(rows) == limit else None}
 
 @emotion_router.get("/stability")
-def get_stability(limit: int = 50):
-    rows = history_db.get_history(limit=limit)
-    metrics = drift_detector.analyze_sequence(rows)
-    return {"stability": metrics}
+def get_stability(limit: int = 50, user_id: Optional[str] = None, source: Optional[str] = None):
+    """
+    source=db (default without user_id): rescan the last `limit` rows (all users unless
+    user_id is given) with EmotionDriftDetector.
+    source=live (default with user_id): that user's running drift state, no database access once warm.
+    """
+    if source is None:
+        source = "live" if user_id else "db"
+    if source not in ("live", "db"):
+        raise HTTPException(status_code=400, detail="source must be live or db")
+    if source == "db":
+        rows = history_db.get_history(limit=limit, user_id=user_id)
+        return {"stability": drift_detector.analyze_sequence(rows)}
+    uid = user_id or "anon"
+    _ensure_drift_state(uid)   # sync route: already runs in the threadpool
+    return {"stability": online_drift.snapshot(uid)}
+
+@emotion_router.get("/stability/series")
+def get_stability_series(user_id: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+                         limit: int = 100000, window: int = 50, max_points: int = 500):
+    """Vectorized drift analytics: rolling stability series, transition matrix, event counts."""
+    codes, confidences, ts = history_db.fetch_emotion_arrays(EMOTION_ORDER, user_id=user_id, since=since,
+                                                             until=until, limit=limit)
+    return {"stability": drift_detector.analyze_arrays(codes, confidences, ts, window=window, max_points=max_points)}
+
+@emotion_router.get("/analytics")
+def get_analytics(user_id: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+                  points: int = 200, bucket_s: Optional[int] = None):
+    """
+    History dashboard in one request, aggregated in SQL over [since, until) (epoch seconds,
+    both optional): per-emotion counts and mean confidence, most frequent emotion, a timeline
+    of at most `points` buckets (or fixed `bucket_s`) and a drift/stability summary.
+    """
+    if not 1 <= points <= 5000:
+        raise HTTPException(status_code=400, detail="points must be 1..5000")
+    if bucket_s is not None and bucket_s < 1:
+        raise HTTPException(status_code=400, detail="bucket_s must be >= 1")
+    return history_db.aggregate_history(EMOTION_ORDER, user_id=user_id, since=since, until=until, points=points,
+                                        bucket_s=bucket_s, drift_threshold=drift_detector.drift_threshold)
 
 # NEW: receive client-side alerts and store
 @emotion_router.post("/log_alert")
@@ -71,11 +498,229 @@ def log_alert(payload: AlertPayload):
         payload.magnitude,
         payload.confidence_from,
         payload.confidence_to,
-        payload.metadata or ""
+        payload.metadata or "",
+        user_id=payload.user_id,
     )
+    event_hub.publish("alert", payload.user_id, from_emotion=payload.from_emotion, to_emotion=payload.to_emotion,
+                      magnitude=payload.magnitude, source=payload.metadata or "client")
     return {"status": "ok"}
 
+@emotion_router.websocket("/events/ws")
+async def events_ws(websocket: WebSocket, user_id: Optional[str] = None, types: Optional[str] = None):
+    """
+    Live predictions / alerts as JSON text frames. `user_id` limits to one user (default: all),
+    `types` is a comma list of prediction,alert. Slow readers are closed with code 1013.
+    """
+    try:
+        type_filter = parse_types(types)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    try:
+        sub = event_hub.subscribe("websocket", user_id, type_filter)
+    except TooManySubscribers as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+    await websocket.accept()
+
+    async def reader():
+        # the client never sends anything we need; this only notices the disconnect
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+    closed = asyncio.create_task(reader())
+    try:
+        while not closed.done():
+            getter = asyncio.create_task(sub.get(EVENTS_HEARTBEAT_S))
+            await asyncio.wait({getter, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                break
+            event = getter.result()
+            if event is None:
+                await websocket.send_text('{"type":"heartbeat"}')
+            else:
+                await websocket.send_text(event.json)
+    except SlowConsumer as e:
+        await websocket.close(code=1013, reason=str(e))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        closed.cancel()
+        sub.close()
+
+@emotion_router.get("/events/stream")
+async def events_stream(request: Request, user_id: Optional[str] = None, types: Optional[str] = None):
+    """Server-Sent Events version of /events/ws (same filters); a comment line every heartbeat."""
+    try:
+        type_filter = parse_types(types)
+        sub = event_hub.subscribe("sse", user_id, type_filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TooManySubscribers as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    async def stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                event = await sub.get(EVENTS_HEARTBEAT_S)
+                if event is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": heartbeat\n\n"
+                else:
+                    yield sse_format(event)
+        except SlowConsumer as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            sub.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@emotion_router.get("/events/stats")
+def events_stats():
+    """Live-event hub: subscriber counts per transport, slow-consumer drops and fan-out latency."""
+    return event_hub.stats()
+
 @emotion_router.get("/alerts")
-def get_alerts(limit: int = 50):
-    rows = history_db.get_alerts(limit=limit)
-    return {"alerts": rows}
+def get_alerts(limit: int = 50, user_id: Optional[str] = None, since: Optional[float] = None,
+               until: Optional[float] = None, before_id: Optional[int] = None):
+    rows = history_db.get_alerts(limit=limit, user_id=user_id, since=since, until=until, before_id=before_id)
+    return {"alerts": rows, "next_before_id": rows[-1]["id"] if len(rows) == limit else None}
+
+@emotion_router.get("/inference/stats")
+def inference_stats():
+    text_engine = registry.peek("text")
+    audio = dict(audio_batcher.stats(), backend=model.backend, backend_parity=model.backend_parity,
+                 torch_threads=torch.get_num_threads())
+    cascade = registry.peek("text_cascade")
+    return {"audio": audio, "text": text_engine.stats() if text_engine else None,
+            "text_cascade": cascade.stats() if cascade else None,
+            "executors": executors.stats(), "drift_states": online_drift.stats(),
+            "history_writer": history_db.writer_stats()}
+
+@emotion_router.get("/actions/stats")
+def actions_stats():
+    """Device command delivery: per-backend sent/failed/coalesced/debounced/dropped and latency."""
+    return action_dispatcher.stats()
+
+@emotion_router.get("/cache/stats")
+def cache_stats():
+    return {"audio": audio_cache.stats(), "text": text_cache.stats()}
+
+def _submit_music(emotion, prompt, duration):
+    if not 1 <= duration <= MUSIC_MAX_DURATION:
+        raise HTTPException(status_code=400, detail=f"duration must be 1..{MUSIC_MAX_DURATION} seconds")
+    try:
+        return music_jobs.submit(emotion, prompt or None, duration)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+def _job_or_404(job_id):
+    job = music_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+    return job
+
+def _audio_response(request, path, filename, sha=None):
+    """
+    Stream a WAV from disk (FileResponse handles Range / If-Range, so clients can seek).
+    Content-addressed clips get their digest as a strong ETag and are cacheable forever.
+    """
+    headers = {}
+    if sha is not None:
+        etag = f'"{sha}"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+        if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="audio/wav", filename=filename, headers=headers,
+                        content_disposition_type="inline")
+
+@emotion_router.post("/generate_music")
+async def generate_music(request: Request, emotion: str = Form("neutral"), mode: str = Form("curated"),
+                         duration: int = Form(8)):
+    """
+    mode=generated: a pre-rendered library clip of about that length, else a MusicGen job (waits for it).
+    mode=library: the closest pre-rendered clip. Otherwise a Spotify preview URL.
+    """
+    emotion = (emotion or "neutral").lower()
+    if mode in ("generated", "library"):
+        clip = soundtracks.pick(emotion, duration)
+        if clip is not None and (mode == "library" or abs(clip["duration"] - duration) <= LIBRARY_DURATION_SLACK_S):
+            return _audio_response(request, soundtracks.object_path(clip["sha256"]), f"{emotion}.wav", clip["sha256"])
+        if mode == "library":
+            raise HTTPException(status_code=404, detail=f"No pre-rendered clip for {emotion}")
+        job = _submit_music(emotion, "", duration)
+        try:
+            path = await asyncio.wrap_future(job.future)
+        except Exception as e:
+            return {"type": "error", "message": str(e)}
+        return _audio_response(request, path, f"{job.emotion}_{job.duration}s.wav")
+    result = await run_in_threadpool(get_music_for_emotion, emotion, mode, duration)
+    if result.get("type") == "url":
+        return {"type": "url", "url": result["content"], "meta": result.get("meta", {})}
+    return result
+
+@emotion_router.get("/soundtracks")
+def list_soundtracks(emotion: Optional[str] = None):
+    return {"clips": soundtracks.clips(emotion.lower() if emotion else None)}
+
+@emotion_router.get("/soundtracks/{sha}.wav")
+def get_soundtrack(sha: str, request: Request):
+    clip = soundtracks.get(sha)
+    if clip is None:
+        raise HTTPException(status_code=404, detail="Unknown clip")
+    return _audio_response(request, soundtracks.object_path(sha), f"{sha[:12]}.wav", sha)
+
+@emotion_router.post("/music/jobs")
+def create_music_job(emotion: str = Form("neutral"), prompt: str = Form(""), duration: int = Form(8)):
+    """Queue a MusicGen clip; identical requests share one job and cached clips finish immediately."""
+    return _submit_music(emotion, prompt, duration).to_dict()
+
+@emotion_router.get("/music/jobs/{job_id}")
+def get_music_job(job_id: str):
+    return _job_or_404(job_id).to_dict()
+
+@emotion_router.get("/music/jobs/{job_id}/audio")
+async def get_music_job_audio(job_id: str, request: Request, wait: bool = False):
+    """The finished WAV; 202 while pending unless wait=true, which holds the request until it is done."""
+    job = _job_or_404(job_id)
+    if wait and not job.future.done():
+        try:
+            await asyncio.wrap_future(job.future)
+        except Exception:
+            pass
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        return JSONResponse(job.to_dict(), status_code=202)
+    return _audio_response(request, job.path, f"{job.emotion}_{job.duration}s.wav")
+
+@emotion_router.get("/music/stats")
+def music_stats():
+    return {"generated": music_jobs.stats(), "curated": default_catalog.stats()}
+
+def _require_profile_token(request):
+    if not profiling.authorized(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@emotion_router.get("/profiles")
+def list_profiles(request: Request):
+    """Newest-first profile reports; needs the same X-Profile token as the profiled requests."""
+    _require_profile_token(request)
+    return {"profiles": profiling.default_store.list()}
+
+@emotion_router.get("/profiles/{report_id}")
+def get_profile(report_id: str, request: Request, format: str = "collapsed"):
+    """format=collapsed (sampling reports, flamegraph input), pstats (cProfile dump) or text."""
+    _require_profile_token(request)
+    rendered = profiling.default_store.render(report_id, format)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail=f"No {format} report {report_id}")
+    body, media_type = rendered
+    return Response(body, media_type=media_type)
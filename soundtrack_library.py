@@ -0,0 +1,208 @@
+# backend/soundtrack_library.py
+"""
+Pre-rendered per-emotion soundtrack library: a content-addressed clip store plus a manifest.
+
+    python -m backend.soundtrack_library build --per-emotion 2 --duration 8          # MusicGen
+    python -m backend.soundtrack_library build --source tone --duration 8            # offline placeholder tones
+    python -m backend.soundtrack_library import happy clips/happy_*.wav
+    python -m backend.soundtrack_library ls
+
+Clips live at <root>/objects/<sha256[:2]>/<sha256>.wav, so identical audio is stored once
+and the digest doubles as a strong HTTP ETag. <root>/manifest.json maps each emotion to its
+clips.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.music_service import CURATED_QUERIES, emotion_prompt
+
+SOUNDTRACK_DIR = os.getenv("SOULSYNC_SOUNDTRACK_DIR", "soundtracks")
+MANIFEST_NAME = "manifest.json"
+CHUNK = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class SoundtrackLibrary:
+    """Read side is cheap: the manifest is re-read only when its mtime changes."""
+
+    def __init__(self, root: str = SOUNDTRACK_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._clips: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_sha: Dict[str, Dict[str, Any]] = {}
+        self._mtime = None
+
+    # ---------- read side ----------
+    def object_path(self, sha: str) -> str:
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.wav")
+
+    def reload(self, force: bool = False):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            if not force and mtime == self._mtime:
+                return
+            clips = {}
+            if mtime is not None:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    clips = json.load(f).get("clips", {})
+            self._clips = clips
+            self._by_sha = {c["sha256"]: c for entries in clips.values() for c in entries}
+            self._mtime = mtime
+
+    def clips(self, emotion: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        self.reload()
+        with self._lock:
+            if emotion is not None:
+                return {emotion: list(self._clips.get(emotion, []))}
+            return {e: list(c) for e, c in self._clips.items()}
+
+    def get(self, sha: str) -> Optional[Dict[str, Any]]:
+        self.reload()
+        with self._lock:
+            return self._by_sha.get(sha)
+
+    def pick(self, emotion: str, duration: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Clip for the emotion whose length is closest to `duration` (first clip if None)."""
+        entries = self.clips((emotion or "neutral").lower())[(emotion or "neutral").lower()]
+        entries = [c for c in entries if os.path.exists(self.object_path(c["sha256"]))]
+        if not entries:
+            return None
+        if duration is None:
+            return entries[0]
+        return min(entries, key=lambda c: abs(c.get("duration", 0) - float(duration)))
+
+    # ---------- build side ----------
+    def add_file(self, emotion: str, path: str, source: str = "import", prompt: str = "") -> Dict[str, Any]:
+        import soundfile as sf
+        sha = file_sha256(path)
+        dest = self.object_path(sha)
+        if not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+        info = sf.info(dest)
+        entry = {"sha256": sha, "bytes": os.path.getsize(dest), "duration": round(info.duration, 3),
+                 "sample_rate": info.samplerate, "source": source, "prompt": prompt, "added": time.time()}
+        self.reload()
+        with self._lock:
+            entries = [c for c in self._clips.get(emotion, []) if c["sha256"] != sha]
+            self._clips[emotion] = entries + [entry]
+            self._by_sha[sha] = entry
+            self._save_locked()
+        return entry
+
+    def add_audio(self, emotion: str, audio: np.ndarray, sr: int, source: str, prompt: str = "") -> Dict[str, Any]:
+        import soundfile as sf
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, f".render-{uuid.uuid4().hex}.wav")
+        try:
+            sf.write(tmp, audio, samplerate=sr, format="WAV", subtype="PCM_16")
+            return self.add_file(emotion, tmp, source=source, prompt=prompt)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _save_locked(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self.manifest_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "clips": self._clips}, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+        self._mtime = os.stat(self.manifest_path).st_mtime_ns
+
+
+default_library = SoundtrackLibrary()
+
+
+# placeholder renderer for offline builds: a few seconds of a per-emotion chord
+_TONE_ROOTS = {"happy": 261.6, "sad": 220.0, "calm": 196.0, "angry": 146.8, "fearful": 155.6,
+               "neutral": 246.9, "surprised": 293.7, "disgust": 138.6}
+
+
+def render_tone(emotion: str, duration: float, sr: int = 22050) -> np.ndarray:
+    t = np.arange(int(duration * sr)) / sr
+    root = _TONE_ROOTS.get(emotion, 220.0)
+    third = 1.26 if emotion in ("happy", "surprised", "calm", "neutral") else 1.19   # major vs minor
+    y = sum(np.sin(2 * np.pi * root * r * t) for r in (1.0, third, 1.5)) / 3.0
+    fade = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.05)
+    return (0.3 * y * fade).astype(np.float32)[:, None]
+
+
+def build(library: SoundtrackLibrary, emotions: List[str], per_emotion: int, duration: int, source: str):
+    todo = []
+    for emotion in emotions:
+        existing = [c for c in library.clips(emotion)[emotion] if c.get("source") == source
+                    and abs(c.get("duration", 0) - duration) < 0.5]
+        todo += [(emotion, i) for i in range(len(existing), per_emotion)]
+    start = time.perf_counter()
+
+    def report(emotion, entry):
+        print(f"  {emotion:<10} {entry['sha256'][:12]}  {entry['duration']:.1f}s  {time.perf_counter() - start:.1f}s")
+
+    if source == "musicgen":
+        from backend.musicgen_service import default_service
+        # queue everything up front so the worker can batch prompts into shared generate calls
+        jobs = []
+        for emotion, i in todo:
+            prompt = emotion_prompt(emotion) + (f", variation {i + 1}" if i else "")
+            jobs.append((emotion, prompt, default_service.submit(emotion, prompt, duration)))
+        for emotion, prompt, job in jobs:
+            report(emotion, library.add_file(emotion, job.future.result(), source=source, prompt=prompt))
+    else:
+        for emotion, i in todo:
+            audio = render_tone(emotion, duration + 0.01 * i)
+            report(emotion, library.add_audio(emotion, audio, 22050, source=source, prompt=f"tone:{emotion}:{i}"))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--root", default=SOUNDTRACK_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="render clips for each emotion (skips ones already built)")
+    b.add_argument("--emotions", nargs="+", default=list(CURATED_QUERIES))
+    b.add_argument("--per-emotion", type=int, default=1)
+    b.add_argument("--duration", type=int, default=8)
+    b.add_argument("--source", choices=("musicgen", "tone"), default="musicgen")
+    i = sub.add_parser("import", help="add existing WAV files for one emotion")
+    i.add_argument("emotion")
+    i.add_argument("files", nargs="+")
+    sub.add_parser("ls", help="list the manifest")
+    args = ap.parse_args(argv)
+
+    library = SoundtrackLibrary(args.root)
+    if args.cmd == "build":
+        build(library, args.emotions, args.per_emotion, args.duration, args.source)
+    elif args.cmd == "import":
+        for path in args.files:
+            entry = library.add_file(args.emotion.lower(), path, source="import", prompt=os.path.basename(path))
+            print(f"  {args.emotion:<10} {entry['sha256'][:12]}  {entry['duration']:.1f}s  {path}")
+    for emotion, entries in sorted(library.clips().items()):
+        total = sum(c["bytes"] for c in entries)
+        print(f"{emotion:<10} {len(entries):>3} clips  {total / 1e6:8.2f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# backend/stub_catalog.py
+"""
+Offline stand-in for the two Spotify endpoints the curated catalog uses
+(POST /api/token and GET /v1/search). Results are deterministic per query.
+
+    python -m backend.stub_catalog --port 8765 --latency-ms 80
+    SPOTIFY_API_BASE=http://127.0.0.1:8765/v1 SPOTIFY_ACCOUNTS_BASE=http://127.0.0.1:8765 \\
+    SPOTIFY_CLIENT_ID=stub SPOTIFY_CLIENT_SECRET=stub uvicorn backend.main:app
+"""
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def fake_tracks(query: str, limit: int, base_url: str):
+    seed = hashlib.blake2b(query.encode(), digest_size=4).hexdigest()
+    return [{
+        "id": f"{seed}{i:02d}",
+        "name": f"{query.title()} #{i + 1}",
+        "artists": [{"name": "Stub Artist"}],
+        # every other track has a preview, like the real catalog where many are missing
+        "preview_url": f"{base_url}/preview/{seed}{i:02d}.mp3" if i % 2 else None,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{seed}{i:02d}"},
+    } for i in range(limit)]
+
+
+class StubCatalogServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency_ms: float = 0.0):
+        super().__init__(address, _Handler)
+        self.latency_s = latency_ms / 1000.0
+        self.fail_next = 0          # tests: make the next N searches return 503
+        self.requests = {"token": 0, "search": 0}
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, key):
+        with self._lock:
+            self.requests[key] += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stub-catalog", daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"    # keep-alive, so client-side pooling is visible in `connections`
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if urlparse(self.path).path != "/api/token":
+            return self._json(404, {"error": "not found"})
+        self.server.count("token")
+        self._json(200, {"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/v1/search":
+            return self._json(404, {"error": "not found"})
+        if self.headers.get("Authorization") != "Bearer stub-token":
+            return self._json(401, {"error": "invalid token"})
+        self.server.count("search")
+        time.sleep(self.server.latency_s)
+        with self.server._lock:
+            fail = self.server.fail_next > 0
+            self.server.fail_next -= fail
+        if fail:
+            return self._json(503, {"error": "unavailable"})
+        qs = parse_qs(url.query)
+        query, limit = qs.get("q", [""])[0], int(qs.get("limit", ["10"])[0])
+        self._json(200, {"tracks": {"items": fake_tracks(query, limit, self.server.base_url)}})
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    args = ap.parse_args(argv)
+    server = StubCatalogServer((args.host, args.port), latency_ms=args.latency_ms)
+    print(f"stub catalog on {server.base_url}")
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# backend/tests/test_action_dispatcher.py
+import pytest
+
+from backend.action_dispatcher import ActionDispatcher, FakeDeviceBackend, backends_from_env
+
+
+@pytest.fixture
+def make_dispatcher():
+    dispatchers = []
+
+    def make(backends, **kwargs):
+        kwargs.setdefault("debounce_s", 0.0)
+        kwargs.setdefault("coalesce_s", 0.0)
+        d = ActionDispatcher(backends, **kwargs)
+        dispatchers.append(d)
+        return d
+
+    yield make
+    for d in dispatchers:
+        d.stop()
+
+
+def test_commands_reach_every_backend(make_dispatcher):
+    a, b = FakeDeviceBackend("a"), FakeDeviceBackend("b")
+    d = make_dispatcher([a, b])
+    d.dispatch("u1", "Happy")
+    assert d.flush()
+    assert [c.emotion for c in a.sent] == ["happy"]
+    assert [c.to_dict()["user_id"] for c in b.sent] == ["u1"]
+    assert d.stats()["backends"]["a"]["sent"] == 1
+
+
+def test_repeated_emotion_is_coalesced(make_dispatcher):
+    fake = FakeDeviceBackend()
+    d = make_dispatcher([fake], coalesce_s=60.0)
+    for _ in range(3):
+        d.dispatch("u1", "sad")
+        assert d.flush()
+    assert len(fake.sent) == 1
+    assert d.stats()["backends"]["fake"]["coalesced"] == 2
+
+
+def test_burst_is_debounced_to_latest_emotion(make_dispatcher):
+    fake = FakeDeviceBackend()
+    d = make_dispatcher([fake], debounce_s=0.2)
+    d.dispatch("u1", "happy")
+    assert d.flush()
+    for emotion in ("sad", "angry", "calm"):
+        d.dispatch("u1", emotion)
+    assert d.flush()
+    assert [c.emotion for c in fake.sent] == ["happy", "calm"]
+    assert d.stats()["backends"]["fake"]["debounced"] == 2
+
+
+def test_failing_and_slow_devices_are_isolated(make_dispatcher):
+    ok, dead, slow = FakeDeviceBackend("ok"), FakeDeviceBackend("dead", fail=True), FakeDeviceBackend("slow", 500)
+    d = make_dispatcher([ok, dead, slow], timeout_s=0.05)
+    d.dispatch("u1", "fearful")
+    assert d.flush()
+    counts = d.stats()["backends"]
+    assert len(ok.sent) == 1 and counts["ok"]["sent"] == 1
+    assert counts["dead"]["failed"] == 1
+    assert counts["slow"]["timeout"] == 1 and not slow.sent
+
+
+def test_full_queue_drops_commands(make_dispatcher):
+    slow = FakeDeviceBackend("slow", latency_ms=50)
+    d = make_dispatcher([slow], max_queue=1)
+    for i in range(5):
+        d.dispatch(f"u{i}", "happy")
+    assert d.flush()
+    counts = d.stats()["backends"]["slow"]
+    assert counts["dropped"] >= 1
+    assert counts["sent"] + counts["dropped"] == 5
+
+
+def test_backends_from_env():
+    assert [b.name for b in backends_from_env("fake, log")] == ["fake", "log"]
+    with pytest.raises(ValueError):
+        backends_from_env("fake,zigbee")
@@ -0,0 +1,88 @@
+# backend/tests/test_curated_catalog.py
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("requests")
+
+from backend.curated_catalog import CuratedCatalog, SpotifySearchClient, pick_track_url
+from backend.stub_catalog import StubCatalogServer, fake_tracks
+
+
+@pytest.fixture
+def stub():
+    server = StubCatalogServer().start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _catalog(stub, **kwargs):
+    def client():
+        return SpotifySearchClient("stub", "stub", api_base=stub.base_url + "/v1", accounts_base=stub.base_url)
+    return CuratedCatalog(client_factory=client, **kwargs)
+
+
+def test_stub_results_are_deterministic():
+    assert fake_tracks("calm piano", 4, "http://x") == fake_tracks("calm piano", 4, "http://x")
+    assert fake_tracks("calm piano", 4, "http://x") != fake_tracks("sad songs", 4, "http://x")
+
+
+def test_lookup_prefers_preview_url(stub):
+    catalog = _catalog(stub)
+    try:
+        url = catalog.lookup("happy")
+        tracks = catalog.tracks("happy")
+    finally:
+        catalog.shutdown()
+    assert url == pick_track_url(tracks)
+    assert url.startswith(stub.base_url + "/preview/")
+
+
+def test_fresh_entries_are_served_from_cache(stub):
+    catalog = _catalog(stub)
+    try:
+        for _ in range(5):
+            catalog.tracks("sad")
+        stats = catalog.stats()
+    finally:
+        catalog.shutdown()
+    assert stub.requests["search"] == 1
+    assert stats["misses"] == 1 and stats["hits"] == 4
+
+
+def test_concurrent_misses_share_one_fetch(stub):
+    stub.latency_s = 0.05
+    catalog = _catalog(stub)
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: catalog.lookup("angry"), range(8)))
+    finally:
+        catalog.shutdown()
+    assert len(set(results)) == 1
+    assert stub.requests["search"] == 1
+    assert stub.requests["token"] == 1
+
+
+def test_transient_upstream_error_is_retried(stub):
+    stub.fail_next = 1
+    catalog = _catalog(stub)
+    try:
+        assert catalog.lookup("calm") is not None
+    finally:
+        catalog.shutdown()
+    assert stub.requests["search"] == 2
+
+
+def test_stale_entry_is_served_while_refreshing(stub):
+    catalog = _catalog(stub, ttl_s=0.0, max_stale_s=3600.0)
+    try:
+        first = catalog.tracks("neutral")
+        stale = catalog.tracks("neutral")
+        for fut in catalog.prefetch(["neutral"]):
+            fut.result(5)
+        stats = catalog.stats()
+    finally:
+        catalog.shutdown()
+    assert stale == first
+    assert stats["stale_hits"] == 1 and stats["refreshes"] >= 1
@@ -0,0 +1,67 @@
+# backend/tests/test_drift_detector.py
+import asyncio
+import time
+
+from backend.drift_detector import OnlineDriftDetector
+
+
+def _rows(*emotions):
+    # newest-first, as history_db.get_history returns them
+    return [{"emotion": e, "confidence": 80.0, "timestamp": f"t{i}"} for i, e in enumerate(emotions)][::-1]
+
+
+def test_seed_replays_history():
+    det = OnlineDriftDetector()
+    assert det.seed("u", _rows("happy", "sad"))
+    snap = det.snapshot("u")
+    assert snap["entries"] == 2 and snap["last_emotion"] == "sad"
+
+
+def test_seed_without_rows_marks_user_known():
+    det = OnlineDriftDetector()
+    assert det.seed("u", [])
+    assert det.known("u")
+    assert det.snapshot("u")["entries"] == 0
+
+
+def test_seed_does_not_clobber_live_state():
+    det = OnlineDriftDetector()
+    det.update("u", "angry", 90.0)
+    assert not det.seed("u", _rows("happy", "happy"))
+    assert det.snapshot("u")["last_emotion"] == "angry"
+
+
+def test_lru_evicts_oldest_user():
+    det = OnlineDriftDetector(max_users=2)
+    det.seed("a", [])
+    det.update("b", "happy", 50.0)
+    det.update("a", "happy", 50.0)      # touches a, so b is the oldest
+    det.seed("c", [])
+    assert det.known("a") and det.known("c") and not det.known("b")
+    assert det.stats()["evictions"] == 1
+
+
+def test_concurrent_first_requests_seed_once(monkeypatch):
+    from backend import router
+
+    calls = []
+
+    def get_history(limit, user_id):
+        calls.append(user_id)
+        time.sleep(0.05)
+        return []
+
+    monkeypatch.setattr(router, "online_drift", OnlineDriftDetector())
+    monkeypatch.setattr(router.history_db, "get_history", get_history)
+
+    async def burst():
+        return await asyncio.gather(*(router._track_drift("new-user", "calm", 70.0, "test") for _ in range(5)))
+
+    alerts = asyncio.run(burst())
+    assert calls == ["new-user"]
+    assert router.online_drift.snapshot("new-user")["entries"] == 5
+    assert not any(a["alert"] for a in alerts)
+    assert not router._drift_seeding
+    # an empty history still counts as seeded: later requests do not go back to the database
+    asyncio.run(router._track_drift("new-user", "calm", 70.0, "test"))
+    assert calls == ["new-user"]
@@ -0,0 +1,43 @@
+# backend/tests/test_feature_engine.py
+import io
+
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+pytest.importorskip("soundfile")
+
+from backend.bench_features import synth_wav, librosa_features
+from backend.feature_engine import decode_wav, default_engine, N_MFCC
+
+# max abs diff per mean coefficient (dB units), same bound bench_features enforces
+ATOL = 1e-2
+
+
+@pytest.mark.parametrize("sr", [16000, 22050, 44100])
+@pytest.mark.parametrize("seconds", [0.5, 3.0])
+def test_mfcc_mean_matches_librosa(seconds, sr):
+    wav = synth_wav(seconds, sr)
+    y, got_sr = decode_wav(wav)
+    assert got_sr == sr
+    ref = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC).mean(axis=1)
+    np.testing.assert_allclose(default_engine.mfcc_mean(y, sr), ref, rtol=0, atol=ATOL)
+
+
+@pytest.mark.parametrize("subtype,channels", [("PCM_16", 1), ("PCM_24", 1), ("FLOAT", 1), ("PCM_16", 2)])
+def test_decode_wav_matches_librosa_load(subtype, channels):
+    wav = synth_wav(1.0, 22050, subtype, channels)
+    y, sr = decode_wav(wav)
+    ref, ref_sr = librosa.load(io.BytesIO(wav), sr=None)
+    assert sr == ref_sr
+    np.testing.assert_allclose(y, ref, rtol=0, atol=1e-4)
+
+
+def test_extract_matches_librosa_pipeline():
+    wav = synth_wav(2.0, 22050)
+    np.testing.assert_allclose(default_engine.extract(wav), librosa_features(wav), rtol=0, atol=ATOL)
+
+
+def test_mfcc_mean_rejects_empty_audio():
+    with pytest.raises(ValueError):
+        default_engine.mfcc_mean(np.zeros(0, dtype=np.float32), 22050)
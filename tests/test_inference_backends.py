@@ -0,0 +1,38 @@
+# backend/tests/test_inference_backends.py
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from backend import inference_backends
+from backend.bench_backends import _model
+
+
+@pytest.fixture(scope="module")
+def model():
+    # random weights with non-trivial BatchNorm statistics, so fusion is actually exercised
+    return _model(random_weights=True)
+
+
+@pytest.mark.parametrize("name", inference_backends.BACKENDS)
+def test_backend_parity_with_eager(model, name):
+    runner = inference_backends.build_backend(model, name, torch.device("cpu"))
+    parity = inference_backends.check_parity(model, runner)
+    assert inference_backends.parity_ok(name, parity), parity
+    if name != "int8":
+        assert parity["argmax_agreement"] == 1.0
+
+
+@pytest.mark.parametrize("name", inference_backends.BACKENDS)
+def test_backend_output_shape(model, name):
+    runner = inference_backends.build_backend(model, name, torch.device("cpu"))
+    for batch in (1, 7):
+        X = np.random.default_rng(batch).standard_normal((batch, inference_backends.N_FEATURES)).astype(np.float32)
+        out = runner(X)
+        assert out.shape == (batch, 8)
+        assert np.isfinite(out).all()
+
+
+def test_unknown_backend_is_rejected(model):
+    with pytest.raises(ValueError):
+        inference_backends.build_backend(model, "onnx", torch.device("cpu"))
@@ -0,0 +1,44 @@
+# backend/tests/test_prediction_cache.py
+from backend.prediction_cache import PredictionCache, content_hash
+
+
+class _Version:
+    def __init__(self):
+        self.value = "v1"
+
+    def __call__(self):
+        return self.value
+
+
+def test_put_then_get(tmp_path):
+    cache = PredictionCache("t", disk_dir=str(tmp_path))
+    digest = content_hash(b"clip")
+    assert cache.get(digest) is None
+    cache.put(digest, ("happy", 91.5), cache.version)
+    assert cache.get(digest) == ("happy", 91.5)
+    # disk tier survives a fresh memory tier
+    assert PredictionCache("t", disk_dir=str(tmp_path)).get(digest) == ("happy", 91.5)
+
+
+def test_version_change_invalidates(tmp_path):
+    version = _Version()
+    cache = PredictionCache("t", version_fn=version, disk_dir=str(tmp_path), version_check_s=0.0)
+    digest = content_hash(b"clip")
+    cache.put(digest, ("sad", 70.0))
+    version.value = "v2"
+    assert cache.get(digest) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_put_from_before_a_reload_is_dropped(tmp_path):
+    version = _Version()
+    cache = PredictionCache("t", version_fn=version, disk_dir=str(tmp_path), version_check_s=0.0)
+    digest = content_hash(b"clip")
+    assert cache.get(digest) is None
+    seen = cache.version
+    version.value = "v2"                  # model reloaded while the prediction was running
+    cache.put(digest, ("angry", 88.0), seen)
+    assert cache.get(digest) is None
+    assert cache.stats()["stale_puts"] == 1
+    cache.put(digest, ("calm", 60.0), cache.version)
+    assert cache.get(digest) == ("calm", 60.0)
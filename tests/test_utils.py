@@ -0,0 +1,49 @@
+# backend/tests/test_utils.py
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from backend.utils import unpack_audio_archive, silent_wav
+
+WAV = silent_wav(0.1)      # 3244 bytes
+
+
+def _zip(members):
+    bio = io.BytesIO()
+    with zipfile.ZipFile(bio, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return bio.getvalue()
+
+
+def _tar(members):
+    bio = io.BytesIO()
+    with tarfile.open(fileobj=bio, mode="w:gz") as tf:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return bio.getvalue()
+
+
+@pytest.mark.parametrize("filename,pack", [("clips.zip", _zip), ("clips.tar.gz", _tar)])
+def test_unpack_skips_non_audio_members(filename, pack):
+    data = pack([("a.wav", WAV), ("notes.txt", b"hi"), ("__MACOSX/._a.wav", b"x"), ("sub/b.wav", WAV)])
+    assert unpack_audio_archive(filename, data, max_files=10) == [("a.wav", WAV), ("sub/b.wav", WAV)]
+
+
+@pytest.mark.parametrize("filename,pack", [("clips.zip", _zip), ("clips.tar.gz", _tar)])
+def test_unpack_enforces_file_count(filename, pack):
+    data = pack([(f"{i}.wav", WAV) for i in range(3)])
+    with pytest.raises(ValueError, match="more than 2"):
+        unpack_audio_archive(filename, data, max_files=2)
+
+
+@pytest.mark.parametrize("filename,pack", [("clips.zip", _zip), ("clips.tar.gz", _tar)])
+def test_unpack_enforces_total_uncompressed_size(filename, pack):
+    data = pack([(f"{i}.wav", WAV) for i in range(4)])
+    assert len(unpack_audio_archive(filename, data, max_files=10, max_total=4 * len(WAV))) == 4
+    with pytest.raises(ValueError, match="uncompressed"):
+        unpack_audio_archive(filename, data, max_files=10, max_total=3 * len(WAV) + 1)
@@ -0,0 +1,355 @@
+# backend/text_cascade.py
+"""
+Confidence-gated cascade in front of the transformer text classifier.
+
+Tier 1 is a hashed n-gram linear model (word uni/bigrams + character trigrams, L2-normalized
+binary features, softmax over the transformer's own labels). It answers in microseconds with
+NumPy only, and its answer is used when its top probability is at least the threshold. Every
+other text goes to tier 2, the transformer (TextInferenceEngine). Tier 1 is distilled from
+the transformer: it is trained on the transformer's labels, and the threshold is picked
+offline for a target loss of agreement with the transformer.
+
+    python -m backend.text_cascade train corpus.jsonl --max-loss 0.01      # fit + calibrate
+    python -m backend.text_cascade calibrate held_out.jsonl --max-loss 0.005
+    python -m backend.text_cascade eval held_out.jsonl
+
+Input files are JSON lines {"text": ..., "label": ...} or plain text, one text per line.
+When the label is missing, the transformer labels the text first. At runtime a small
+share of tier-1 answers is also sent to the transformer (audits), so agreement is measured
+on live traffic, not just at calibration time.
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.metrics import get_logger, log_event, TEXT_TIER_ANSWERS, TEXT_TIER_AGREEMENT
+
+TEXT_FAST_PATH = os.getenv("SOULSYNC_TEXT_FAST_PATH", "models/text_fast.npz")
+TEXT_FAST_THRESHOLD = os.getenv("SOULSYNC_TEXT_FAST_THRESHOLD", "")     # empty -> calibrated value in the file
+TEXT_FAST_FEATURES = int(os.getenv("SOULSYNC_TEXT_FAST_FEATURES", str(1 << 18)))
+TEXT_CASCADE_AUDIT = float(os.getenv("SOULSYNC_TEXT_CASCADE_AUDIT", "0.02"))   # share of tier-1 answers re-checked
+
+logger = get_logger("text_cascade")
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class HashedNgramModel:
+    """Multinomial linear model over hashed n-grams. weights: (n_features, n_labels) float32."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: Sequence[str],
+                 threshold: float = 1.0, meta: Optional[Dict[str, Any]] = None):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.labels = list(labels)
+        self.n_features = self.weights.shape[0]
+        self.threshold = float(threshold)
+        self.meta = dict(meta or {})
+
+    # ---------- features ----------
+    @staticmethod
+    def ngrams(text: str) -> List[str]:
+        words = _TOKEN.findall(text.lower())
+        grams = [f"w:{w}" for w in words]
+        grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            if len(w) > 3:
+                p = f"<{w}>"
+                grams += [f"c:{p[i:i + 3]}" for i in range(len(p) - 2)]
+        return grams or ["w:"]
+
+    @staticmethod
+    def hashed(texts: Sequence[str], n_features: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR pieces (indices, data, indptr); each row is a unit-norm set of hashed n-grams."""
+        mask = n_features - 1
+        indices, data, indptr = [], [], [0]
+        for text in texts:
+            idx = sorted({zlib.crc32(g.encode("utf-8")) & mask for g in HashedNgramModel.ngrams(text)})
+            indices += idx
+            data += [1.0 / np.sqrt(len(idx))] * len(idx)
+            indptr.append(len(indices))
+        return (np.array(indices, dtype=np.int64), np.array(data, dtype=np.float32),
+                np.array(indptr, dtype=np.int64))
+
+    # ---------- inference ----------
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), n_labels) softmax probabilities; one gather + one segmented sum per batch."""
+        indices, data, indptr = self.hashed(texts, self.n_features)
+        contrib = self.weights[indices] * data[:, None]
+        logits = np.add.reduceat(contrib, indptr[:-1], axis=0) + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        return p / p.sum(axis=1, keepdims=True)
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        proba = self.predict_proba(texts)
+        best = proba.argmax(axis=1)
+        return [(self.labels[i], float(proba[r, i])) for r, i in enumerate(best)]
+
+    # ---------- persistence ----------
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, weights=self.weights, bias=self.bias, labels=np.array(self.labels),
+                 meta=np.array(json.dumps(dict(self.meta, threshold=self.threshold))))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNgramModel":
+        with np.load(path) as f:
+            meta = json.loads(str(f["meta"]))
+            return cls(f["weights"], f["bias"], [str(x) for x in f["labels"]], meta.get("threshold", 1.0), meta)
+
+
+class TextCascade:
+    """
+    Routes one text to tier 1 or the transformer and keeps per-tier counts, latency and agreement.
+    With no tier-1 model every text escalates, so routes can always go through the cascade.
+    """
+
+    def __init__(self, fast: Optional[HashedNgramModel] = None, threshold: Optional[float] = None,
+                 audit_rate: float = TEXT_CASCADE_AUDIT):
+        self.fast = fast
+        self.threshold = float(threshold) if threshold is not None else (fast.threshold if fast else 1.0)
+        self.audit_rate = audit_rate
+        self._lock = threading.Lock()
+        self._latency = {"fast": deque(maxlen=1024), "transformer": deque(maxlen=1024)}
+        self.answered = {"fast": 0, "transformer": 0}
+        self.audits = self.audit_agree = 0
+        self.escalated_compared = self.escalated_agree = 0
+
+    @property
+    def tag(self) -> str:
+        """Part of the text cache's version tag: a new tier-1 model or threshold changes answers."""
+        if self.fast is None:
+            return "off"
+        return f"{self.fast.meta.get('trained', 0)}:{self.threshold:g}"
+
+    def route(self, text: str) -> Optional[Tuple[str, float, bool]]:
+        """Tier-1 (label, probability, confident), or None when there is no tier-1 model."""
+        if self.fast is None:
+            return None
+        start = time.perf_counter()
+        label, p = self.fast.predict([text])[0]
+        with self._lock:
+            self._latency["fast"].append((time.perf_counter() - start) * 1000.0)
+        return label, p, p >= self.threshold
+
+    def answered_by(self, tier: str, seconds: Optional[float] = None):
+        TEXT_TIER_ANSWERS.labels(tier).inc()
+        with self._lock:
+            self.answered[tier] += 1
+            if seconds is not None and tier == "transformer":
+                self._latency["transformer"].append(seconds * 1000.0)
+
+    def should_audit(self) -> bool:
+        return self.audit_rate > 0 and random.random() < self.audit_rate
+
+    def compare(self, fast_label: str, transformer_label: str, audit: bool):
+        """audit=True: a confident tier-1 answer re-checked; False: an escalated text (both ran anyway)."""
+        agree = fast_label == transformer_label
+        TEXT_TIER_AGREEMENT.labels("audit" if audit else "escalated", "agree" if agree else "disagree").inc()
+        with self._lock:
+            if audit:
+                self.audits += 1
+                self.audit_agree += agree
+            else:
+                self.escalated_compared += 1
+                self.escalated_agree += agree
+        return agree
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.answered.values())
+            tiers = {}
+            for tier, lat in self._latency.items():
+                lat = sorted(lat)
+                tiers[tier] = {
+                    "answered": self.answered[tier],
+                    "hit_rate": round(self.answered[tier] / total, 4) if total else 0.0,
+                    "latency_ms_avg": round(sum(lat) / len(lat), 4) if lat else 0.0,
+                    "latency_ms_p50": round(lat[len(lat) // 2], 4) if lat else 0.0,
+                    "latency_ms_max": round(lat[-1], 4) if lat else 0.0,
+                }
+            return {
+                "enabled": self.fast is not None, "threshold": self.threshold, "audit_rate": self.audit_rate,
+                "labels": self.fast.labels if self.fast else None,
+                "calibration": {k: self.fast.meta.get(k) for k in ("max_loss", "expected_loss", "expected_hit_rate")}
+                if self.fast else None,
+                "tiers": tiers,
+                "audits": self.audits,
+                "audit_agreement": round(self.audit_agree / self.audits, 4) if self.audits else None,
+                "escalated_compared": self.escalated_compared,
+                "escalated_agreement": round(self.escalated_agree / self.escalated_compared, 4)
+                if self.escalated_compared else None,
+            }
+
+
+def load_cascade(path: str = TEXT_FAST_PATH) -> TextCascade:
+    """Registry loader: a missing model file disables tier 1 instead of failing readiness."""
+    if not os.path.exists(path):
+        log_event(logger, "text_cascade_disabled", path=path)
+        return TextCascade(None)
+    fast = HashedNgramModel.load(path)
+    threshold = float(TEXT_FAST_THRESHOLD) if TEXT_FAST_THRESHOLD else None
+    cascade = TextCascade(fast, threshold)
+    log_event(logger, "text_cascade_loaded", path=path, threshold=cascade.threshold, labels=fast.labels)
+    return cascade
+
+
+# ---------- offline: training and calibration ----------
+def pick_threshold(confidence: np.ndarray, agree: np.ndarray, max_loss: float) -> Dict[str, float]:
+    """
+    Lowest threshold whose tier-1 answers disagree with the transformer on at most max_loss of
+    all texts (escalated texts count as agreeing). Maximizes tier-1 coverage under that budget.
+    """
+    n = len(confidence)
+    order = np.argsort(-confidence, kind="stable")
+    conf = confidence[order]
+    errors = np.cumsum(~agree[order])
+    # a threshold accepts whole tie groups: only the last index of each group is a valid cut
+    cut = np.r_[conf[1:] != conf[:-1], True]
+    ok = np.nonzero(cut & (errors <= max_loss * n))[0]
+    if n == 0 or len(ok) == 0:
+        return {"threshold": 1.0 + 1e-6, "hit_rate": 0.0, "loss": 0.0}
+    k = ok[-1]
+    return {"threshold": float(conf[k]), "hit_rate": (k + 1) / n, "loss": float(errors[k]) / n}
+
+
+def read_corpus(path: str) -> Tuple[List[str], List[Optional[str]]]:
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                row = json.loads(line)
+                texts.append(str(row["text"]))
+                labels.append(row.get("label"))
+            else:
+                texts.append(line)
+                labels.append(None)
+    return texts, labels
+
+
+def teacher_labels(texts: List[str], labels: List[Optional[str]], batch: int = 64) -> List[str]:
+    """Fill missing labels with the transformer's answers (same pipeline the router loads)."""
+    todo = [i for i, label in enumerate(labels) if label is None]
+    if todo:
+        from transformers import pipeline
+        classifier = pipeline("sentiment-analysis")
+        start = time.perf_counter()
+        for s in range(0, len(todo), batch):
+            idx = todo[s:s + batch]
+            for i, r in zip(idx, classifier([texts[i] for i in idx], truncation=True)):
+                labels[i] = r["label"]
+        print(f"transformer labelled {len(todo)} texts in {time.perf_counter() - start:.1f}s")
+    return [str(label) for label in labels]
+
+
+def fit(texts: List[str], labels: List[str], n_features: int = TEXT_FAST_FEATURES, c: float = 4.0) -> HashedNgramModel:
+    from scipy.sparse import csr_matrix
+    from sklearn.linear_model import LogisticRegression
+    if n_features & (n_features - 1):
+        raise ValueError("n_features must be a power of two")
+    classes = sorted(set(labels))
+    if len(classes) < 2:
+        raise ValueError("need at least two labels to train on")
+    indices, data, indptr = HashedNgramModel.hashed(texts, n_features)
+    X = csr_matrix((data, indices, indptr), shape=(len(texts), n_features))
+    clf = LogisticRegression(C=c, max_iter=2000).fit(X, labels)
+    coef, intercept = clf.coef_, clf.intercept_
+    if len(clf.classes_) == 2:
+        # binary logistic -> two-way softmax with the same probabilities
+        coef = np.vstack([-coef[0] / 2, coef[0] / 2])
+        intercept = np.array([-intercept[0] / 2, intercept[0] / 2])
+    return HashedNgramModel(coef.T, intercept, [str(x) for x in clf.classes_],
+                            meta={"n_features": n_features, "c": c, "trained": int(time.time()), "train_texts": len(texts)})
+
+
+def calibrate(model: HashedNgramModel, texts: List[str], labels: List[str], max_loss: float) -> Dict[str, float]:
+    preds = model.predict(texts)
+    conf = np.array([p for _, p in preds])
+    agree = np.array([label == t for (label, _), t in zip(preds, labels)])
+    picked = pick_threshold(conf, agree, max_loss)
+    model.threshold = picked["threshold"]
+    model.meta.update(max_loss=max_loss, expected_loss=round(picked["loss"], 5),
+                      expected_hit_rate=round(picked["hit_rate"], 4), calibration_texts=len(texts),
+                      overall_agreement=round(float(agree.mean()), 4))
+    return dict(picked, agreement=float(agree.mean()))
+
+
+def evaluate(model: HashedNgramModel, texts: List[str], labels: List[str], threshold: float) -> Dict[str, float]:
+    start = time.perf_counter()
+    preds = model.predict(texts)
+    ms = (time.perf_counter() - start) * 1000.0 / max(1, len(texts))
+    conf = np.array([p for _, p in preds])
+    agree = np.array([label == t for (label, _), t in zip(preds, labels)])
+    hit = conf >= threshold
+    return {"texts": len(texts), "threshold": threshold, "hit_rate": float(hit.mean()) if len(hit) else 0.0,
+            "hit_agreement": float(agree[hit].mean()) if hit.any() else 1.0,
+            "cascade_loss": float((hit & ~agree).mean()) if len(hit) else 0.0,
+            "fast_ms_per_text": round(ms, 4)}
+
+
+def _print(title: str, values: Dict[str, Any]):
+    print(title)
+    for k, v in values.items():
+        print(f"  {k:<18} {round(v, 4) if isinstance(v, float) else v}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--model", default=TEXT_FAST_PATH)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("train", help="fit tier 1 on transformer labels and calibrate its threshold")
+    t.add_argument("corpus")
+    t.add_argument("--max-loss", type=float, default=0.01, help="agreement loss budget, fraction of all texts")
+    t.add_argument("--holdout", type=float, default=0.2, help="share of the corpus kept for calibration")
+    t.add_argument("--features", type=int, default=TEXT_FAST_FEATURES)
+    t.add_argument("--c", type=float, default=4.0, help="inverse L2 strength")
+    t.add_argument("--seed", type=int, default=0)
+    c = sub.add_parser("calibrate", help="re-pick the threshold of an existing model on new texts")
+    c.add_argument("corpus")
+    c.add_argument("--max-loss", type=float, default=0.01)
+    e = sub.add_parser("eval", help="hit rate / agreement of the saved model and threshold")
+    e.add_argument("corpus")
+    e.add_argument("--threshold", type=float)
+    args = ap.parse_args(argv)
+
+    texts, labels = read_corpus(args.corpus)
+    labels = teacher_labels(texts, labels)
+    if args.cmd == "train":
+        order = np.random.default_rng(args.seed).permutation(len(texts))
+        n_cal = max(1, int(len(texts) * args.holdout))
+        cal, tr = order[:n_cal], order[n_cal:]
+        model = fit([texts[i] for i in tr], [labels[i] for i in tr], args.features, args.c)
+        picked = calibrate(model, [texts[i] for i in cal], [labels[i] for i in cal], args.max_loss)
+        _print(f"calibrated on {len(cal)} held-out texts", picked)
+        model.save(args.model)
+        print(f"saved {args.model}")
+    elif args.cmd == "calibrate":
+        model = HashedNgramModel.load(args.model)
+        _print(f"calibrated on {len(texts)} texts", calibrate(model, texts, labels, args.max_loss))
+        model.save(args.model)
+        print(f"saved {args.model}")
+    else:
+        model = HashedNgramModel.load(args.model)
+        threshold = args.threshold if args.threshold is not None else model.threshold
+        _print(f"{args.model}", evaluate(model, texts, labels, threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
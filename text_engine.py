@@ -0,0 +1,120 @@
+# backend/text_engine.py
+import os
+import time
+import threading
+from typing import Any, Dict, List, Sequence
+
+from backend.inference_queue import InferenceBatcher, MAX_WAIT_MS
+
+TEXT_MAX_LENGTH = int(os.getenv("SOULSYNC_TEXT_MAX_LENGTH", "128"))
+TEXT_MAX_BATCH_SIZE = int(os.getenv("SOULSYNC_TEXT_MAX_BATCH_SIZE", "64"))
+TEXT_BUCKETS = tuple(int(b) for b in os.getenv("SOULSYNC_TEXT_BUCKETS", "16,32,64,128").split(","))
+
+
+class TextInferenceEngine:
+    """
+    Batched, length-bucketed front end for a transformers text-classification pipeline.
+
+    Concurrent requests are gathered by an InferenceBatcher. Each gathered batch is tokenized
+    once without padding (truncated to max_length), split into length buckets, and every bucket
+    is padded only to its own longest sequence before a single forward pass. Results use
+    the pipeline's own output shape: {"label": ..., "score": ...}.
+    """
+
+    def __init__(self, classifier, max_length: int = TEXT_MAX_LENGTH, buckets: Sequence[int] = TEXT_BUCKETS,
+                 max_batch_size: int = TEXT_MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.classifier = classifier
+        self.max_length = max_length
+        self.buckets = sorted(set(min(b, max_length) for b in buckets) | {max_length})
+        self.tokenizer = getattr(classifier, "tokenizer", None)
+        self.model = getattr(classifier, "model", None)
+        self._lock = threading.Lock()
+        self._reset_counters()
+        self.batcher = InferenceBatcher(self._run_batch, max_batch_size=max_batch_size,
+                                        max_wait_ms=max_wait_ms, name="text")
+
+    # ---------- public API ----------
+    def submit(self, text: str):
+        return self.batcher.submit(text)
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        return self.batcher.predict(text)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            padded = self._real_tokens + self._pad_tokens
+            return {
+                "max_length": self.max_length,
+                "buckets": self.buckets,
+                "texts": self._texts,
+                "truncated": self._truncated,
+                "forward_passes": self._forwards,
+                "bucket_counts": {str(k): v for k, v in sorted(self._bucket_counts.items())},
+                "real_tokens": self._real_tokens,
+                "pad_tokens": self._pad_tokens,
+                "padding_ratio": round(self._pad_tokens / padded, 4) if padded else 0.0,
+                "tokens_per_sec": round(self._real_tokens / self._busy_s, 1) if self._busy_s else 0.0,
+                "batcher": self.batcher.stats(),
+            }
+
+    # ---------- internals ----------
+    def _reset_counters(self):
+        self._texts = self._truncated = self._forwards = 0
+        self._real_tokens = self._pad_tokens = 0
+        self._busy_s = 0.0
+        self._bucket_counts: Dict[int, int] = {}
+
+    def _bucket_for(self, length: int) -> int:
+        for b in self.buckets:
+            if length <= b:
+                return b
+        return self.buckets[-1]
+
+    def _run_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        if self.tokenizer is None or self.model is None:
+            # not a transformers pipeline (or a custom callable): let it batch however it can
+            return list(self.classifier(list(texts)))
+        import torch
+
+        start = time.perf_counter()
+        # one token of headroom tells "exactly max_length" apart from "had to be cut"; only the
+        # cut texts are tokenized again at max_length
+        enc = self.tokenizer(list(texts), truncation=True, max_length=self.max_length + 1)
+        over = [i for i, ids in enumerate(enc["input_ids"]) if len(ids) > self.max_length]
+        if over:
+            cut = self.tokenizer([texts[i] for i in over], truncation=True, max_length=self.max_length)
+            for key in enc.keys():
+                for j, i in enumerate(over):
+                    enc[key][i] = cut[key][j]
+        lengths = [len(ids) for ids in enc["input_ids"]]
+        groups: Dict[int, List[int]] = {}
+        for i, n in enumerate(lengths):
+            groups.setdefault(self._bucket_for(n), []).append(i)
+
+        id2label = self.model.config.id2label
+        device = getattr(self.model, "device", None)
+        results: List[Dict[str, Any]] = [None] * len(texts)
+        pad_tokens = 0
+        with torch.inference_mode():
+            for bucket, idx in groups.items():
+                features = [{k: enc[k][i] for k in enc.keys()} for i in idx]
+                batch = self.tokenizer.pad(features, padding="longest", return_tensors="pt")
+                if device is not None:
+                    batch = {k: v.to(device) for k, v in batch.items()}
+                probs = torch.softmax(self.model(**batch).logits, dim=-1)
+                scores, preds = torch.max(probs, dim=-1)
+                width = batch["input_ids"].shape[1]
+                pad_tokens += sum(width - lengths[i] for i in idx)
+                for i, p, sc in zip(idx, preds.tolist(), scores.tolist()):
+                    results[i] = {"label": id2label[p], "score": sc}
+                with self._lock:
+                    self._bucket_counts[bucket] = self._bucket_counts.get(bucket, 0) + len(idx)
+                    self._forwards += 1
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._texts += len(texts)
+            self._truncated += len(over)
+            self._real_tokens += sum(lengths)
+            self._pad_tokens += pad_tokens
+            self._busy_s += elapsed
+        return results
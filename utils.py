@@ -0,0 +1,71 @@
+# backend/utils.py
+import io
+import os
+import tarfile
+import wave
+import zipfile
+from typing import List, Tuple
+
+AUDIO_EXTENSIONS = (".wav", ".wave", ".mp3", ".flac", ".ogg", ".m4a", ".aac")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+MAX_MEMBER_BYTES = int(os.getenv("SOULSYNC_MAX_MEMBER_MB", "50")) * 1024 * 1024
+# total uncompressed audio per archive, so many members just under the per-member cap can't add up
+MAX_ARCHIVE_BYTES = int(os.getenv("SOULSYNC_MAX_ARCHIVE_MB", "500")) * 1024 * 1024
+
+
+def is_archive(filename: str) -> bool:
+    return (filename or "").lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _is_audio_member(name: str) -> bool:
+    base = os.path.basename(name)
+    # skip directories, macOS resource forks and dotfiles
+    return bool(base) and not base.startswith(".") and "__MACOSX" not in name and name.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def _check_total(total: int, max_total: int):
+    if total > max_total:
+        raise ValueError(f"archive audio exceeds {max_total // (1024 * 1024)} MB uncompressed")
+
+
+def unpack_audio_archive(filename: str, data: bytes, max_files: int,
+                         max_total: int = MAX_ARCHIVE_BYTES) -> List[Tuple[str, bytes]]:
+    """Return [(member_name, bytes)] for the audio files inside a zip / tar(.gz|.bz2|.xz) upload."""
+    out = []
+    total = 0
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not _is_audio_member(info.filename):
+                    continue
+                if info.file_size > MAX_MEMBER_BYTES:
+                    raise ValueError(f"{info.filename} exceeds {MAX_MEMBER_BYTES // (1024 * 1024)} MB")
+                if len(out) >= max_files:
+                    raise ValueError(f"archive holds more than {max_files} audio files")
+                total += info.file_size
+                _check_total(total, max_total)
+                out.append((info.filename, zf.read(info)))
+    else:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tf:
+            for member in tf:
+                if not member.isfile() or not _is_audio_member(member.name):
+                    continue
+                if member.size > MAX_MEMBER_BYTES:
+                    raise ValueError(f"{member.name} exceeds {MAX_MEMBER_BYTES // (1024 * 1024)} MB")
+                if len(out) >= max_files:
+                    raise ValueError(f"archive holds more than {max_files} audio files")
+                total += member.size
+                _check_total(total, max_total)
+                out.append((member.name, tf.extractfile(member).read()))
+    return out
+
+
+def silent_wav(seconds: float = 0.1, sr: int = 16000) -> bytes:
+    """A tiny 16-bit mono WAV of silence, handy for warm-ups."""
+    bio = io.BytesIO()
+    with wave.open(bio, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(bytes(2 * int(seconds * sr)))
+    return bio.getvalue()